@@ -0,0 +1,80 @@
+"""The operations the benchmark suite times."""
+from pathlib import Path
+from typing import Callable, Dict, NamedTuple, Optional, Set
+
+from epyon.core.call_replacer import replace_call
+from epyon.core.def_mover import move_definition
+from epyon.core.import_map import ImportMap
+from epyon.core.import_replacer import replace_import
+from epyon.core.utils import build_import_map, find_python_files, process_files_parallel, scan_imports, scan_index
+
+from .corpus import NEW_CALL, NEW_IMPORT, TARGET_CALL, TARGET_IMPORT
+
+class Case(NamedTuple):
+    """
+    A benchmarked operation.
+
+    setup runs before the clock starts; run returns the number of files it
+    covered. Cases that modify files get a fresh corpus for every run.
+    Traced cases also report the peak memory Python allocated while they
+    ran, which isolates a data structure better than the RSS does.
+    """
+    run: Callable[[Path, Optional[int]], int]
+    mutates: bool = False
+    setup: Optional[Callable[[Path, Optional[int]], None]] = None
+    traced: bool = False
+
+def _find_python_files(corpus: Path, workers: Optional[int]) -> int:
+    return len(find_python_files(corpus))
+
+def _build_import_map_cold(corpus: Path, workers: Optional[int]) -> int:
+    build_import_map(corpus, max_workers=workers, rebuild=True)
+    return len(find_python_files(corpus))
+
+def _warm_index(corpus: Path, workers: Optional[int]) -> None:
+    build_import_map(corpus, max_workers=workers)
+
+def _build_import_map_warm(corpus: Path, workers: Optional[int]) -> int:
+    build_import_map(corpus, max_workers=workers)
+    return len(find_python_files(corpus))
+
+def _import_map_sets(corpus: Path, workers: Optional[int]) -> int:
+    # The Dict[str, Set[Path]] build_import_map returned before ImportMap
+    scans = scan_index(corpus, max_workers=workers)
+    import_map: Dict[str, Set[Path]] = {}
+    for file_path, scan in scans.items():
+        for import_path in scan.imports:
+            import_map.setdefault(import_path, set()).add(file_path)
+    return len(scans)
+
+def _import_map_compact(corpus: Path, workers: Optional[int]) -> int:
+    scans = scan_index(corpus, max_workers=workers)
+    ImportMap.build((file_path, scan.imports) for file_path, scan in scans.items())
+    return len(scans)
+
+def _process_files_parallel(corpus: Path, workers: Optional[int]) -> int:
+    return len(process_files_parallel(find_python_files(corpus), scan_imports, max_workers=workers))
+
+def _replace_import(corpus: Path, workers: Optional[int]) -> int:
+    replace_import(corpus, TARGET_IMPORT, NEW_IMPORT, max_workers=workers)
+    return len(find_python_files(corpus))
+
+def _replace_call(corpus: Path, workers: Optional[int]) -> int:
+    replace_call(corpus, TARGET_CALL, NEW_CALL, max_workers=workers)
+    return len(find_python_files(corpus))
+
+def _move_def(corpus: Path, workers: Optional[int]) -> int:
+    move_definition(corpus, TARGET_IMPORT, NEW_IMPORT, max_workers=workers, use_cache=False)
+    return len(find_python_files(corpus))
+
+CASES: Dict[str, Case] = {
+    "find_python_files": Case(_find_python_files),
+    "build_import_map (cold)": Case(_build_import_map_cold),
+    "build_import_map (warm)": Case(_build_import_map_warm, setup=_warm_index),
+    "import map (sets)": Case(_import_map_sets, setup=_warm_index, traced=True),
+    "import map (compact)": Case(_import_map_compact, setup=_warm_index, traced=True),
+    "process_files_parallel": Case(_process_files_parallel),
+    "replace-import": Case(_replace_import, mutates=True),
+    "replace-call": Case(_replace_call, mutates=True),
+    "move-def": Case(_move_def, mutates=True),
+}
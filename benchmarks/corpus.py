@@ -0,0 +1,114 @@
+"""Deterministic synthetic corpus for the benchmarks."""
+import random
+from pathlib import Path
+from typing import List, NamedTuple
+
+# What the benchmarked commands look for in the corpus
+TARGET_MODULE = "bench.models"
+TARGET_NAME = "Target"
+TARGET_IMPORT = f"{TARGET_MODULE}.{TARGET_NAME}"
+NEW_IMPORT = f"bench.api.{TARGET_NAME}"
+TARGET_CALL = "self.client.fetch_target"
+NEW_CALL = "self.client.fetch_target_v2"
+
+# Modules imported by files that don't match
+_FILLER_MODULES = [
+    "os", "sys", "json", "re", "typing", "collections", "itertools", "functools",
+    "pathlib", "dataclasses", "logging", "datetime", "decimal", "enum", "uuid",
+]
+_FILLER_FROMS = [
+    ("typing", "Any"), ("typing", "Dict"), ("typing", "List"), ("collections", "OrderedDict"),
+    ("pathlib", "Path"), ("dataclasses", "dataclass"), ("functools", "lru_cache"),
+    ("decimal", "Decimal"), ("enum", "Enum"), ("bench.util", "helper"),
+]
+FILES_PER_PACKAGE = 100
+
+class CorpusSpec(NamedTuple):
+    """Shape of a generated corpus."""
+    files: int = 1000
+    lines: int = 60
+    import_density: float = 0.1
+    match_ratio: float = 0.05
+    seed: int = 0
+
+def _filler_function(rng: random.Random, index: int) -> List[str]:
+    """Return a small function with a few statements and calls."""
+    return [
+        f"def helper_{index}(value, *args, **kwargs):",
+        f"    total = value * {rng.randint(2, 9)} + len(args)",
+        "    for key, item in sorted(kwargs.items()):",
+        f"        total += hash((key, item)) % {rng.randint(10, 99)}",
+        "    return total",
+        "",
+        "",
+    ]
+
+def _render_file(rng: random.Random, spec: CorpusSpec, matches: bool) -> str:
+    """Render one module of roughly spec.lines lines."""
+    lines = ['"""Generated module."""']
+
+    # import_density is the fraction of lines that are imports
+    for _ in range(max(1, int(spec.lines * spec.import_density))):
+        if rng.random() < 0.5:
+            lines.append(f"import {rng.choice(_FILLER_MODULES)}")
+        else:
+            module, name = rng.choice(_FILLER_FROMS)
+            lines.append(f"from {module} import {name}")
+    if matches:
+        lines.append(f"from {TARGET_MODULE} import {TARGET_NAME}, helper")
+    lines += ["", ""]
+
+    if matches:
+        lines += [
+            "class Service:",
+            "    def run(self, key):",
+            f"        result = {TARGET_NAME}(key)",
+            f"        return {TARGET_CALL}(result, retries=3)",
+            "",
+            "",
+        ]
+
+    index = 0
+    while len(lines) < spec.lines:
+        lines += _filler_function(rng, index)
+        index += 1
+    return "\n".join(lines) + "\n"
+
+def generate_corpus(root: Path, spec: CorpusSpec = CorpusSpec()) -> List[Path]:
+    """
+    Write a synthetic project under root.
+
+    The project is a 'bench' package split into subpackages of
+    FILES_PER_PACKAGE modules. A spec.match_ratio fraction of them import
+    TARGET_IMPORT and call TARGET_CALL, so every command has work to do.
+    The same spec always produces byte-identical files.
+
+    Returns:
+        The generated module paths, excluding __init__.py files
+    """
+    rng = random.Random(spec.seed)
+    package = root / "bench"
+    package.mkdir(parents=True, exist_ok=True)
+    (package / "__init__.py").write_text("")
+    (package / "util.py").write_text("def helper(value):\n    return value\n")
+    (package / "api.py").write_text('"""Where the target moves to."""\n')
+    (package / "models.py").write_text(
+        '"""Where the target is defined."""\n\n\n'
+        f"class {TARGET_NAME}:\n"
+        "    def __init__(self, key):\n"
+        "        self.key = key\n\n\n"
+        "def helper(value):\n"
+        "    return value\n"
+    )
+
+    files = []
+    matching = set(rng.sample(range(spec.files), int(spec.files * spec.match_ratio)))
+    for index in range(spec.files):
+        subpackage = package / f"pkg_{index // FILES_PER_PACKAGE:04d}"
+        if index % FILES_PER_PACKAGE == 0:
+            subpackage.mkdir(exist_ok=True)
+            (subpackage / "__init__.py").write_text("")
+        file_path = subpackage / f"mod_{index:06d}.py"
+        file_path.write_text(_render_file(rng, spec, index in matching))
+        files.append(file_path)
+    return files
@@ -0,0 +1,181 @@
+"""
+Run the benchmark suite.
+
+    python -m benchmarks.run --size small
+    python -m benchmarks.run --files 5000 --match-ratio 0.2 --json results.json
+
+Each measurement runs in its own interpreter so that peak RSS belongs to
+that case alone. Everything runs offline against a generated corpus.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from rich.console import Console
+from rich.table import Table
+
+from .corpus import CorpusSpec, generate_corpus
+
+SIZES = {"small": 1_000, "medium": 10_000, "large": 100_000}
+DEFAULTS = CorpusSpec._field_defaults
+
+def peak_rss_bytes() -> Optional[int]:
+    """Return the peak RSS of this process and its reaped children, if known."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    )
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+def run_case(name: str, corpus: Path, workers: Optional[int]) -> Dict[str, Any]:
+    """Time one case in the current process, with command output discarded."""
+    from epyon.display import redirect_output
+
+    from .cases import CASES
+
+    case = CASES[name]
+    with open(os.devnull, "w") as devnull, redirect_output(devnull):
+        if case.setup is not None:
+            case.setup(corpus, workers)
+        if case.traced:
+            tracemalloc.start()
+        start = time.perf_counter()
+        files = case.run(corpus, workers)
+        elapsed = time.perf_counter() - start
+        traced_peak = None
+        if case.traced:
+            traced_peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+    return {"files": files, "seconds": elapsed, "peak_rss": peak_rss_bytes(), "traced_peak": traced_peak}
+
+def _measure(name: str, corpus: Path, workers: Optional[int], cache_dir: Path) -> Dict[str, Any]:
+    """Run a case in a fresh interpreter and return its measurements."""
+    with tempfile.TemporaryDirectory() as scratch:
+        result_path = Path(scratch) / "result.json"
+        command = [sys.executable, "-m", "benchmarks.run", "--run-case", name,
+                   "--corpus", str(corpus), "--result", str(result_path)]
+        if workers is not None:
+            command += ["--workers", str(workers)]
+        env = dict(os.environ, EPYON_CACHE_DIR=str(cache_dir))
+        subprocess.run(command, check=True, env=env, stdout=subprocess.DEVNULL,
+                       cwd=Path(__file__).resolve().parent.parent)
+        return json.loads(result_path.read_text())
+
+def run_suite(
+    spec: CorpusSpec,
+    names: List[str],
+    workers: Optional[int] = None,
+    repeat: int = 3
+) -> List[Dict[str, Any]]:
+    """
+    Measure each case repeat times and summarise the runs.
+
+    Read-only cases share one corpus; cases that modify files get a freshly
+    generated one for every run. The import index cache lives in a scratch
+    directory so cold runs really are cold.
+    """
+    from .cases import CASES
+
+    results = []
+    with tempfile.TemporaryDirectory() as scratch:
+        shared = Path(scratch) / "shared"
+        generate_corpus(shared, spec)
+        for name in names:
+            runs = []
+            for attempt in range(repeat):
+                corpus = shared
+                if CASES[name].mutates:
+                    corpus = Path(scratch) / f"run-{len(results)}-{attempt}"
+                    generate_corpus(corpus, spec)
+                runs.append(_measure(name, corpus, workers, Path(scratch) / f"cache-{len(results)}-{attempt}"))
+
+            seconds = statistics.median(run["seconds"] for run in runs)
+            peaks = [run["peak_rss"] for run in runs if run["peak_rss"] is not None]
+            traced = [run["traced_peak"] for run in runs if run.get("traced_peak") is not None]
+            results.append({
+                "case": name,
+                "files": runs[0]["files"],
+                "seconds": seconds,
+                "files_per_second": runs[0]["files"] / seconds if seconds else None,
+                "peak_rss": max(peaks) if peaks else None,
+                "traced_peak": max(traced) if traced else None,
+                "runs": [run["seconds"] for run in runs],
+            })
+    return results
+
+def show_results(results: List[Dict[str, Any]], spec: CorpusSpec) -> None:
+    """Print the results as a table."""
+    table = Table(title=f"{spec.files} files, {spec.lines} lines each, "
+                        f"{spec.import_density:.0%} imports, {spec.match_ratio:.0%} matching")
+    table.add_column("Case")
+    table.add_column("Files", justify="right")
+    table.add_column("Wall (s)", justify="right")
+    table.add_column("Files/s", justify="right")
+    table.add_column("Peak RSS (MiB)", justify="right")
+    table.add_column("Traced (MiB)", justify="right")
+    for result in results:
+        table.add_row(
+            result["case"],
+            str(result["files"]),
+            f"{result['seconds']:.3f}",
+            f"{result['files_per_second']:,.0f}" if result["files_per_second"] else "-",
+            f"{result['peak_rss'] / 2**20:.1f}" if result["peak_rss"] else "-",
+            f"{result['traced_peak'] / 2**20:.1f}" if result["traced_peak"] else "-",
+        )
+    Console().print(table)
+
+def main(argv: Optional[List[str]] = None) -> None:
+    from .cases import CASES
+
+    parser = argparse.ArgumentParser(description="Benchmark epyon on a synthetic corpus")
+    parser.add_argument("--size", choices=sorted(SIZES), default="small",
+                        help="Preset file count: small=1k, medium=10k, large=100k")
+    parser.add_argument("--files", type=int, help="Number of modules (overrides --size)")
+    parser.add_argument("--lines", type=int, default=DEFAULTS["lines"], help="Lines per module")
+    parser.add_argument("--import-density", type=float, default=DEFAULTS["import_density"],
+                        help="Fraction of each module's lines that are imports")
+    parser.add_argument("--match-ratio", type=float, default=DEFAULTS["match_ratio"],
+                        help="Fraction of modules that use the refactored symbol")
+    parser.add_argument("--seed", type=int, default=DEFAULTS["seed"], help="Corpus random seed")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: CPU count)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per case; the median is reported")
+    parser.add_argument("--case", action="append", choices=sorted(CASES), dest="cases",
+                        help="Only run this case (repeatable)")
+    parser.add_argument("--json", type=Path, help="Also write the results to this file")
+    # Internal: measure a single case in this process
+    parser.add_argument("--run-case", help=argparse.SUPPRESS)
+    parser.add_argument("--corpus", type=Path, help=argparse.SUPPRESS)
+    parser.add_argument("--result", type=Path, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.run_case:
+        args.result.write_text(json.dumps(run_case(args.run_case, args.corpus, args.workers)))
+        return
+
+    spec = CorpusSpec(
+        files=args.files or SIZES[args.size],
+        lines=args.lines,
+        import_density=args.import_density,
+        match_ratio=args.match_ratio,
+        seed=args.seed,
+    )
+    results = run_suite(spec, args.cases or list(CASES), args.workers, args.repeat)
+    show_results(results, spec)
+    if args.json:
+        args.json.write_text(json.dumps({"spec": spec._asdict(), "results": results}, indent=2))
+
+if __name__ == "__main__":
+    main()
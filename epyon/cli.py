@@ -2,14 +2,17 @@
 """Command-line interface for the refactor tool."""
 import typer
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional
 
 from . import __version__
 from .commands import CommandRegistry
+from .commands.daemon import run_via_daemon
+from .commands.output import output_command
+from .commands.patch import patch_command, plan_command
+from .commands.profile import profile_command
+from .commands.shard import shard_option
+from .commands.writes import write_command
 from .display import display
-from .core.import_replacer import replace_import
-from .core.def_mover import move_definition
-from .core.call_replacer import replace_call
 
 app = typer.Typer(
     name="refactor",
@@ -37,60 +40,40 @@ def main(
     """Python refactoring tool using libCST."""
     pass
 
-@app.command("replace-import")
-def replace_import_cmd(
-    old_import: str,
-    new_import: str,
-    directory: Path = Path("."),
-    dry_run: bool = False,
-    verbose: bool = False
-):
-    """Replace an import statement across all Python files in a directory."""
-    display.verbose = verbose
-    modified_count = replace_import(directory, old_import, new_import, dry_run)
-    display.info(f"Modified {modified_count} files")
-
-@app.command("move-def")
-def move_def_cmd(
-    old_path: str,
-    new_path: str,
-    directory: Path = Path("."),
-    dry_run: bool = False,
-    verbose: bool = False,
-    workers: Optional[int] = None
-):
-    """
-    Move a class or function definition between modules.
-    
-    Example:
-        epyon move-def foo.bar.Baz lorem.ipsum.Baz
-    
-    Args:
-        old_path: Original import path (e.g., 'foo.bar.Baz')
-        new_path: New import path (e.g., 'lorem.ipsum.Baz')
-        directory: Root directory to process
-        dry_run: If True, don't modify files
-        verbose: If True, show detailed output
-        workers: Number of parallel workers (default: CPU count)
-    """
-    display.verbose = verbose
-    modified_count = move_definition(directory, old_path, new_path, dry_run, workers)
-    display.info(f"Modified {modified_count} files")
-
 @app.command("replace-call")
 def replace_call_cmd(
-    old_call: str,
-    new_call: str,
+    old_call: Optional[str] = typer.Argument(None),
+    new_call: Optional[str] = typer.Argument(None),
     directory: Path = Path("."),
     dry_run: bool = False,
     verbose: bool = False,
-    workers: Optional[int] = None
+    workers: Optional[int] = None,
+    daemon: bool = False,
+    exclude: List[str] = typer.Option([], help="Glob of files or directories to skip (repeatable)"),
+    include: List[str] = typer.Option([], help="Only process files matching this glob (repeatable)"),
+    since: Optional[str] = typer.Option(None, help="Only process files changed since this git ref"),
+    staged: bool = typer.Option(False, help="Only process files with staged git changes"),
+    fsync: str = typer.Option("none", help="Flush rewritten files to disk: none, batch (once at the end) or each"),
+    executor: str = typer.Option("auto", help="Run files serially, on threads or on processes: auto, serial, thread or process"),
+    output: str = typer.Option("human", help="Report results for humans, or as one JSON event per file on stdout: human or jsonl"),
+    patch_out: Optional[Path] = typer.Option(None, help="Also write every change to this file as a patch for 'git apply'"),
+    plan_out: Optional[Path] = typer.Option(None, help="Also record every change to this file as an edit plan for 'epyon apply-plan'"),
+    no_cache: bool = typer.Option(False, help="Don't read or write the on-disk call index"),
+    rebuild_index: bool = typer.Option(False, help="Rebuild the on-disk call index from scratch"),
+    stats: bool = typer.Option(False, help="Report how many files the call index narrowed the search to"),
+    rules: Optional[Path] = typer.Option(None, help="TOML file of old to new calls to replace in one pass; takes no arguments"),
+    shard: Optional[str] = typer.Option(None, help="Only process shard i of N of the files, e.g. 2/4, for splitting a run across machines"),
+    shard_by: str = typer.Option("hash", help="Assign files to shards by a hash of their path, or balanced by size: hash or size"),
+    profile: bool = False,
+    profile_json: Optional[Path] = None,
+    profile_top: int = 10
 ):
     """
     Replace method/function calls across Python files in a directory.
     
     Example:
         epyon replace-call "self.assert_401_UNAUTHORIZED" "self.assert_403_FORBIDDEN"
+        epyon replace-call --rules rules.toml
     
     Args:
         old_call: Original function call (e.g., 'self.assert_401_UNAUTHORIZED')
@@ -99,10 +82,108 @@ def replace_call_cmd(
         dry_run: If True, don't modify files
         verbose: If True, show detailed output
         workers: Number of parallel workers (default: CPU count)
+        daemon: If True, send the request to a running 'epyon daemon'
+        exclude: Globs of files or directories to skip
+        include: If given, only process files matching one of these globs
+        since: Only process files changed since this git ref
+        staged: Only process files with staged git changes
+        fsync: When to flush rewritten files to disk: none, batch or each
+        executor: How to run the files: auto (by workload size), serial, thread or process
+        output: human, or jsonl for one JSON event per file and a summary on stdout
+        patch_out: Also write every change to this file as a patch for 'git apply'
+        plan_out: Also record every change to this file as an edit plan for 'epyon apply-plan'
+        no_cache: If True, don't read or write the on-disk call index
+        rebuild_index: If True, rebuild the on-disk call index from scratch
+        stats: If True, report how far the call index narrowed the search
+        rules: Apply every old to new pair in this TOML file instead of a single call
+        shard: Only process shard i of N of the files (e.g. '2/4')
+        shard_by: Assign files to shards by path hash or balanced by size: hash or size
+        profile: If True, report time spent per phase and the slowest files
+        profile_json: Also write the profile to this JSON file
+        profile_top: Number of slowest files to report
     """
     display.verbose = verbose
-    modified_count = replace_call(directory, old_call, new_call, dry_run, workers)
-    display.info(f"Modified {modified_count} files")
+    if rules is not None:
+        if old_call is not None or new_call is not None:
+            raise typer.BadParameter("OLD_CALL and NEW_CALL can't be used with --rules", param_hint="'--rules'")
+    elif old_call is None or new_call is None:
+        raise typer.BadParameter("OLD_CALL and NEW_CALL are required", param_hint="'NEW_CALL'")
+    if output not in ("human", "jsonl"):
+        raise typer.BadParameter("expected one of human, jsonl", param_hint="'--output'")
+    shard_spec = shard_option(shard, shard_by)
+    if daemon:
+        if profile or profile_json is not None:
+            display.error("--profile can't be used with --daemon")
+            raise typer.Exit(1)
+        if output != "human":
+            display.error("--output can't be used with --daemon")
+            raise typer.Exit(1)
+        if patch_out is not None:
+            display.error("--patch-out can't be used with --daemon")
+            raise typer.Exit(1)
+        if plan_out is not None:
+            display.error("--plan-out can't be used with --daemon")
+            raise typer.Exit(1)
+        if rules is not None:
+            display.error("--rules can't be used with --daemon")
+            raise typer.Exit(1)
+        if shard_spec is not None:
+            display.error("--shard can't be used with --daemon")
+            raise typer.Exit(1)
+        # The daemon rewrites from its warm in-memory state, without the on-disk call index or a pool
+        if no_cache or rebuild_index:
+            display.error("--no-cache and --rebuild-index can't be used with --daemon")
+            raise typer.Exit(1)
+        if stats:
+            display.error("--stats can't be used with --daemon")
+            raise typer.Exit(1)
+        if executor != "auto":
+            display.error("--executor can't be used with --daemon")
+            raise typer.Exit(1)
+        run_via_daemon({
+            "command": "replace-call",
+            "old": old_call,
+            "new": new_call,
+            "path": str(directory.resolve()),
+            "dry_run": dry_run,
+            "exclude": exclude,
+            "include": include,
+            "since": since,
+            "staged": staged,
+            "fsync": fsync,
+        })
+        return
+    from .core.call_replacer import CallRules, replace_call, replace_calls_from_rules
+    from .core.config import load_call_rules
+
+    call_rules = None
+    if rules is not None:
+        try:
+            call_rules = CallRules(load_call_rules(rules))
+        except (OSError, ValueError) as e:
+            display.error(f"Could not load rules: {e}")
+            raise typer.Exit(1)
+
+    options = dict(
+        exclude=exclude, include=include, since=since, staged=staged, fsync=fsync, executor=executor,
+        use_cache=not no_cache, rebuild_index=rebuild_index, stats=stats, shard=shard_spec
+    )
+    with write_command(), output_command(output, dry_run, shard=shard_spec), patch_command(patch_out), \
+            plan_command(plan_out):
+        try:
+            with profile_command(profile, profile_json, profile_top):
+                if call_rules is not None:
+                    modified_count, hits = replace_calls_from_rules(
+                        directory, call_rules, dry_run, workers, **options
+                    )
+                else:
+                    modified_count = replace_call(directory, old_call, new_call, dry_run, workers, **options)
+        except ValueError as e:
+            display.error(str(e))
+            raise typer.Exit(1)
+        if call_rules is not None:
+            display.show_rule_summary(call_rules.pairs, hits)
+        display.info(f"Modified {modified_count} files")
 
 # Register all commands
 for command_class in CommandRegistry.get_all_commands().values():
@@ -2,5 +2,12 @@
 from .base import Command, CommandRegistry, register_command
 from .import_replacer import ImportReplacerCommand
 from .def_mover import DefMoverCommand
+from .daemon import DaemonCommand
+from .apply import ApplyCommand
+from .merge import MergeResultsCommand
+from .apply_plan import ApplyPlanCommand
+from .module_mover import ModuleMoverCommand
 
-__all__ = ['Command', 'CommandRegistry', 'register_command', 'ImportReplacerCommand', 'DefMoverCommand'] 
\ No newline at end of file
+__all__ = ['Command', 'CommandRegistry', 'register_command', 'ImportReplacerCommand', 'DefMoverCommand',
+           'DaemonCommand', 'ApplyCommand', 'MergeResultsCommand', 'ApplyPlanCommand',
+           'ModuleMoverCommand'] 
\ No newline at end of file
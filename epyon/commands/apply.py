@@ -0,0 +1,104 @@
+"""Command for applying a migration plan in a single pass."""
+from pathlib import Path
+from typing import List, Optional
+import typer
+
+from ..core.events import DEFAULT_OUTPUT, OUTPUTS
+from ..core.executor import DEFAULT_EXECUTOR, EXECUTORS
+from ..core.sharding import DEFAULT_SHARD_MODE
+from ..core.writer import DEFAULT_FSYNC, FSYNC_POLICIES
+from ..display import display
+from .base import Command, register_command
+from .output import output_command
+from .patch import patch_command, plan_command
+from .profile import profile_command
+from .shard import shard_option
+from .writes import write_command
+
+@register_command
+class ApplyCommand(Command):
+    """Command to apply definition moves, import replacements and call rules in one pass."""
+
+    name = "apply"
+    help = "Apply a plan of definition moves, import replacements and call rules, parsing each file once"
+
+    def register(self, app: typer.Typer) -> None:
+        """Register the command with the CLI app."""
+
+        @app.command(name=self.name, help=self.help)
+        def apply(
+            plan_file: Path = typer.Argument(..., help="TOML plan with [moves], [imports] and [calls] tables"),
+            path: Path = typer.Argument(Path("."), help="Directory to apply the plan to"),
+            dry_run: bool = typer.Option(False, "--dry-run", help="Show changes without modifying files"),
+            verbose: bool = typer.Option(False, "--verbose", "-v", help="Enable verbose output"),
+            exclude: List[str] = typer.Option([], "--exclude", help="Glob of files or directories to skip (repeatable)"),
+            include: List[str] = typer.Option([], "--include", help="Only process files matching this glob (repeatable)"),
+            since: Optional[str] = typer.Option(None, "--since", help="Only process files changed since this git ref"),
+            staged: bool = typer.Option(False, "--staged", help="Only process files with staged git changes"),
+            fsync: str = typer.Option(
+                DEFAULT_FSYNC, "--fsync", help="Flush rewritten files to disk: none, batch (once at the end) or each"
+            ),
+            executor: str = typer.Option(
+                DEFAULT_EXECUTOR, "--executor", help="Run files serially, on threads or on processes: auto, serial, thread or process"
+            ),
+            workers: Optional[int] = typer.Option(None, "--workers", help="Number of parallel workers (default: CPU count)"),
+            output: str = typer.Option(
+                DEFAULT_OUTPUT, "--output", help="Report results for humans, or as one JSON event per file on stdout: human or jsonl"
+            ),
+            patch_out: Optional[Path] = typer.Option(
+                None, "--patch-out", help="Also write every change to this file as a patch for 'git apply'"
+            ),
+            plan_out: Optional[Path] = typer.Option(
+                None, "--plan-out", help="Also record every change to this file as an edit plan for 'epyon apply-plan'"
+            ),
+            shard: Optional[str] = typer.Option(
+                None, "--shard", help="Only process shard i of N of the files, e.g. 2/4, for splitting a run across machines"
+            ),
+            shard_by: str = typer.Option(
+                DEFAULT_SHARD_MODE, "--shard-by", help="Assign files to shards by a hash of their path, or balanced by size: hash or size"
+            ),
+            profile: bool = typer.Option(False, "--profile", help="Report time spent per phase and the slowest files"),
+            profile_json: Optional[Path] = typer.Option(None, "--profile-json", help="Also write the profile to this JSON file"),
+            profile_top: int = typer.Option(10, "--profile-top", help="Number of slowest files to report"),
+        ) -> None:
+            """Apply a plan of definition moves, import replacements and call rules."""
+            # libcst is only loaded once a command actually runs
+            from ..core.config import load_plan
+            from ..core.pipeline import Plan, apply_plan
+
+            display.verbose = verbose
+            if fsync not in FSYNC_POLICIES:
+                raise typer.BadParameter(f"expected one of {', '.join(FSYNC_POLICIES)}", param_hint="'--fsync'")
+            if executor not in EXECUTORS:
+                raise typer.BadParameter(f"expected one of {', '.join(EXECUTORS)}", param_hint="'--executor'")
+            if output not in OUTPUTS:
+                raise typer.BadParameter(f"expected one of {', '.join(OUTPUTS)}", param_hint="'--output'")
+            shard_spec = shard_option(shard, shard_by)
+
+            if not path.is_dir():
+                display.error(f"Path '{path}' is not a directory")
+                raise typer.Exit(1)
+
+            try:
+                plan = Plan.from_tables(load_plan(plan_file))
+            except (OSError, ValueError) as e:
+                display.error(f"Could not load plan: {e}")
+                raise typer.Exit(1)
+
+            with write_command(), output_command(output, dry_run, shard=shard_spec), patch_command(patch_out), \
+                    plan_command(plan_out):
+                try:
+                    with profile_command(profile, profile_json, profile_top):
+                        report = apply_plan(
+                            path, plan, dry_run, workers,
+                            exclude=exclude, include=include, since=since, staged=staged, fsync=fsync, executor=executor,
+                            shard=shard_spec
+                        )
+                except ValueError as e:
+                    display.error(str(e))
+                    raise typer.Exit(1)
+
+                display.show_plan_summary(report.rows(), report.overlaps, report.errors)
+                display.show_summary(report.modified, report.total, report.skipped)
+                if report.errors:
+                    raise typer.Exit(1)
@@ -0,0 +1,54 @@
+"""Command for applying an edit plan recorded with --plan-out."""
+from pathlib import Path
+import typer
+
+from ..core.writer import DEFAULT_FSYNC, FSYNC_POLICIES
+from ..display import display
+from .base import Command, register_command
+
+@register_command
+class ApplyPlanCommand(Command):
+    """Command to apply recorded edits after checking the files haven't changed."""
+
+    name = "apply-plan"
+    help = "Apply an edit plan written by --plan-out, without parsing any file"
+
+    def register(self, app: typer.Typer) -> None:
+        """Register the command with the CLI app."""
+
+        @app.command(name=self.name, help=self.help)
+        def apply_plan_cmd(
+            plan_file: Path = typer.Argument(..., help="Edit plan written by --plan-out"),
+            dry_run: bool = typer.Option(False, "--dry-run", help="Check the plan still applies without modifying files"),
+            verbose: bool = typer.Option(False, "--verbose", "-v", help="Enable verbose output"),
+            fsync: str = typer.Option(
+                DEFAULT_FSYNC, "--fsync", help="Flush rewritten files to disk: none, batch (once at the end) or each"
+            ),
+        ) -> None:
+            """Apply an edit plan, writing nothing if any of its files has changed."""
+            from ..core.edit_plan import apply_edit_plan, load_edit_plan
+
+            display.verbose = verbose
+            if fsync not in FSYNC_POLICIES:
+                raise typer.BadParameter(f"expected one of {', '.join(FSYNC_POLICIES)}", param_hint="'--fsync'")
+
+            try:
+                edits = load_edit_plan(plan_file)
+            except (OSError, ValueError) as e:
+                display.error(f"Could not load edit plan: {e}")
+                raise typer.Exit(1)
+
+            result = apply_edit_plan(edits, dry_run, fsync)
+            if result.stale:
+                for problem in result.stale:
+                    display.error(problem)
+                display.error(f"{len(result.stale)} of {len(edits)} files no longer match the plan; nothing was written")
+                raise typer.Exit(1)
+            for file_path in sorted(result.files):
+                display.info(f"{'Would modify' if dry_run else 'Writing'} {file_path}")
+            if dry_run:
+                display.success(f"The plan applies cleanly to {len(result.files)} files")
+            else:
+                display.info(f"Modified {len(result.files) - len(result.failed)} files")
+            if result.failed:
+                raise typer.Exit(1)
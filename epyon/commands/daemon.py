@@ -0,0 +1,76 @@
+"""Command for running the epyon daemon, and the client used by other commands."""
+import sys
+from pathlib import Path
+from typing import Any, Dict, Optional
+import typer
+
+from ..display import display
+from .base import Command, register_command
+
+def run_via_daemon(request: Dict[str, Any], socket_path: Optional[Path] = None) -> None:
+    """
+    Send a request to a running daemon and render the events it streams back.
+
+    Args:
+        request: The request to send (command name plus its arguments)
+        socket_path: The daemon's socket (default: see default_socket_path)
+    """
+    from ..core.daemon import send_request
+
+    try:
+        for event in send_request(request, socket_path):
+            kind = event.get("event")
+            if kind == "output":
+                sys.stdout.write(event["text"])
+            elif kind == "error":
+                display.error(event["message"])
+                raise typer.Exit(1)
+            elif kind == "done":
+                if event.get("error"):
+                    raise typer.Exit(1)
+                if request.get("dry_run"):
+                    display.show_dry_run_notice()
+                if request.get("mapping"):
+                    display.show_mapping_summary(request["mapping"], {
+                        old: event.get("matched", {}).get(old, 0) for old in request["mapping"]
+                    })
+                display.show_summary(event["modified"], event["total"], event.get("skipped", 0))
+    except ConnectionError as e:
+        display.error(str(e))
+        raise typer.Exit(1)
+
+@register_command
+class DaemonCommand(Command):
+    """Command to run a long-lived server that keeps parse results warm."""
+    
+    name = "daemon"
+    help = "Run a background server that keeps file lists, imports and parsed modules in memory"
+    
+    def register(self, app: typer.Typer) -> None:
+        """Register the command with the CLI app."""
+        
+        @app.command(name=self.name, help=self.help)
+        def daemon(
+            socket_path: Optional[Path] = typer.Option(None, "--socket", help="Unix socket to listen on"),
+            max_modules: int = typer.Option(4096, "--max-modules", help="Parsed modules to keep in memory"),
+            stop: bool = typer.Option(False, "--stop", help="Stop a running daemon"),
+        ) -> None:
+            """Run the epyon daemon in the foreground until stopped."""
+            from ..core.daemon import default_socket_path, send_request, serve
+
+            socket_path = socket_path or default_socket_path()
+            if stop:
+                try:
+                    list(send_request({"command": "shutdown"}, socket_path))
+                except ConnectionError as e:
+                    display.error(str(e))
+                    raise typer.Exit(1)
+                display.info(f"Stopped daemon on {socket_path}")
+                return
+            
+            display.success(f"Epyon daemon listening on {socket_path}")
+            try:
+                serve(socket_path, max_modules)
+            except RuntimeError as e:
+                display.error(str(e))
+                raise typer.Exit(1)
@@ -1,11 +1,20 @@
 """Command for moving definitions between modules."""
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional
 import typer
 
-from ..core.def_mover import process_file_move, find_module_file, find_python_files
+from ..core.events import DEFAULT_OUTPUT, OUTPUTS, process_one
+from ..core.executor import DEFAULT_EXECUTOR, EXECUTORS, WorkerPool
+from ..core.prefilter import SKIPPED
+from ..core.profiling import file_timer
+from ..core.writer import DEFAULT_FSYNC, FSYNC_POLICIES, FileWriter
 from ..display import display
 from .base import Command, register_command
+from .daemon import run_via_daemon
+from .output import output_command
+from .patch import patch_command, plan_command
+from .profile import profile_command
+from .writes import write_command
 
 @register_command
 class DefMoverCommand(Command):
@@ -24,55 +33,167 @@ class DefMoverCommand(Command):
             path: Path = typer.Argument(..., help="Path to Python file or directory to update imports"),
             dry_run: bool = typer.Option(False, "--dry-run", help="Show changes without modifying files"),
             verbose: bool = typer.Option(False, "--verbose", "-v", help="Enable verbose output"),
+            no_cache: bool = typer.Option(False, "--no-cache", help="Don't read or write the on-disk import index"),
+            rebuild_index: bool = typer.Option(False, "--rebuild-index", help="Rebuild the on-disk import index from scratch"),
+            daemon: bool = typer.Option(False, "--daemon", help="Send the request to a running 'epyon daemon'"),
+            exclude: List[str] = typer.Option([], "--exclude", help="Glob of files or directories to skip (repeatable)"),
+            include: List[str] = typer.Option([], "--include", help="Only process files matching this glob (repeatable)"),
+            since: Optional[str] = typer.Option(None, "--since", help="Only process files changed since this git ref"),
+            staged: bool = typer.Option(False, "--staged", help="Only process files with staged git changes"),
+            fsync: str = typer.Option(
+                DEFAULT_FSYNC, "--fsync", help="Flush rewritten files to disk: none, batch (once at the end) or each"
+            ),
+            executor: str = typer.Option(
+                DEFAULT_EXECUTOR, "--executor", help="Run files serially, on threads or on processes: auto, serial, thread or process"
+            ),
+            workers: Optional[int] = typer.Option(None, "--workers", help="Number of parallel workers (default: CPU count)"),
+            output: str = typer.Option(
+                DEFAULT_OUTPUT, "--output", help="Report results for humans, or as one JSON event per file on stdout: human or jsonl"
+            ),
+            patch_out: Optional[Path] = typer.Option(
+                None, "--patch-out", help="Also write every change to this file as a patch for 'git apply'"
+            ),
+            plan_out: Optional[Path] = typer.Option(
+                None, "--plan-out", help="Also record every change to this file as an edit plan for 'epyon apply-plan'"
+            ),
+            profile: bool = typer.Option(False, "--profile", help="Report time spent per phase and the slowest files"),
+            profile_json: Optional[Path] = typer.Option(None, "--profile-json", help="Also write the profile to this JSON file"),
+            profile_top: int = typer.Option(10, "--profile-top", help="Number of slowest files to report"),
         ) -> None:
             """Move a class or function definition to a different module."""
+            # libcst is only loaded once a command actually runs
+            from ..core.def_mover import defined_in_own_module, find_relevant_files, locate_move, process_file_move
+            from ..core.modules import ModuleIndex
+            from ..core.utils import iter_files_parallel
+            
+            display.verbose = verbose
+            if fsync not in FSYNC_POLICIES:
+                raise typer.BadParameter(f"expected one of {', '.join(FSYNC_POLICIES)}", param_hint="'--fsync'")
+            if executor not in EXECUTORS:
+                raise typer.BadParameter(f"expected one of {', '.join(EXECUTORS)}", param_hint="'--executor'")
+            if output not in OUTPUTS:
+                raise typer.BadParameter(f"expected one of {', '.join(OUTPUTS)}", param_hint="'--output'")
+            
             if not path.exists():
                 display.error(f"Path '{path}' does not exist")
                 raise typer.Exit(1)
             
-            # Find all Python files to process
-            files = [path] if path.is_file() else find_python_files(path)
-            if not files:
-                display.warning(f"No Python files found in {path}")
+            if daemon:
+                if profile or profile_json is not None:
+                    display.error("--profile can't be used with --daemon")
+                    raise typer.Exit(1)
+                if output != DEFAULT_OUTPUT:
+                    display.error("--output can't be used with --daemon")
+                    raise typer.Exit(1)
+                if patch_out is not None:
+                    display.error("--patch-out can't be used with --daemon")
+                    raise typer.Exit(1)
+                if plan_out is not None:
+                    display.error("--plan-out can't be used with --daemon")
+                    raise typer.Exit(1)
+                if not path.is_dir():
+                    display.error("--daemon requires a directory")
+                    raise typer.Exit(1)
+                run_via_daemon({
+                    "command": self.name,
+                    "old": old_path,
+                    "new": new_path,
+                    "path": str(path.resolve()),
+                    "dry_run": dry_run,
+                    "exclude": exclude,
+                    "include": include,
+                    "since": since,
+                    "staged": staged,
+                    "fsync": fsync,
+                    "executor": executor,
+                })
                 return
             
-            # Track changes and the extracted definition
-            modified_count = 0
-            extracted_def = None
+            with write_command(), output_command(output, dry_run), patch_command(patch_out), plan_command(plan_out), \
+                    profile_command(profile, profile_json, profile_top):
+                # One pool serves the import scan and the rewrite, so workers start once
+                with WorkerPool(workers) as pool:
+                    # Find the Python files that define, receive or import the target
+                    source_file = target_file = None
+                    if path.is_file():
+                        files = [path]
+                    else:
+                        try:
+                            modules = None if since is not None or staged else ModuleIndex.scan(path, exclude, include)
+                            files = sorted(find_relevant_files(
+                                path,
+                                old_path,
+                                new_path,
+                                use_cache=not no_cache,
+                                rebuild_index=rebuild_index,
+                                exclude=exclude,
+                                include=include,
+                                since=since,
+                                staged=staged,
+                                executor=executor,
+                                pool=pool,
+                                modules=modules
+                            ))
+                        except ValueError as e:
+                            display.error(str(e))
+                            raise typer.Exit(1)
+                        source_file, target_file = locate_move(path, old_path, new_path, modules)
+                        if source_file is not None and not defined_in_own_module(old_path, source_file, modules):
+                            raise typer.Exit(1)
+                    if not files:
+                        display.warning(f"No Python files found in {path}")
+                        return
             
-            # First pass: find and extract the definition
-            for file_path in files:
-                changes_made, def_node = process_file_move(
-                    file_path,
-                    old_path,
-                    new_path,
-                    extracted_def=None,
-                    dry_run=dry_run
-                )
-                if changes_made:
-                    modified_count += 1
-                if def_node is not None:
-                    extracted_def = def_node
-                    break
+                    # Track changes and the extracted definition
+                    modified_count = 0
+                    extracted_def = None
             
-            if extracted_def is None:
-                display.error(f"Could not find definition for {old_path}")
-                raise typer.Exit(1)
+                    # First pass: extract the definition from its module, or look for it
+                    for file_path in [source_file] if source_file is not None else files:
+                        with file_timer(file_path):
+                            changes_made, def_node = process_one(
+                                file_path,
+                                process_file_move,
+                                old_path,
+                                new_path,
+                                extracted_def=None,
+                                dry_run=dry_run,
+                                source_file=source_file
+                            )
+                        if changes_made:
+                            modified_count += 1
+                        if def_node is not None:
+                            extracted_def = def_node
+                            break
+            
+                    if extracted_def is None:
+                        display.error(f"Could not find definition for {old_path}")
+                        raise typer.Exit(1)
             
-            # Second pass: update imports and add definition to target
-            for file_path in files:
-                changes_made, _ = process_file_move(
-                    file_path,
-                    old_path,
-                    new_path,
-                    extracted_def=extracted_def,
-                    dry_run=dry_run
-                )
-                if changes_made:
-                    modified_count += 1
+                    # Second pass: update imports and add definition to target
+                    skipped_count = 0
+                    with FileWriter(fsync):
+                        for _, result in iter_files_parallel(
+                            files,
+                            process_file_move,
+                            old_path,
+                            new_path,
+                            extracted_def=extracted_def,
+                            dry_run=dry_run,
+                            source_file=source_file,
+                            target_file=target_file,
+                            max_workers=workers,
+                            executor=executor,
+                            pool=pool
+                        ):
+                            changes_made = result[0] if result else None
+                            if changes_made is SKIPPED:
+                                skipped_count += 1
+                            elif changes_made:
+                                modified_count += 1
             
-            # Show summary
-            if dry_run:
-                display.show_dry_run_notice()
+                # Show summary
+                if dry_run:
+                    display.show_dry_run_notice()
             
-            display.show_summary(modified_count, len(files)) 
\ No newline at end of file
+                display.show_summary(modified_count, len(files), skipped_count) 
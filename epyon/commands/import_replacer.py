@@ -1,11 +1,21 @@
 """Import replacement command."""
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional
 import typer
 
-from ..core.import_replacer import process_file, find_python_files
+from ..core.events import DEFAULT_OUTPUT, OUTPUTS
+from ..core.executor import DEFAULT_EXECUTOR, EXECUTORS
+from ..core.prefilter import SKIPPED
+from ..core.sharding import DEFAULT_SHARD_MODE
+from ..core.writer import DEFAULT_FSYNC, FSYNC_POLICIES, FileWriter
 from ..display import display
 from .base import Command, register_command
+from .daemon import run_via_daemon
+from .output import output_command
+from .patch import patch_command, plan_command
+from .profile import profile_command
+from .shard import shard_option
+from .writes import write_command
 
 @register_command
 class ImportReplacerCommand(Command):
@@ -19,39 +29,157 @@ class ImportReplacerCommand(Command):
         
         @app.command(name=self.name, help=self.help)
         def replace_import(
-            old_import: str = typer.Argument(..., help="The import to replace (e.g., 'foo.bar.baz.Class')"),
-            new_import: str = typer.Argument(..., help="The replacement import (e.g., 'new.module.Class')"),
-            path: Path = typer.Argument(..., help="Path to Python file or directory"),
+            old_import: Optional[str] = typer.Argument(None, help="The import to replace (e.g., 'foo.bar.baz.Class')"),
+            new_import: Optional[str] = typer.Argument(None, help="The replacement import (e.g., 'new.module.Class')"),
+            path: Optional[Path] = typer.Argument(None, help="Path to Python file or directory"),
             dry_run: bool = typer.Option(False, "--dry-run", help="Show changes without modifying files"),
             verbose: bool = typer.Option(False, "--verbose", "-v", help="Enable verbose output"),
+            mapping_file: Optional[Path] = typer.Option(
+                None, "--mapping", help="TOML or CSV file of old to new imports to replace in one pass; "
+                "takes only the path as an argument"
+            ),
+            daemon: bool = typer.Option(False, "--daemon", help="Send the request to a running 'epyon daemon'"),
+            exclude: List[str] = typer.Option([], "--exclude", help="Glob of files or directories to skip (repeatable)"),
+            include: List[str] = typer.Option([], "--include", help="Only process files matching this glob (repeatable)"),
+            since: Optional[str] = typer.Option(None, "--since", help="Only process files changed since this git ref"),
+            staged: bool = typer.Option(False, "--staged", help="Only process files with staged git changes"),
+            fsync: str = typer.Option(
+                DEFAULT_FSYNC, "--fsync", help="Flush rewritten files to disk: none, batch (once at the end) or each"
+            ),
+            executor: str = typer.Option(
+                DEFAULT_EXECUTOR, "--executor", help="Run files serially, on threads or on processes: auto, serial, thread or process"
+            ),
+            workers: Optional[int] = typer.Option(None, "--workers", help="Number of parallel workers (default: CPU count)"),
+            output: str = typer.Option(
+                DEFAULT_OUTPUT, "--output", help="Report results for humans, or as one JSON event per file on stdout: human or jsonl"
+            ),
+            patch_out: Optional[Path] = typer.Option(
+                None, "--patch-out", help="Also write every change to this file as a patch for 'git apply'"
+            ),
+            plan_out: Optional[Path] = typer.Option(
+                None, "--plan-out", help="Also record every change to this file as an edit plan for 'epyon apply-plan'"
+            ),
+            shard: Optional[str] = typer.Option(
+                None, "--shard", help="Only process shard i of N of the files, e.g. 2/4, for splitting a run across machines"
+            ),
+            shard_by: str = typer.Option(
+                DEFAULT_SHARD_MODE, "--shard-by", help="Assign files to shards by a hash of their path, or balanced by size: hash or size"
+            ),
+            profile: bool = typer.Option(False, "--profile", help="Report time spent per phase and the slowest files"),
+            profile_json: Optional[Path] = typer.Option(None, "--profile-json", help="Also write the profile to this JSON file"),
+            profile_top: int = typer.Option(10, "--profile-top", help="Number of slowest files to report"),
         ) -> None:
             """Replace imports in Python files."""
+            # libcst is only loaded once a command actually runs
+            from ..core.config import load_import_mapping
+            from ..core.import_replacer import ImportMapping, process_file, process_file_mapping
+            from ..core.utils import find_python_files, iter_files_parallel
+            
+            display.verbose = verbose
+            mapping = None
+            if mapping_file is not None:
+                # With a mapping file the only positional argument is the path
+                if new_import is not None or path is not None:
+                    raise typer.BadParameter("pass only the path when using --mapping", param_hint="'PATH'")
+                path = Path(old_import) if old_import is not None else Path(".")
+                try:
+                    mapping = ImportMapping(load_import_mapping(mapping_file))
+                except (OSError, ValueError) as e:
+                    display.error(f"Could not load mapping: {e}")
+                    raise typer.Exit(1)
+            elif old_import is None or new_import is None or path is None:
+                raise typer.BadParameter("OLD_IMPORT, NEW_IMPORT and PATH are required", param_hint="'PATH'")
+            
+            if fsync not in FSYNC_POLICIES:
+                raise typer.BadParameter(f"expected one of {', '.join(FSYNC_POLICIES)}", param_hint="'--fsync'")
+            if executor not in EXECUTORS:
+                raise typer.BadParameter(f"expected one of {', '.join(EXECUTORS)}", param_hint="'--executor'")
+            if output not in OUTPUTS:
+                raise typer.BadParameter(f"expected one of {', '.join(OUTPUTS)}", param_hint="'--output'")
+            shard_spec = shard_option(shard, shard_by)
+            
             if not path.exists():
                 display.error(f"Path '{path}' does not exist")
                 raise typer.Exit(1)
             
-            # Process a single file
-            if path.is_file():
-                if not str(path).endswith('.py'):
-                    display.error("Path must be a Python file")
+            if path.is_file() and not str(path).endswith('.py'):
+                display.error("Path must be a Python file")
+                raise typer.Exit(1)
+            
+            if daemon:
+                if profile or profile_json is not None:
+                    display.error("--profile can't be used with --daemon")
+                    raise typer.Exit(1)
+                if output != DEFAULT_OUTPUT:
+                    display.error("--output can't be used with --daemon")
+                    raise typer.Exit(1)
+                if patch_out is not None:
+                    display.error("--patch-out can't be used with --daemon")
                     raise typer.Exit(1)
-                files = [path]
-            
-            # Process a directory
-            else:
-                files = find_python_files(path)
-                if not files:
-                    display.warning(f"No Python files found in {path}")
-                    return
-            
-            # Process each file
-            modified_count = 0
-            for file_path in files:
-                if process_file(file_path, old_import, new_import, dry_run):
-                    modified_count += 1
-            
-            # Show summary
-            if dry_run:
-                display.show_dry_run_notice()
-            
-            display.show_summary(modified_count, len(files)) 
\ No newline at end of file
+                if plan_out is not None:
+                    display.error("--plan-out can't be used with --daemon")
+                    raise typer.Exit(1)
+                if shard_spec is not None:
+                    display.error("--shard can't be used with --daemon")
+                    raise typer.Exit(1)
+                run_via_daemon({
+                    "command": self.name,
+                    "old": old_import,
+                    "new": new_import,
+                    "mapping": mapping.pairs if mapping is not None else None,
+                    "path": str(path.resolve()),
+                    "dry_run": dry_run,
+                    "exclude": exclude,
+                    "include": include,
+                    "since": since,
+                    "staged": staged,
+                    "fsync": fsync,
+                })
+                return
+            
+            with write_command(), output_command(output, dry_run, show_diffs=True, shard=shard_spec), \
+                    patch_command(patch_out), plan_command(plan_out), profile_command(profile, profile_json, profile_top):
+                # Process a single file
+                if path.is_file():
+                    files = [path]
+            
+                # Process a directory
+                else:
+                    try:
+                        files = find_python_files(path, exclude, include, since=since, staged=staged)
+                    except ValueError as e:
+                        display.error(str(e))
+                        raise typer.Exit(1)
+                    if not files:
+                        display.warning(f"No Python files found in {path}")
+                        return
+                    if shard_spec is not None:
+                        files = shard_spec.select(files, path)
+            
+                # Process each file
+                modified_count = 0
+                skipped_count = 0
+                file_counts = {old: 0 for old in mapping.pairs} if mapping is not None else {}
+                if mapping is not None:
+                    processor, args = process_file_mapping, (mapping, dry_run)
+                else:
+                    processor, args = process_file, (old_import, new_import, dry_run)
+                with FileWriter(fsync):
+                    for _, result in iter_files_parallel(
+                        files, processor, *args, max_workers=workers, executor=executor
+                    ):
+                        if mapping is not None:
+                            for old in result or ():
+                                file_counts[old] += 1
+                        if result is SKIPPED:
+                            skipped_count += 1
+                        elif result:
+                            modified_count += 1
+            
+                # Show summary
+                if dry_run:
+                    display.show_dry_run_notice()
+            
+                if mapping is not None:
+                    display.show_mapping_summary(mapping.pairs, file_counts)
+                display.show_summary(modified_count, len(files), skipped_count) 
@@ -0,0 +1,60 @@
+"""Command for merging the results of a sharded run."""
+import json
+import sys
+from pathlib import Path
+from typing import List, Optional
+import typer
+
+from ..core.events import DEFAULT_OUTPUT, OUTPUTS
+from ..display import display
+from .base import Command, register_command
+
+@register_command
+class MergeResultsCommand(Command):
+    """Command to combine the JSON results and patches of the shards of a run."""
+
+    name = "merge-results"
+    help = "Combine the --output jsonl results and --patch-out patches of a run split with --shard"
+
+    def register(self, app: typer.Typer) -> None:
+        """Register the command with the CLI app."""
+
+        @app.command(name=self.name, help=self.help)
+        def merge_results_cmd(
+            results: List[Path] = typer.Argument(..., help="The --output jsonl streams of the shards"),
+            patch: List[Path] = typer.Option([], "--patch", help="A shard's --patch-out file (repeatable)"),
+            patch_out: Optional[Path] = typer.Option(None, "--patch-out", help="Write the shards' patches to this file as one patch"),
+            output: str = typer.Option(
+                DEFAULT_OUTPUT, "--output", help="Report the merged results for humans, or as one JSON event stream on stdout: human or jsonl"
+            ),
+        ) -> None:
+            """Combine the results of the shards of a run into one report."""
+            from ..core.sharding import merge_patches, merge_results
+
+            if output not in OUTPUTS:
+                raise typer.BadParameter(f"expected one of {', '.join(OUTPUTS)}", param_hint="'--output'")
+            if patch and patch_out is None:
+                raise typer.BadParameter("--patch needs --patch-out", param_hint="'--patch-out'")
+
+            try:
+                merged = merge_results(results)
+                patched = merge_patches(patch, patch_out) if patch_out is not None else None
+            except (OSError, ValueError) as e:
+                display.error(f"Could not merge results: {e}")
+                raise typer.Exit(1)
+
+            previous_quiet = display.quiet
+            try:
+                if output == "jsonl":
+                    # Problems go to stderr so stdout stays a clean event stream
+                    display.quiet = True
+                    for event in merged.events():
+                        sys.stdout.write(json.dumps(event) + "\n")
+                else:
+                    display.show_merged_results(merged.summaries, merged.summary(), patch_out, patched)
+                for problem in merged.problems:
+                    display.error(problem)
+            finally:
+                display.quiet = previous_quiet
+            if merged.problems:
+                raise typer.Exit(1)
@@ -0,0 +1,82 @@
+"""Command for moving a whole module or package."""
+from pathlib import Path
+from typing import List, Optional
+import typer
+
+from ..core.events import DEFAULT_OUTPUT, OUTPUTS
+from ..core.executor import DEFAULT_EXECUTOR, EXECUTORS
+from ..core.writer import DEFAULT_FSYNC, FSYNC_POLICIES
+from ..display import display
+from .base import Command, register_command
+from .output import output_command
+from .patch import patch_command
+from .profile import profile_command
+from .writes import write_command
+
+@register_command
+class ModuleMoverCommand(Command):
+    """Command to move a module or package and update every import of it."""
+
+    name = "move-module"
+    help = "Move a module or package, rewriting every import of it and of its submodules"
+
+    def register(self, app: typer.Typer) -> None:
+        """Register the command with the CLI app."""
+
+        @app.command(name=self.name, help=self.help)
+        def move_module_cmd(
+            old_module: str = typer.Argument(..., help="The module or package to move (e.g., 'gundam.wing.zero')"),
+            new_module: str = typer.Argument(..., help="Its new name (e.g., 'gundam.ms.zero')"),
+            path: Path = typer.Argument(Path("."), help="Directory to update"),
+            dry_run: bool = typer.Option(False, "--dry-run", help="Show changes without modifying or moving files"),
+            verbose: bool = typer.Option(False, "--verbose", "-v", help="Enable verbose output"),
+            no_cache: bool = typer.Option(False, "--no-cache", help="Don't read or write the on-disk import index"),
+            rebuild_index: bool = typer.Option(False, "--rebuild-index", help="Rebuild the on-disk import index from scratch"),
+            exclude: List[str] = typer.Option([], "--exclude", help="Glob of files or directories to skip (repeatable)"),
+            include: List[str] = typer.Option([], "--include", help="Only process files matching this glob (repeatable)"),
+            fsync: str = typer.Option(
+                DEFAULT_FSYNC, "--fsync", help="Flush rewritten files to disk: none, batch (once at the end) or each"
+            ),
+            executor: str = typer.Option(
+                DEFAULT_EXECUTOR, "--executor", help="Run files serially, on threads or on processes: auto, serial, thread or process"
+            ),
+            workers: Optional[int] = typer.Option(None, "--workers", help="Number of parallel workers (default: CPU count)"),
+            output: str = typer.Option(
+                DEFAULT_OUTPUT, "--output", help="Report results for humans, or as one JSON event per file on stdout: human or jsonl"
+            ),
+            patch_out: Optional[Path] = typer.Option(
+                None, "--patch-out", help="Also write every import change to this file as a patch for 'git apply'"
+            ),
+            profile: bool = typer.Option(False, "--profile", help="Report time spent per phase and the slowest files"),
+            profile_json: Optional[Path] = typer.Option(None, "--profile-json", help="Also write the profile to this JSON file"),
+            profile_top: int = typer.Option(10, "--profile-top", help="Number of slowest files to report"),
+        ) -> None:
+            """Move a module or package and rewrite every import of it."""
+            # libcst is only loaded once a command actually runs
+            from ..core.module_mover import move_module
+
+            display.verbose = verbose
+            if fsync not in FSYNC_POLICIES:
+                raise typer.BadParameter(f"expected one of {', '.join(FSYNC_POLICIES)}", param_hint="'--fsync'")
+            if executor not in EXECUTORS:
+                raise typer.BadParameter(f"expected one of {', '.join(EXECUTORS)}", param_hint="'--executor'")
+            if output not in OUTPUTS:
+                raise typer.BadParameter(f"expected one of {', '.join(OUTPUTS)}", param_hint="'--output'")
+
+            if not path.is_dir():
+                display.error(f"Path '{path}' is not a directory")
+                raise typer.Exit(1)
+
+            with write_command(), output_command(output, dry_run), patch_command(patch_out):
+                try:
+                    with profile_command(profile, profile_json, profile_top):
+                        result = move_module(
+                            path, old_module, new_module, dry_run, workers,
+                            exclude=exclude, include=include, fsync=fsync, executor=executor,
+                            use_cache=not no_cache, rebuild_index=rebuild_index
+                        )
+                except ValueError as e:
+                    display.error(str(e))
+                    raise typer.Exit(1)
+
+                display.show_summary(result.modified, result.total, result.skipped)
@@ -0,0 +1,47 @@
+"""Shared --output handling for commands."""
+import sys
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from ..core.edits import handling_edits
+from ..core.events import EventCollector
+from ..core.sharding import Shard
+from ..display import display, redirect_output
+
+@contextmanager
+def output_command(
+    output: str, dry_run: bool = False, show_diffs: bool = False, shard: Optional[Shard] = None
+) -> Iterator[Optional[EventCollector]]:
+    """
+    Route the results of the command run inside the block.
+
+    With "jsonl", stdout carries one JSON event per file and a closing
+    summary event, per-file console messages are dropped, and everything
+    else meant for humans (warnings, errors, summaries, profiles) goes to
+    stderr. With "human", None is yielded and, if show_diffs is set, the
+    changes made are shown as diffs as they come in.
+
+    Args:
+        output: The --output value
+        dry_run: Whether the command was run with --dry-run, for the summary
+        show_diffs: Whether human output includes a diff of every change
+        shard: The --shard this run is, recorded in the summary
+    """
+    if output != "jsonl":
+        if not show_diffs:
+            yield None
+            return
+        with handling_edits(display.show_edit):
+            yield None
+        return
+    stdout = sys.stdout
+    previous_quiet, display.quiet = display.quiet, True
+    try:
+        with redirect_output(sys.stderr), EventCollector(stdout) as collector:
+            try:
+                yield collector
+            finally:
+                fields = {"shard": str(shard)} if shard is not None else {}
+                collector.summary(dry_run=dry_run, **fields)
+    finally:
+        display.quiet = previous_quiet
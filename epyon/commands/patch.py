@@ -0,0 +1,37 @@
+"""Shared --patch-out and --plan-out handling for commands."""
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional
+
+from ..core.edits import EditPlanWriter, PatchWriter
+from ..display import display
+
+@contextmanager
+def patch_command(path: Optional[Path]) -> Iterator[None]:
+    """
+    Write the changes made by the command run inside the block to a patch file.
+
+    Args:
+        path: The --patch-out file, or None to write no patch
+    """
+    if path is None:
+        yield
+        return
+    with PatchWriter(path) as patch:
+        yield
+    display.info(f"Wrote a patch for {len(patch.edits)} files to {path}")
+
+@contextmanager
+def plan_command(path: Optional[Path]) -> Iterator[None]:
+    """
+    Record the changes made by the command run inside the block as an edit plan.
+
+    Args:
+        path: The --plan-out file, or None to record no plan
+    """
+    if path is None:
+        yield
+        return
+    with EditPlanWriter(path) as plan:
+        yield
+    display.info(f"Wrote an edit plan for {len(plan.edits)} files to {path}; apply it with 'epyon apply-plan {path}'")
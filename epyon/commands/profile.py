@@ -0,0 +1,26 @@
+"""Shared --profile handling for commands."""
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional
+
+from ..core.profiling import profiling
+from ..display import display
+
+@contextmanager
+def profile_command(enabled: bool, json_path: Optional[Path] = None, slowest: int = 10) -> Iterator[None]:
+    """
+    Profile the command run inside the block, then report the results.
+
+    Args:
+        enabled: Whether --profile was passed
+        json_path: Also write the profile to this file (implies enabled)
+        slowest: Number of slowest files to list
+    """
+    with profiling(enabled or json_path is not None) as profile:
+        yield
+    if profile is None:
+        return
+    display.show_profile(profile, slowest)
+    if json_path is not None:
+        profile.write_json(json_path, slowest)
+        display.info(f"Wrote profile to {json_path}")
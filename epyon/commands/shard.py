@@ -0,0 +1,24 @@
+"""Shared --shard handling for commands."""
+from typing import Optional
+import typer
+
+from ..core.sharding import SHARD_MODES, Shard, parse_shard
+
+def shard_option(shard: Optional[str], shard_by: str) -> Optional[Shard]:
+    """
+    Validate the --shard and --shard-by values of a command.
+
+    Returns:
+        The shard this run is, or None to process every file
+
+    Raises:
+        typer.BadParameter: If either value is invalid
+    """
+    if shard_by not in SHARD_MODES:
+        raise typer.BadParameter(f"expected one of {', '.join(SHARD_MODES)}", param_hint="'--shard-by'")
+    if shard is None:
+        return None
+    try:
+        return parse_shard(shard, shard_by)
+    except ValueError as e:
+        raise typer.BadParameter(str(e), param_hint="'--shard'")
@@ -0,0 +1,22 @@
+"""Shared handling of files a command could not write."""
+from contextlib import contextmanager
+from typing import Iterator
+
+import typer
+
+from ..core.writer import watching_failures
+from ..display import display
+
+@contextmanager
+def write_command() -> Iterator[None]:
+    """
+    Exit with status 1 if any file rewritten inside the block could not be written.
+
+    Each failure has already been reported by the writer; this adds a
+    closing count so the run doesn't look successful.
+    """
+    with watching_failures() as failures:
+        yield
+    if failures:
+        display.error(f"{len(failures)} files could not be written")
+        raise typer.Exit(1)
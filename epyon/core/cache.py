@@ -0,0 +1,143 @@
+"""Persistent on-disk cache for the import and call-chain index."""
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+# Bump this whenever the layout of the cache or the scanner output changes
+CACHE_VERSION = 2
+
+# Environment variable that overrides the cache location
+CACHE_DIR_ENV = "EPYON_CACHE_DIR"
+DEFAULT_CACHE_DIR = ".epyon_cache"
+
+# Files modified this close to the start of a scan can change again without
+# their mtime moving, so they are always re-hashed on the next run
+RACY_WINDOW_NS = 2_000_000_000
+
+class IndexEntry(NamedTuple):
+    """Cached scan result for a single file."""
+    mtime_ns: int
+    size: int
+    hash: str
+    imports: List[str]
+    # Dotted attribute-call chain (e.g. 'self.client.get') to the lines calling it
+    calls: Dict[str, List[int]]
+
+def get_cache_dir(directory: Path) -> Path:
+    """Return the cache directory for a project root."""
+    override = os.environ.get(CACHE_DIR_ENV)
+    if override:
+        return Path(override)
+    return directory / DEFAULT_CACHE_DIR
+
+def hash_content(data: bytes) -> str:
+    """Return a short content hash for file data."""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+class ImportIndexCache:
+    """
+    Persistent map of file path to the imports and call chains found in that file.
+
+    Entries are keyed by path relative to the project root and validated
+    against the file's mtime and size. When those differ the content hash
+    decides whether the file really needs to be scanned again.
+    """
+
+    def __init__(self, directory: Path, cache_dir: Optional[Path] = None):
+        """
+        Initialize the cache for a project root.
+
+        Args:
+            directory: Root directory being indexed
+            cache_dir: Where to store the index (default: see get_cache_dir)
+        """
+        self.root = Path(os.path.abspath(directory))
+        self.cache_dir = cache_dir if cache_dir is not None else get_cache_dir(directory)
+        root_key = hashlib.blake2b(str(self.root).encode(), digest_size=6).hexdigest()
+        self.path = self.cache_dir / f"import_index-{root_key}.json"
+        self.entries: Dict[str, IndexEntry] = {}
+        self.started_ns = time.time_ns()
+        self.dirty = False
+
+    def _key(self, file_path: Path) -> str:
+        """Return the cache key for a file."""
+        absolute = Path(os.path.abspath(file_path))
+        try:
+            return absolute.relative_to(self.root).as_posix()
+        except ValueError:
+            return absolute.as_posix()
+
+    def load(self) -> None:
+        """Load the index from disk, discarding it if it is unreadable or outdated."""
+        self.entries = {}
+        self.dirty = False
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                payload = json.load(f)
+        except (OSError, ValueError):
+            return
+
+        if payload.get("version") != CACHE_VERSION or payload.get("root") != str(self.root):
+            return
+
+        for key, entry in payload.get("files", {}).items():
+            try:
+                self.entries[key] = IndexEntry(*entry)
+            except TypeError:
+                continue
+
+    def save(self) -> None:
+        """Atomically write the index to disk if it changed."""
+        if not self.dirty:
+            return
+        payload = {
+            "version": CACHE_VERSION,
+            "root": str(self.root),
+            "files": {key: list(entry) for key, entry in self.entries.items()},
+        }
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(payload, f, separators=(',', ':'))
+            os.replace(tmp_path, self.path)
+            self.dirty = False
+        except OSError:
+            # The cache is an optimization; failing to persist it is not an error
+            pass
+
+    def get(self, file_path: Path) -> Optional[IndexEntry]:
+        """Return the cached entry for a file, if any."""
+        return self.entries.get(self._key(file_path))
+
+    def lookup(self, file_path: Path, stat: os.stat_result) -> Optional[IndexEntry]:
+        """Return the cached entry if the file's mtime and size are unchanged."""
+        entry = self.get(file_path)
+        if entry is not None and entry.mtime_ns == stat.st_mtime_ns and entry.size == stat.st_size:
+            return entry
+        return None
+
+    def put(
+        self,
+        file_path: Path,
+        stat: os.stat_result,
+        digest: str,
+        imports: Iterable[str],
+        calls: Optional[Dict[str, List[int]]] = None
+    ) -> None:
+        """Store the scan result for a file."""
+        mtime_ns = stat.st_mtime_ns
+        if mtime_ns >= self.started_ns - RACY_WINDOW_NS:
+            mtime_ns = -1
+        self.entries[self._key(file_path)] = IndexEntry(mtime_ns, stat.st_size, digest, sorted(imports), calls or {})
+        self.dirty = True
+
+    def retain(self, file_paths: Iterable[Path]) -> None:
+        """Drop entries for files that no longer exist in the tree."""
+        keep = {self._key(file_path) for file_path in file_paths}
+        if len(keep) != len(self.entries) or not keep.issuperset(self.entries):
+            self.entries = {key: entry for key, entry in self.entries.items() if key in keep}
+            self.dirty = True
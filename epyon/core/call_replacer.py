@@ -2,13 +2,20 @@
 import libcst as cst
 from libcst import matchers as m
 from pathlib import Path
-from typing import List, Tuple, Optional
+from typing import Dict, List, Tuple, Optional, Sequence
 
 from ..display import display
-from .utils import find_python_files, process_files_parallel
+from .edits import edit_made, edits_wanted
+from .events import note, recording
+from .prefilter import SKIPPED, Prefilter, call_path, call_tail, get_prefilter
+from .sharding import Shard
+from .profiling import phase
+from .executor import DEFAULT_EXECUTOR
+from .writer import DEFAULT_FSYNC, FileWriter, write_file
+from .utils import build_call_index, find_python_files, process_files_parallel
 
-class CallReplacer(cst.CSTTransformer):
-    """Replace a function call with another function call."""
+class CallRule:
+    """One old to new call pattern, parsed for matching against Call nodes."""
     
     def __init__(self, old_call: str, new_call: str):
         """
@@ -20,7 +27,6 @@ class CallReplacer(cst.CSTTransformer):
         """
         self.old_call = old_call
         self.new_call = new_call
-        self.changes_made = False
         
         # Parse the call strings to get components
         self._parse_call_strings()
@@ -56,35 +62,14 @@ class CallReplacer(cst.CSTTransformer):
         
         self.new_method = self.new_parts[-1]
     
-    def leave_Call(self, original_node: cst.Call, updated_node: cst.Call) -> cst.Call:
-        """Process a call expression, replacing it if it matches the target."""
-        if self._matches_target_call(original_node):
-            replacement = self._create_replacement_call(original_node)
-            self.changes_made = True
-            return replacement
-        return updated_node
-    
-    def _matches_target_call(self, node: cst.Call) -> bool:
-        """Check if a Call node matches our target function call."""
-        # Check if it's a simple attribute access or a more complex call
-        if not isinstance(node.func, cst.Attribute):
-            return False
-        
-        # Extract the attribute chain
-        current = node.func
-        parts = [current.attr.value]
-        
-        while isinstance(current.value, cst.Attribute):
-            current = current.value
-            parts.append(current.attr.value)
-        
-        # Check the base name
-        if not isinstance(current.value, cst.Name):
-            return False
-        
-        parts.append(current.value.value)
-        parts.reverse()
+    def matches(self, node: cst.Call, parts: List[str]) -> bool:
+        """
+        Check if a Call node matches this rule.
         
+        Args:
+            node: The call to check
+            parts: The call's attribute chain (e.g., ['self', 'client', 'get'])
+        """
         # Compare attribute chain with our target parts
         if parts != self.old_parts:
             return False
@@ -129,7 +114,7 @@ class CallReplacer(cst.CSTTransformer):
         # Add more types as needed
         return str(node)
     
-    def _create_replacement_call(self, original_node: cst.Call) -> cst.Call:
+    def replacement(self, original_node: cst.Call) -> cst.Call:
         """Create a replacement Call node."""
         # Start building from the innermost name
         updated_func = cst.Name(value=self.new_parts[0])
@@ -152,6 +137,133 @@ class CallReplacer(cst.CSTTransformer):
         # Otherwise just replace the function name but keep original args
         return original_node.with_changes(func=updated_func)
 
+class CallRules:
+    """A set of call rules in a dispatch table keyed by the final attribute name."""
+    
+    def __init__(self, pairs: Dict[str, str]):
+        """
+        Initialize the rules.
+        
+        Args:
+            pairs: Dict mapping old call patterns to new ones, in the order
+                they are tried (e.g., {'self.assertEquals': 'self.assertEqual'})
+        """
+        self.pairs = dict(pairs)
+        self.dispatch: Dict[str, List[CallRule]] = {}
+        for old_call, new_call in self.pairs.items():
+            rule = CallRule(old_call, new_call)
+            self.dispatch.setdefault(rule.old_method, []).append(rule)
+        self.chains = sorted({call_path(old_call) for old_call in self.pairs})
+        self.prefilter = Prefilter(self.dispatch)
+    
+    def __len__(self) -> int:
+        return len(self.pairs)
+
+def _call_parts(node: cst.Attribute) -> Optional[List[str]]:
+    """Return the names in an attribute chain rooted at a name, or None for any other chain."""
+    parts = [node.attr.value]
+    current = node
+    while isinstance(current.value, cst.Attribute):
+        current = current.value
+        parts.append(current.attr.value)
+    if not isinstance(current.value, cst.Name):
+        return None
+    parts.append(current.value.value)
+    parts.reverse()
+    return parts
+
+class CallReplacer(cst.CSTTransformer):
+    """Replace a function call with another function call."""
+    
+    def __init__(self, old_call: str, new_call: str, rules: Optional[CallRules] = None):
+        """
+        Initialize with the old and new function call strings.
+        
+        Args:
+            old_call: String representation of the old function call (e.g., "self.assert_401_UNAUTHORIZED")
+            new_call: String representation of the new function call (e.g., "self.assert_403_FORBIDDEN")
+            rules: Apply every rule in this set instead of a single call
+        """
+        if rules is None:
+            rules = CallRules({old_call: new_call})
+        self.rules = rules
+        self.old_call = old_call
+        self.new_call = new_call
+        self.changes_made = False
+        self.replacements = 0
+        # Old call pattern to the number of calls it replaced
+        self.hits: Dict[str, int] = {}
+        # (applied rule, other matching rule) to the number of calls both matched
+        self.overlaps: Dict[Tuple[str, str], int] = {}
+    
+    @classmethod
+    def from_rules(cls, rules: CallRules) -> "CallReplacer":
+        """Create a transformer that applies every rule in a set in one pass."""
+        return cls("", "", rules=rules)
+    
+    def leave_Call(self, original_node: cst.Call, updated_node: cst.Call) -> cst.Call:
+        """Process a call expression, replacing it if it matches a rule."""
+        # Only attribute calls can match, and only rules ending in the same attribute
+        if not isinstance(original_node.func, cst.Attribute):
+            return updated_node
+        candidates = self.rules.dispatch.get(original_node.func.attr.value)
+        if not candidates:
+            return updated_node
+        parts = _call_parts(original_node.func)
+        if parts is None:
+            return updated_node
+        
+        for index, rule in enumerate(candidates):
+            if rule.matches(original_node, parts):
+                self.changes_made = True
+                self.replacements += 1
+                self.hits[rule.old_call] = self.hits.get(rule.old_call, 0) + 1
+                # The first matching rule wins; note any later ones it shadowed
+                for other in candidates[index + 1:]:
+                    if other.matches(original_node, parts):
+                        key = (rule.old_call, other.old_call)
+                        self.overlaps[key] = self.overlaps.get(key, 0) + 1
+                return rule.replacement(original_node)
+        return updated_node
+
+def _transform_file(
+    file_path: Path,
+    transformer: CallReplacer,
+    prefilter: Prefilter,
+    dry_run: bool
+) -> bool:
+    """Run a call transformer over a file, reporting and writing any changes."""
+    with phase("read"), open(file_path, 'r', encoding='utf-8') as f:
+        source_code = f.read()
+    note(before=source_code)
+
+    # Files that never mention a called attribute can't match
+    with phase("prefilter"):
+        if not prefilter.matches(source_code):
+            return SKIPPED
+
+    with phase("parse"):
+        module = cst.parse_module(source_code)
+    with phase("transform"):
+        modified_module = module.visit(transformer)
+    
+    if transformer.changes_made:
+        note(matches=transformer.replacements)
+        # A dry run only needs the new code to describe it in an event or a patch
+        if not dry_run or recording() or edits_wanted():
+            with phase("codegen"):
+                modified_code = modified_module.code
+            note(after=modified_code)
+            edit_made(file_path, source_code, modified_code)
+        if not dry_run:
+            write_file(file_path, modified_code)
+            display.success(f"Updated calls in {file_path}")
+        else:
+            display.info(f"Would update calls in {file_path}")
+        return True
+    
+    return False
+
 def process_file_call(
     file_path: Path,
     old_call: str,
@@ -168,70 +280,237 @@ def process_file_call(
         dry_run: If True, don't modify the file
     
     Returns:
-        bool: Whether changes were made
+        bool: Whether changes were made (SKIPPED if the prefilter ruled the
+        file out without parsing it)
     """
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            source_code = f.read()
-
-        module = cst.parse_module(source_code)
         transformer = CallReplacer(old_call, new_call)
-        modified_module = module.visit(transformer)
-        
-        if transformer.changes_made:
-            if not dry_run:
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    f.write(modified_module.code)
-                display.success(f"Updated calls in {file_path}")
-            else:
-                display.info(f"Would update calls in {file_path}")
-            return True
-        
-        return False
+        return _transform_file(file_path, transformer, get_prefilter(call_tail(old_call)), dry_run)
 
     except Exception as e:
+        note(error=str(e))
         display.error(f"Error processing {file_path}: {str(e)}")
         return False
 
+def process_file_rules(file_path: Path, rules: CallRules, dry_run: bool = False) -> Dict[str, int]:
+    """
+    Process a single Python file, applying every rule in a set.
+    
+    Args:
+        file_path: Path to the Python file
+        rules: The call rules to apply
+        dry_run: If True, don't modify the file
+    
+    Returns:
+        Dict[str, int]: Old call pattern to the number of calls it replaced
+        in this file (SKIPPED if the prefilter ruled the file out without
+        parsing it)
+    """
+    try:
+        transformer = CallReplacer.from_rules(rules)
+        if _transform_file(file_path, transformer, rules.prefilter, dry_run) is SKIPPED:
+            return SKIPPED
+        return transformer.hits
+
+    except Exception as e:
+        note(error=str(e))
+        display.error(f"Error processing {file_path}: {str(e)}")
+        return {}
+
+def _find_candidates(
+    directory: Path,
+    chains: Sequence[str],
+    max_workers: Optional[int],
+    exclude: Sequence[str],
+    include: Sequence[str],
+    since: Optional[str],
+    staged: bool,
+    executor: str,
+    use_cache: bool,
+    rebuild_index: bool,
+    stats: bool,
+    label: str,
+    shard: Optional[Shard] = None
+) -> Tuple[List[Path], List[Path]]:
+    """
+    Return the Python files under a directory and those the call index lists as calling any chain.
+    
+    With a shard only the candidates belonging to it are returned; every
+    shard indexes the whole tree, so all of them agree on the candidates.
+    
+    Returns:
+        Tuple of (all Python files, candidate files); both empty if there
+        are no Python files
+    """
+    python_files = find_python_files(directory, exclude, include, since=since, staged=staged)
+    if not python_files:
+        display.warning(f"No Python files found in {directory}")
+        return [], []
+    
+    call_index = build_call_index(
+        directory,
+        max_workers,
+        use_cache=use_cache,
+        rebuild=rebuild_index,
+        files=python_files,
+        since=since,
+        staged=staged,
+        executor=executor
+    )
+    call_sites: Dict[Path, int] = {}
+    for chain in chains:
+        for file_path, lines in call_index.get(chain, {}).items():
+            call_sites[file_path] = call_sites.get(file_path, 0) + len(lines)
+    candidates = [file_path for file_path in python_files if file_path in call_sites]
+    if stats:
+        display.show_call_stats(label, len(candidates), len(python_files), sum(call_sites.values()))
+    if shard is not None:
+        candidates = shard.select(candidates, directory)
+    
+    display.info(f"Searching {len(candidates)} of {len(python_files)} files")
+    return python_files, candidates
+
 def replace_call(
     directory: Path,
     old_call: str,
     new_call: str,
     dry_run: bool = False,
-    max_workers: int = None
+    max_workers: int = None,
+    exclude: Sequence[str] = (),
+    include: Sequence[str] = (),
+    since: Optional[str] = None,
+    staged: bool = False,
+    fsync: str = DEFAULT_FSYNC,
+    executor: str = DEFAULT_EXECUTOR,
+    use_cache: bool = True,
+    rebuild_index: bool = False,
+    stats: bool = False,
+    shard: Optional[Shard] = None
 ) -> int:
     """
     Replace function calls across Python files in a directory.
     
+    Only the files the call-chain index lists as calling old_call's exact
+    chain are parsed with libcst (see utils.build_call_index).
+    
     Args:
         directory: Root directory to process
         old_call: Original function call pattern (e.g., "self.assert_401_UNAUTHORIZED")
         new_call: New function call pattern (e.g., "self.assert_403_FORBIDDEN")
         dry_run: If True, don't modify files
         max_workers: Maximum number of parallel workers
+        exclude: Extra globs of files or directories to skip
+        include: If given, only process files matching one of these globs
+        since: Only process files changed since this git ref
+        staged: Only process files with staged changes
+        fsync: When to flush rewritten files to disk (see writer.FSYNC_POLICIES)
+        executor: How to run the batch (see executor.EXECUTORS); "auto" picks by size
+        use_cache: If False, neither read nor write the on-disk index
+        rebuild_index: If True, rebuild the on-disk index from scratch
+        stats: If True, report how far the index narrowed the search
+        shard: Only process the files belonging to this shard of the run
     
     Returns:
         int: Number of files modified
     """
-    python_files = find_python_files(directory)
+    chain = call_path(old_call)
+    python_files, candidates = _find_candidates(
+        directory, [chain], max_workers, exclude, include, since, staged, executor,
+        use_cache, rebuild_index, stats, label=chain, shard=shard
+    )
     if not python_files:
-        display.warning(f"No Python files found in {directory}")
         return 0
     
-    display.info(f"Searching {len(python_files)} files")
+    # Rewritten files are committed by a writer thread while workers keep parsing
+    with FileWriter(fsync):
+        results = process_files_parallel(
+            candidates,
+            process_file_call,
+            old_call,
+            new_call,
+            dry_run=dry_run,
+            max_workers=max_workers,
+            executor=executor
+        )
+    
+    modified_count = sum(1 for r in results if r)
+    display.show_skipped(sum(1 for r in results if r is SKIPPED), len(candidates))
+    
+    if dry_run:
+        display.show_dry_run_notice()
     
-    results = process_files_parallel(
-        python_files,
-        process_file_call,
-        old_call,
-        new_call,
-        dry_run=dry_run,
-        max_workers=max_workers
+    return modified_count
+
+def replace_calls_from_rules(
+    directory: Path,
+    rules: CallRules,
+    dry_run: bool = False,
+    max_workers: int = None,
+    exclude: Sequence[str] = (),
+    include: Sequence[str] = (),
+    since: Optional[str] = None,
+    staged: bool = False,
+    fsync: str = DEFAULT_FSYNC,
+    executor: str = DEFAULT_EXECUTOR,
+    use_cache: bool = True,
+    rebuild_index: bool = False,
+    stats: bool = False,
+    shard: Optional[Shard] = None
+) -> Tuple[int, Dict[str, int]]:
+    """
+    Apply every rule in a set across Python files, parsing each file once.
+    
+    Only the files the call-chain index lists as calling one of the rules'
+    chains are parsed, and each call is matched with one lookup in the
+    rules' dispatch table.
+    
+    Args:
+        directory: Root directory to process
+        rules: The call rules to apply
+        dry_run: If True, don't modify files
+        max_workers: Maximum number of parallel workers
+        exclude: Extra globs of files or directories to skip
+        include: If given, only process files matching one of these globs
+        since: Only process files changed since this git ref
+        staged: Only process files with staged changes
+        fsync: When to flush rewritten files to disk (see writer.FSYNC_POLICIES)
+        executor: How to run the batch (see executor.EXECUTORS); "auto" picks by size
+        use_cache: If False, neither read nor write the on-disk index
+        rebuild_index: If True, rebuild the on-disk index from scratch
+        stats: If True, report how far the index narrowed the search
+        shard: Only process the files belonging to this shard of the run
+    
+    Returns:
+        Tuple of (number of files modified, dict of old call pattern to the
+        number of calls it replaced)
+    """
+    hits = {old_call: 0 for old_call in rules.pairs}
+    python_files, candidates = _find_candidates(
+        directory, rules.chains, max_workers, exclude, include, since, staged, executor,
+        use_cache, rebuild_index, stats, label=f"any of {len(rules.chains)} chains", shard=shard
     )
+    if not python_files:
+        return 0, hits
     
-    modified_count = sum(1 for r in results if r)
+    with FileWriter(fsync):
+        results = process_files_parallel(
+            candidates,
+            process_file_rules,
+            rules,
+            dry_run=dry_run,
+            max_workers=max_workers,
+            executor=executor
+        )
+    
+    modified_count = 0
+    for file_hits in results:
+        if file_hits:
+            modified_count += 1
+            for old_call, count in file_hits.items():
+                hits[old_call] += count
+    display.show_skipped(sum(1 for r in results if r is SKIPPED), len(candidates))
     
     if dry_run:
         display.show_dry_run_notice()
     
-    return modified_count 
\ No newline at end of file
+    return modified_count, hits
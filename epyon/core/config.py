@@ -0,0 +1,175 @@
+"""Loading of mapping and configuration files."""
+import csv
+import sys
+from pathlib import Path
+from typing import Any, Dict
+
+if sys.version_info >= (3, 11):
+    import tomllib
+else:
+    import tomli as tomllib
+
+def load_toml(path: Path) -> Dict[str, Any]:
+    """
+    Load a TOML file.
+
+    Raises:
+        ValueError: If the file is not valid TOML
+    """
+    try:
+        with open(path, 'rb') as f:
+            return tomllib.load(f)
+    except tomllib.TOMLDecodeError as e:
+        raise ValueError(f"Invalid TOML in {path}: {e}") from e
+
+def _check_import_path(import_path: str, source: str) -> str:
+    """Validate that an import path names a symbol inside a module."""
+    import_path = import_path.strip()
+    if '.' not in import_path or '' in import_path.split('.'):
+        raise ValueError(f"{source}: '{import_path}' is not a dotted import path like 'module.Name'")
+    return import_path
+
+def load_import_mapping(path: Path) -> Dict[str, str]:
+    """
+    Load old to new import pairs from a TOML or CSV file.
+
+    TOML files list the pairs in an [imports] table:
+
+        [imports]
+        "gundam.wing.zero.WingZero" = "gundam.wing.custom.WingZeroCustom"
+
+    CSV files have two columns, old and new, with an optional header row.
+
+    Args:
+        path: Path to a .toml or .csv file
+
+    Returns:
+        Dict mapping old import paths to new import paths
+
+    Raises:
+        ValueError: If the file is malformed or maps one import to two targets
+    """
+    mapping: Dict[str, str] = {}
+
+    def add(old_import: str, new_import: str, source: str) -> None:
+        old_import = _check_import_path(old_import, source)
+        new_import = _check_import_path(new_import, source)
+        if mapping.get(old_import, new_import) != new_import:
+            raise ValueError(f"{source}: '{old_import}' is mapped to more than one import")
+        mapping[old_import] = new_import
+
+    suffix = path.suffix.lower()
+    if suffix == '.toml':
+        imports = load_toml(path).get('imports')
+        if not isinstance(imports, dict):
+            raise ValueError(f"{path}: expected an [imports] table of old = new pairs")
+        for old_import, new_import in imports.items():
+            if not isinstance(new_import, str):
+                raise ValueError(f"{path}: the value for '{old_import}' must be a string")
+            add(old_import, new_import, str(path))
+    elif suffix == '.csv':
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            for line_number, row in enumerate(csv.reader(f), start=1):
+                if not row or row[0].strip().startswith('#'):
+                    continue
+                if line_number == 1 and [cell.strip().lower() for cell in row] == ['old', 'new']:
+                    continue
+                if len(row) != 2:
+                    raise ValueError(f"{path}:{line_number}: expected two columns, old and new")
+                add(row[0], row[1], f"{path}:{line_number}")
+    else:
+        raise ValueError(f"{path}: mapping files must end in .toml or .csv")
+
+    return mapping
+
+def _check_call_pattern(call: str, source: str) -> str:
+    """Validate that a call pattern is an attribute chain rooted at a name."""
+    call = call.strip()
+    parts = call.split('(', 1)[0].split('.')
+    if len(parts) < 2 or not all(part.isidentifier() for part in parts):
+        raise ValueError(f"{source}: '{call}' is not an attribute call like 'self.method'")
+    return call
+
+def load_call_rules(path: Path) -> Dict[str, str]:
+    """
+    Load old to new call patterns from a TOML file.
+
+    The patterns are listed in a [calls] table, in the order they are tried:
+
+        [calls]
+        "self.assert_401_UNAUTHORIZED" = "self.assert_403_FORBIDDEN"
+        "self.assertEquals" = "self.assertEqual"
+
+    Args:
+        path: Path to a .toml file
+
+    Returns:
+        Dict mapping old call patterns to new call patterns
+
+    Raises:
+        ValueError: If the file is malformed or a pattern isn't an attribute call
+    """
+    if path.suffix.lower() != '.toml':
+        raise ValueError(f"{path}: rules files must end in .toml")
+    calls = load_toml(path).get('calls')
+    if not isinstance(calls, dict) or not calls:
+        raise ValueError(f"{path}: expected a [calls] table of old = new patterns")
+
+    rules: Dict[str, str] = {}
+    for old_call, new_call in calls.items():
+        if not isinstance(new_call, str):
+            raise ValueError(f"{path}: the value for '{old_call}' must be a string")
+        old_call = _check_call_pattern(old_call, str(path))
+        if old_call in rules:
+            raise ValueError(f"{path}: '{old_call}' is listed more than once")
+        rules[old_call] = _check_call_pattern(new_call, str(path))
+    return rules
+
+# The tables a plan may contain, in the order their rules are applied
+PLAN_TABLES = ('moves', 'imports', 'calls')
+
+def load_plan(path: Path) -> Dict[str, Dict[str, str]]:
+    """
+    Load a migration plan of definition moves, import replacements and call rules.
+
+    Each table lists old = new pairs and any of them may be left out:
+
+        [moves]
+        "gundam.wing.zero.WingZero" = "gundam.wing.custom.WingZero"
+
+        [imports]
+        "gundam.wing.epyon.BeamSaber" = "gundam.wing.tallgeese.BeamSaber"
+
+        [calls]
+        "self.assert_401_UNAUTHORIZED" = "self.assert_403_FORBIDDEN"
+
+    Args:
+        path: Path to a .toml file
+
+    Returns:
+        Dict with a 'moves', 'imports' and 'calls' dict of old to new pairs each
+
+    Raises:
+        ValueError: If the file is malformed, has unknown tables or no rules
+    """
+    if path.suffix.lower() != '.toml':
+        raise ValueError(f"{path}: plan files must end in .toml")
+    document = load_toml(path)
+    unknown = sorted(set(document) - set(PLAN_TABLES))
+    if unknown:
+        raise ValueError(f"{path}: unknown table [{unknown[0]}]; expected {', '.join(PLAN_TABLES)}")
+
+    plan: Dict[str, Dict[str, str]] = {}
+    for table in PLAN_TABLES:
+        pairs = document.get(table, {})
+        if not isinstance(pairs, dict):
+            raise ValueError(f"{path}: expected a [{table}] table of old = new pairs")
+        check = _check_call_pattern if table == 'calls' else _check_import_path
+        plan[table] = {}
+        for old, new in pairs.items():
+            if not isinstance(new, str):
+                raise ValueError(f"{path}: the value for '{old}' must be a string")
+            plan[table][check(old, str(path))] = check(new, str(path))
+    if not any(plan.values()):
+        raise ValueError(f"{path}: the plan has no rules")
+    return plan
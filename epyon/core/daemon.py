@@ -0,0 +1,457 @@
+"""Long-running daemon that keeps discovery, import and parse results warm."""
+import json
+import os
+import socket
+import tempfile
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+import libcst as cst
+
+from ..display import display, redirect_output
+from .cache import ImportIndexCache, RACY_WINDOW_NS
+from .call_replacer import CallReplacer
+from .discovery import git_changed_files, iter_python_files
+from .def_mover import defined_in_own_module, find_relevant_files, locate_move, process_file_move
+from .executor import DEFAULT_EXECUTOR
+from .import_map import ImportMap
+from .import_replacer import ImportMapping, ImportReplacer
+from .modules import ModuleIndex
+from .prefilter import SKIPPED, Prefilter, call_tail, get_prefilter
+from .utils import build_import_map
+from .writer import DEFAULT_FSYNC, FileWriter, write_file
+
+# Environment variable that overrides the socket location
+SOCKET_ENV = "EPYON_SOCKET"
+DEFAULT_MAX_MODULES = 4096
+
+Emit = Callable[[Dict[str, Any]], None]
+
+def default_socket_path() -> Path:
+    """Return the socket path the daemon and its clients use by default."""
+    override = os.environ.get(SOCKET_ENV)
+    if override:
+        return Path(override)
+    uid = os.getuid() if hasattr(os, "getuid") else 0
+    return Path(tempfile.gettempdir()) / f"epyon-{uid}.sock"
+
+class _CachedModule(NamedTuple):
+    """Source text and parsed module for a file at a given mtime and size."""
+    mtime_ns: int
+    size: int
+    source: str
+    module: Optional[cst.Module]
+
+class ModuleCache:
+    """LRU cache of file sources and their parsed modules, validated by mtime and size."""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_MODULES):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries: Number of files to keep before evicting the least recently used
+        """
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Path, _CachedModule]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _fresh(self, file_path: Path) -> Optional[_CachedModule]:
+        """Return the cached entry if the file hasn't changed on disk."""
+        entry = self._entries.get(file_path)
+        if entry is None:
+            return None
+        stat = os.stat(file_path)
+        if entry.mtime_ns != stat.st_mtime_ns or entry.size != stat.st_size:
+            del self._entries[file_path]
+            return None
+        self._entries.move_to_end(file_path)
+        return entry
+
+    def _store(self, file_path: Path, source: str, module: Optional[cst.Module]) -> None:
+        """Cache a file's content unless it was modified too recently to trust its mtime."""
+        stat = os.stat(file_path)
+        if stat.st_mtime_ns >= time.time_ns() - RACY_WINDOW_NS:
+            # The file could still change without its mtime moving
+            self._entries.pop(file_path, None)
+            return
+        self._entries[file_path] = _CachedModule(stat.st_mtime_ns, stat.st_size, source, module)
+        self._entries.move_to_end(file_path)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def read(self, file_path: Path) -> str:
+        """Return the source text of a file."""
+        entry = self._fresh(file_path)
+        if entry is not None:
+            return entry.source
+        with open(file_path, 'r', encoding='utf-8') as f:
+            source = f.read()
+        self._store(file_path, source, None)
+        return source
+
+    def parse(self, file_path: Path) -> cst.Module:
+        """Return the parsed module for a file."""
+        entry = self._fresh(file_path)
+        if entry is not None and entry.module is not None:
+            self.hits += 1
+            return entry.module
+        self.misses += 1
+        source = entry.source if entry is not None else self.read(file_path)
+        module = cst.parse_module(source)
+        self._store(file_path, source, module)
+        return module
+
+    def update(self, file_path: Path, module: cst.Module) -> None:
+        """Record a module that was just written back to disk."""
+        self._store(file_path, module.code, module)
+
+class _ProjectState(NamedTuple):
+    """Discovered files of a project root and the mtimes of its directories."""
+    files: List[Path]
+    dir_mtimes: Dict[str, int]
+
+class DaemonState:
+    """Everything the daemon keeps warm between requests."""
+
+    def __init__(self, max_modules: int = DEFAULT_MAX_MODULES):
+        self.modules = ModuleCache(max_modules)
+        self._projects: Dict[Tuple[Path, Tuple[str, ...], Tuple[str, ...]], _ProjectState] = {}
+        self._indexes: Dict[Path, ImportIndexCache] = {}
+        self._module_indexes: Dict[Tuple[Path, Tuple[str, ...], Tuple[str, ...]], Tuple[List[Path], ModuleIndex]] = {}
+
+    def files(self, directory: Path, exclude: Sequence[str] = (), include: Sequence[str] = ()) -> List[Path]:
+        """
+        Return the Python files under a directory.
+
+        The file list is reused as long as no directory in the tree or
+        .gitignore file has changed, which costs a couple of stats per
+        directory instead of a full walk.
+        """
+        key = (directory, tuple(exclude), tuple(include))
+        project = self._projects.get(key)
+        if project is not None and all(
+            _dir_mtime(path) == mtime for path, mtime in project.dir_mtimes.items()
+        ):
+            return project.files
+
+        dir_mtimes = {}
+
+        def record(path: str) -> None:
+            dir_mtimes[path] = _dir_mtime(path)
+            gitignore = os.path.join(path, '.gitignore')
+            dir_mtimes[gitignore] = _dir_mtime(gitignore)
+
+        files = list(iter_python_files(directory, exclude, include, on_directory=record))
+        self._projects[key] = _ProjectState(files, dir_mtimes)
+        return files
+
+    def import_map(
+        self,
+        directory: Path,
+        exclude: Sequence[str] = (),
+        include: Sequence[str] = (),
+        executor: str = DEFAULT_EXECUTOR
+    ) -> ImportMap:
+        """Return the import map for a directory, reusing the in-memory index."""
+        cache = self._indexes.get(directory)
+        if cache is None:
+            cache = ImportIndexCache(directory)
+            cache.load()
+            self._indexes[directory] = cache
+        return build_import_map(
+            directory, files=self.files(directory, exclude, include), cache=cache, executor=executor
+        )
+
+    def module_index(self, directory: Path, exclude: Sequence[str] = (), include: Sequence[str] = ()) -> ModuleIndex:
+        """Return the module index for a directory, rebuilt only when its file list is."""
+        files = self.files(directory, exclude, include)
+        key = (directory, tuple(exclude), tuple(include))
+        cached = self._module_indexes.get(key)
+        if cached is None or cached[0] is not files:
+            cached = self._module_indexes[key] = (files, ModuleIndex(directory, files))
+        return cached[1]
+
+def _dir_mtime(path: str) -> int:
+    """Return a path's mtime, or -1 if it doesn't exist."""
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return -1
+
+def _rewrite_files(
+    state: DaemonState,
+    files: List[Path],
+    make_transformer: Callable[[], cst.CSTTransformer],
+    prefilter: Prefilter,
+    dry_run: bool,
+    emit: Emit,
+    fsync: str = DEFAULT_FSYNC
+) -> Dict[str, Any]:
+    """Run a transformer over files using the warm module cache."""
+    modified = []
+    skipped = 0
+    matched: Dict[str, int] = {}
+    written: List[Tuple[Path, cst.Module]] = []
+    with FileWriter(fsync) as writer:
+        for file_path in files:
+            try:
+                if not prefilter.matches(state.modules.read(file_path)):
+                    skipped += 1
+                    continue
+                module = state.modules.parse(file_path)
+                transformer = make_transformer()
+                modified_module = module.visit(transformer)
+                if not transformer.changes_made:
+                    continue
+
+                display.show_diff(module.code, modified_module.code, file_path)
+                if not dry_run:
+                    write_file(file_path, modified_module.code)
+                    written.append((file_path, modified_module))
+                    display.success(f"Updated {file_path}")
+                modified.append(str(file_path))
+                for old_import in getattr(transformer, "matched", ()):
+                    matched[old_import] = matched.get(old_import, 0) + 1
+                emit({"event": "file", "path": str(file_path)})
+            except Exception as e:
+                display.error(f"Error processing {file_path}: {str(e)}")
+
+    # Only cache what actually reached the disk
+    for file_path, modified_module in written:
+        if file_path not in writer.failed:
+            state.modules.update(file_path, modified_module)
+
+    return {"modified": len(modified), "total": len(files), "skipped": skipped, "matched": matched}
+
+def _files_for(state: DaemonState, request: Dict[str, Any]) -> List[Path]:
+    """Return the files a request applies to."""
+    path = Path(request["path"])
+    if path.is_file():
+        return [path]
+    if request.get("since") is not None or request.get("staged"):
+        return git_changed_files(
+            path, request.get("since"), request.get("staged", False),
+            request.get("exclude", ()), request.get("include", ())
+        )
+    return state.files(path, request.get("exclude", ()), request.get("include", ()))
+
+def _handle_replace_import(state: DaemonState, request: Dict[str, Any], emit: Emit) -> Dict[str, Any]:
+    """Handle a replace-import request."""
+    files = _files_for(state, request)
+    if request.get("mapping"):
+        mapping = ImportMapping(request["mapping"])
+        return _rewrite_files(
+            state, files, lambda: ImportReplacer.from_mapping(mapping),
+            mapping.prefilter, request.get("dry_run", False), emit,
+            request.get("fsync", DEFAULT_FSYNC)
+        )
+
+    old_import, new_import = request["old"], request["new"]
+    return _rewrite_files(
+        state, files, lambda: ImportReplacer(old_import, new_import),
+        get_prefilter(old_import.split('.')[-1]), request.get("dry_run", False), emit,
+        request.get("fsync", DEFAULT_FSYNC)
+    )
+
+def _handle_replace_call(state: DaemonState, request: Dict[str, Any], emit: Emit) -> Dict[str, Any]:
+    """Handle a replace-call request."""
+    files = _files_for(state, request)
+    old_call, new_call = request["old"], request["new"]
+    return _rewrite_files(
+        state, files, lambda: CallReplacer(old_call, new_call),
+        get_prefilter(call_tail(old_call)), request.get("dry_run", False), emit,
+        request.get("fsync", DEFAULT_FSYNC)
+    )
+
+def _handle_move_def(state: DaemonState, request: Dict[str, Any], emit: Emit) -> Dict[str, Any]:
+    """Handle a move-def request using the warm import map."""
+    directory = Path(request["path"])
+    old_path, new_path = request["old"], request["new"]
+    dry_run = request.get("dry_run", False)
+
+    exclude, include = request.get("exclude", ()), request.get("include", ())
+    since, staged = request.get("since"), request.get("staged", False)
+    executor = request.get("executor", DEFAULT_EXECUTOR)
+    if since is not None or staged:
+        # Only the changed files are considered, so the warm map isn't needed
+        modules = None
+        files = sorted(find_relevant_files(
+            directory, old_path, new_path, exclude=exclude, include=include, since=since, staged=staged,
+            executor=executor
+        ))
+    else:
+        modules = state.module_index(directory, exclude, include)
+        files = sorted(find_relevant_files(
+            directory, old_path, new_path, import_map=state.import_map(directory, exclude, include, executor),
+            modules=modules
+        ))
+    source_file, target_file = locate_move(directory, old_path, new_path, modules)
+    if source_file is None:
+        display.error(f"Could not find source module for {old_path}")
+        return {"modified": 0, "total": len(files), "skipped": 0, "error": True}
+    if not defined_in_own_module(old_path, source_file, modules):
+        return {"modified": 0, "total": len(files), "skipped": 0, "error": True}
+
+    changes_made, extracted_def = process_file_move(
+        source_file, old_path, new_path, dry_run=dry_run, source_file=source_file
+    )
+    if extracted_def is None:
+        display.error(f"Could not find definition for {old_path}")
+        return {"modified": 0, "total": len(files), "skipped": 0, "error": True}
+
+    modified = 1 if changes_made else 0
+    skipped = 0
+    with FileWriter(request.get("fsync", DEFAULT_FSYNC)):
+        for file_path in files:
+            changes_made, _ = process_file_move(
+                file_path, old_path, new_path, extracted_def=extracted_def, dry_run=dry_run,
+                source_file=source_file, target_file=target_file
+            )
+            if changes_made is SKIPPED:
+                skipped += 1
+            elif changes_made:
+                modified += 1
+            emit({"event": "file", "path": str(file_path)})
+    return {"modified": modified, "total": len(files), "skipped": skipped}
+
+HANDLERS: Dict[str, Callable[[DaemonState, Dict[str, Any], Emit], Dict[str, Any]]] = {
+    "replace-import": _handle_replace_import,
+    "replace-call": _handle_replace_call,
+    "move-def": _handle_move_def,
+}
+
+class _OutputStream:
+    """File-like object that forwards console output to the client as events."""
+
+    def __init__(self, emit: Emit):
+        self._emit = emit
+
+    def write(self, text: str) -> int:
+        if text:
+            self._emit({"event": "output", "text": text})
+        return len(text)
+
+    def flush(self) -> None:
+        pass
+
+    def isatty(self) -> bool:
+        return False
+
+def handle_request(state: DaemonState, request: Dict[str, Any], emit: Emit) -> bool:
+    """
+    Handle one request, streaming events through emit.
+
+    Console output produced while handling the request is sent to the client
+    instead of the daemon's own terminal.
+
+    Returns:
+        bool: False if the daemon should shut down
+    """
+    command = request.get("command")
+    if command == "shutdown":
+        emit({"event": "done", "shutdown": True})
+        return False
+    if command == "ping":
+        emit({"event": "done", "modules": len(state.modules)})
+        return True
+
+    handler = HANDLERS.get(command)
+    if handler is None:
+        emit({"event": "error", "message": f"Unknown command '{command}'"})
+        return True
+
+    try:
+        with redirect_output(_OutputStream(emit)):
+            summary = handler(state, request, emit)
+    except Exception as e:
+        emit({"event": "error", "message": str(e)})
+        return True
+    emit({"event": "done", **summary})
+    return True
+
+def serve(socket_path: Optional[Path] = None, max_modules: int = DEFAULT_MAX_MODULES) -> None:
+    """
+    Serve requests on a Unix socket until a shutdown request arrives.
+
+    Requests are handled one at a time, so the warm state never needs locking.
+
+    Args:
+        socket_path: Where to listen (default: see default_socket_path)
+        max_modules: Number of parsed modules to keep in memory
+    """
+    socket_path = socket_path or default_socket_path()
+    if socket_path.exists():
+        if _is_listening(socket_path):
+            raise RuntimeError(f"An epyon daemon is already listening on {socket_path}")
+        socket_path.unlink()
+
+    state = DaemonState(max_modules)
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    old_umask = os.umask(0o177)
+    try:
+        server.bind(str(socket_path))
+    finally:
+        os.umask(old_umask)
+    server.listen()
+
+    try:
+        running = True
+        while running:
+            connection, _ = server.accept()
+            with connection, connection.makefile('rwb') as stream:
+                def emit(event: Dict[str, Any]) -> None:
+                    stream.write(json.dumps(event).encode() + b'\n')
+                    stream.flush()
+
+                try:
+                    line = stream.readline()
+                    if not line:
+                        continue
+                    running = handle_request(state, json.loads(line), emit)
+                except (OSError, ValueError):
+                    # A client that disconnects or sends garbage doesn't stop the daemon
+                    continue
+    finally:
+        server.close()
+        socket_path.unlink()
+
+def _is_listening(socket_path: Path) -> bool:
+    """Return True if something accepts connections on the socket."""
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(str(socket_path))
+        return True
+    except OSError:
+        return False
+    finally:
+        probe.close()
+
+def send_request(request: Dict[str, Any], socket_path: Optional[Path] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Send a request to the daemon and yield its events as they arrive.
+
+    Raises:
+        ConnectionError: If no daemon is listening on the socket
+    """
+    socket_path = socket_path or default_socket_path()
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        client.connect(str(socket_path))
+    except OSError as e:
+        client.close()
+        raise ConnectionError(
+            f"No epyon daemon is listening on {socket_path}; start one with 'epyon daemon'"
+        ) from e
+
+    with client, client.makefile('rwb') as stream:
+        stream.write(json.dumps(request).encode() + b'\n')
+        stream.flush()
+        for line in stream:
+            yield json.loads(line)
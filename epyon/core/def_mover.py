@@ -1,10 +1,19 @@
 """Core functionality for moving definitions between modules."""
 import libcst as cst
 from libcst import matchers as m
-from typing import Tuple, List, Optional, Set
+from typing import Tuple, List, Optional, Sequence, Set
 from pathlib import Path
+import os
 
 from ..display import display
+from .edits import edit_made, edits_wanted
+from .events import note, process_one, recording
+from .prefilter import SKIPPED, get_prefilter
+from .profiling import phase
+from .executor import DEFAULT_EXECUTOR, WorkerPool
+from .import_map import ImportMap
+from .modules import ModuleIndex, find_module_file
+from .writer import DEFAULT_FSYNC, FileWriter, write_file
 from .utils import find_python_files, build_import_map, process_files_parallel
 
 class DefinitionExtractor(cst.CSTTransformer):
@@ -32,17 +41,42 @@ class DefinitionExtractor(cst.CSTTransformer):
             return cst.RemoveFromParent()
         return updated_node
 
-def _split_import(import_path: str) -> Tuple[str, str]:
+def split_import(import_path: str) -> Tuple[str, str]:
     """Split an import path into module and name parts."""
     parts = import_path.split('.')
     return '.'.join(parts[:-1]), parts[-1]
 
+def _same_file(file_path: Path, other: Optional[Path]) -> bool:
+    """Return True if two paths name the same file."""
+    return other is not None and os.path.abspath(file_path) == os.path.abspath(other)
+
+def add_definition(module: cst.Module, definition: cst.CSTNode) -> cst.Module:
+    """Return the module with a definition appended to the end of its body."""
+    new_body = list(module.body)
+    new_body.append(cst.EmptyLine())
+    new_body.append(definition)
+    return module.with_changes(body=new_body)
+
+def write_module(file_path: Path, source_code: str, module: cst.Module, dry_run: bool = False) -> None:
+    """Generate a module's code and write it back to its file, unless this is a dry run."""
+    # A dry run only needs the new code to describe it in an event or a patch
+    if dry_run and not (recording() or edits_wanted()):
+        return
+    with phase("codegen"):
+        code = module.code
+    note(after=code)
+    edit_made(file_path, source_code, code)
+    if not dry_run:
+        write_file(file_path, code)
+
 def process_file_move(
     file_path: Path,
     old_path: str,
     new_path: str,
     extracted_def: Optional[cst.CSTNode] = None,
-    dry_run: bool = False
+    dry_run: bool = False,
+    source_file: Optional[Path] = None,
+    target_file: Optional[Path] = None
 ) -> Tuple[bool, Optional[cst.CSTNode]]:
     """
     Process a single Python file for the move-def operation.
@@ -53,101 +87,216 @@ def process_file_move(
         new_path: The new import path (e.g., 'lorem.ipsum.Baz')
         extracted_def: The definition to add (if this is the target file)
         dry_run: If True, don't modify the file
+        source_file: The file defining old_path, as found by a ModuleIndex
+        target_file: The file of new_path's module, as found by a ModuleIndex;
+            if neither is given, both are guessed from file_path
         
     Returns:
-        Tuple[bool, Optional[cst.CSTNode]]: (changes_made, extracted_definition)
+        Tuple[bool, Optional[cst.CSTNode]]: (changes_made, extracted_definition);
+        changes_made is SKIPPED if the prefilter ruled the file out
     """
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
+        with phase("read"), open(file_path, 'r', encoding='utf-8') as f:
             source_code = f.read()
+        note(before=source_code)
 
-        module = cst.parse_module(source_code)
-        old_module, name = _split_import(old_path)
-        new_module, new_name = _split_import(new_path)
+        old_module, name = split_import(old_path)
+        new_module, new_name = split_import(new_path)
+        if source_file is not None or target_file is not None:
+            is_source = extracted_def is None and _same_file(file_path, source_file)
+            is_target = extracted_def is not None and _same_file(file_path, target_file)
+        else:
+            module_name = str(file_path).replace('/', '.')
+            is_source = extracted_def is None and module_name.endswith(old_module + '.py')
+            is_target = extracted_def is not None and module_name.endswith(new_module + '.py')
+        
+        # Importers that never mention the moved name can't need updating
+        with phase("prefilter"):
+            if not (is_source or is_target) and not get_prefilter(name).matches(source_code):
+                return SKIPPED, None
+        
+        with phase("parse"):
+            module = cst.parse_module(source_code)
         
         # If this is the source file, extract the definition
-        if extracted_def is None and str(file_path).replace('/', '.').endswith(old_module + '.py'):
-            extractor = DefinitionExtractor(name)
-            modified_module = module.visit(extractor)
+        if is_source:
+            with phase("transform"):
+                extractor = DefinitionExtractor(name)
+                modified_module = module.visit(extractor)
             if extractor.found:
                 display.info(f"Found definition of {name} in {file_path}")
                 extracted_def = extractor.extracted_node
                 
+                write_module(file_path, source_code, modified_module, dry_run)
                 if not dry_run:
-                    with open(file_path, 'w', encoding='utf-8') as f:
-                        f.write(modified_module.code)
                     display.success(f"Removed definition from {file_path}")
                 return True, extracted_def
         
         # If this is the target file, add the definition
-        elif extracted_def is not None and str(file_path).replace('/', '.').endswith(new_module + '.py'):
+        elif is_target:
             # Add the definition to the module
-            new_body = list(module.body)
-            new_body.append(cst.EmptyLine())
-            new_body.append(extracted_def)
-            modified_module = module.with_changes(body=new_body)
+            with phase("transform"):
+                modified_module = add_definition(module, extracted_def)
             
+            write_module(file_path, source_code, modified_module, dry_run)
             if not dry_run:
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    f.write(modified_module.code)
                 display.success(f"Added definition to {file_path}")
             return True, None
         
         # Update imports in all files
         if extracted_def is not None:
+            # On a dry run the source file still holds the definition the first
+            # pass removed; start from that removal so this edit follows its edit
+            if source_file is not None and _same_file(file_path, source_file):
+                with phase("transform"):
+                    extractor = DefinitionExtractor(name)
+                    removed_module = module.visit(extractor)
+                if extractor.found:
+                    module = removed_module
+                    source_code = module.code
+
             # Use the ImportReplacer to update imports
             from .import_replacer import ImportReplacer
-            transformer = ImportReplacer(old_path, new_path)
-            modified_module = module.visit(transformer)
+            with phase("transform"):
+                transformer = ImportReplacer(old_path, new_path)
+                modified_module = module.visit(transformer)
             
             if transformer.changes_made:
+                write_module(file_path, source_code, modified_module, dry_run)
                 if not dry_run:
-                    with open(file_path, 'w', encoding='utf-8') as f:
-                        f.write(modified_module.code)
                     display.success(f"Updated imports in {file_path}")
                 return True, None
         
         return False, None
 
     except Exception as e:
+        note(error=str(e))
         display.error(f"Error processing {file_path}: {str(e)}")
         return False, None
 
-def find_module_file(module_path: str, search_path: Path) -> Optional[Path]:
-    """Find a Python file corresponding to a module path."""
-    file_path = search_path / (module_path.replace('.', '/') + '.py')
-    return file_path if file_path.exists() else None
-
-def find_relevant_files(directory: Path, old_path: str) -> Set[Path]:
+def find_relevant_files(
+    directory: Path,
+    old_path: str,
+    new_path: Optional[str] = None,
+    use_cache: bool = True,
+    rebuild_index: bool = False,
+    import_map: Optional[ImportMap] = None,
+    exclude: Sequence[str] = (),
+    include: Sequence[str] = (),
+    since: Optional[str] = None,
+    staged: bool = False,
+    executor: str = DEFAULT_EXECUTOR,
+    pool: Optional[WorkerPool] = None,
+    modules: Optional[ModuleIndex] = None
+) -> Set[Path]:
     """
     Find files that are likely to contain the definition or its imports.
-    Uses ast for fast import scanning.
+    Uses ast for fast import scanning, backed by the on-disk import index.
+    
+    Args:
+        directory: Root directory to process
+        old_path: Original import path (e.g., 'foo.bar.Baz')
+        new_path: New import path; if given, the target module file is included
+        use_cache: If False, bypass the on-disk import index
+        rebuild_index: If True, rebuild the import index from scratch
+        import_map: A prebuilt import map to use instead of building one
+        exclude: Extra globs of files or directories to skip
+        include: If given, only consider files matching one of these globs
+        since: Only consider files changed since this git ref
+        staged: Only consider files with staged changes
+        executor: How to run the import scan (see executor.EXECUTORS)
+        pool: A shared process pool for the import scan
+        modules: A module index of the whole tree; built from the same file
+            listing as the import map if not given
     """
+    # One listing of the tree serves both the module index and the import map
+    tree_files = None
+    if since is None and not staged and (import_map is None or modules is None):
+        if modules is None:
+            modules = ModuleIndex(directory, find_python_files(directory, exclude, include))
+        tree_files = modules.files
+    
     # Build a map of imports to files
-    import_map = build_import_map(directory)
+    if import_map is None:
+        import_map = build_import_map(
+            directory,
+            use_cache=use_cache,
+            rebuild=rebuild_index,
+            files=tree_files,
+            exclude=exclude,
+            include=include,
+            since=since,
+            staged=staged,
+            executor=executor,
+            pool=pool
+        )
     
     # Find files that import the target
     relevant_files = set()
-    old_module, name = _split_import(old_path)
+    old_module, name = split_import(old_path)
     
-    # Add files that import the module or the specific name
-    for import_path, files in import_map.items():
-        if import_path == old_path or import_path == old_module:
-            relevant_files.update(files)
+    # Add files that import the name, any module on its path (which reach it
+    # as e.g. old_module.name) or anything inside it
+    relevant_files.update(import_map.files_reaching(old_path))
     
     # Add the source and target module files
-    source_file = find_module_file(old_module, directory)
-    if source_file:
-        relevant_files.add(source_file)
+    old_module_file = modules.module_file(old_module) if modules else find_module_file(old_module, directory)
+    source_file, target_file = locate_move(directory, old_path, new_path, modules)
+    relevant_files.update(
+        file_path for file_path in (old_module_file, source_file, target_file) if file_path is not None
+    )
     
     return relevant_files
 
+def defined_in_own_module(old_path: str, source_file: Path, modules: Optional[ModuleIndex]) -> bool:
+    """Report an error if old_path is only re-exported by its module, e.g. a package's __init__.py."""
+    old_module, name = split_import(old_path)
+    if modules is None or source_file == modules.module_file(old_module):
+        return True
+    defining_module = modules.module_of(source_file) or source_file
+    display.error(f"{old_path} is imported into {old_module} from {defining_module}; move {defining_module}.{name} instead")
+    return False
+
+def locate_move(
+    directory: Path,
+    old_path: str,
+    new_path: Optional[str] = None,
+    modules: Optional[ModuleIndex] = None
+) -> Tuple[Optional[Path], Optional[Path]]:
+    """
+    Find the file a definition is moved out of and the one it is moved into.
+    
+    With a module index the source is the file that actually defines
+    old_path, following re-exports, and packages and src layouts are
+    understood; without one the module files are probed on disk.
+    
+    Returns:
+        Tuple of (source_file, target_file); either is None if not found
+    """
+    old_module, _ = split_import(old_path)
+    new_module = split_import(new_path)[0] if new_path is not None else None
+    if modules is None:
+        source_file = find_module_file(old_module, directory)
+        target_file = find_module_file(new_module, directory) if new_module is not None else None
+    else:
+        source_file = modules.definition_file(old_path) or modules.module_file(old_module)
+        target_file = modules.module_file(new_module) if new_module is not None else None
+    return source_file, target_file
+
 def move_definition(
     directory: Path,
     old_path: str,
     new_path: str,
     dry_run: bool = False,
-    max_workers: Optional[int] = None
+    max_workers: Optional[int] = None,
+    use_cache: bool = True,
+    rebuild_index: bool = False,
+    exclude: Sequence[str] = (),
+    include: Sequence[str] = (),
+    since: Optional[str] = None,
+    staged: bool = False,
+    fsync: str = DEFAULT_FSYNC,
+    executor: str = DEFAULT_EXECUTOR
 ) -> int:
     """
     Move a class or function definition between modules.
@@ -159,50 +308,83 @@ def move_definition(
         new_path: New import path (e.g., 'lorem.ipsum.Baz')
         dry_run: If True, don't modify files
         max_workers: Maximum number of parallel workers
+        use_cache: If False, bypass the on-disk import index
+        rebuild_index: If True, rebuild the import index from scratch
+        exclude: Extra globs of files or directories to skip
+        include: If given, only consider files matching one of these globs
+        since: Only consider files changed since this git ref
+        staged: Only consider files with staged changes
+        fsync: When to flush rewritten files to disk (see writer.FSYNC_POLICIES)
+        executor: How to run the batch (see executor.EXECUTORS); "auto" picks by size
     
     Returns:
         int: Number of files modified
     """
-    # Find relevant files
-    display.info("Scanning for relevant files...")
-    files = list(find_relevant_files(directory, old_path))
-    if not files:
-        display.warning(f"No Python files found that use {old_path}")
-        return 0
-    
-    display.info(f"Found {len(files)} relevant files")
-    
-    # First pass: extract the definition
-    extracted_def = None
-    old_module, name = _split_import(old_path)
-    source_file = find_module_file(old_module, directory)
-    
-    if source_file:
-        changes_made, extracted_def = process_file_move(
-            source_file,
+    # One pool serves the import scan and the rewrite, so workers start once
+    with WorkerPool(max_workers) as pool:
+        # Find relevant files
+        display.info("Scanning for relevant files...")
+        modules = None if since is not None or staged else ModuleIndex.scan(directory, exclude, include)
+        files = sorted(find_relevant_files(
+            directory,
             old_path,
             new_path,
-            dry_run=dry_run
-        )
-        if not extracted_def:
-            display.error(f"Could not find definition for {old_path}")
+            use_cache=use_cache,
+            rebuild_index=rebuild_index,
+            exclude=exclude,
+            include=include,
+            since=since,
+            staged=staged,
+            executor=executor,
+            pool=pool,
+            modules=modules
+        ))
+        if not files:
+            display.warning(f"No Python files found that use {old_path}")
             return 0
-    else:
-        display.error(f"Could not find source module for {old_path}")
-        return 0
-    
-    # Second pass: update imports in parallel
-    results = process_files_parallel(
-        files,
-        process_file_move,
-        old_path,
-        new_path,
-        extracted_def=extracted_def,
-        dry_run=dry_run,
-        max_workers=max_workers
-    )
+        
+        display.info(f"Found {len(files)} relevant files")
+        
+        # First pass: extract the definition
+        extracted_def = None
+        source_file, target_file = locate_move(directory, old_path, new_path, modules)
+        
+        if source_file:
+            if not defined_in_own_module(old_path, source_file, modules):
+                return 0
+            changes_made, extracted_def = process_one(
+                source_file,
+                process_file_move,
+                old_path,
+                new_path,
+                dry_run=dry_run,
+                source_file=source_file
+            )
+            if not extracted_def:
+                display.error(f"Could not find definition for {old_path}")
+                return 0
+        else:
+            display.error(f"Could not find source module for {old_path}")
+            return 0
+        
+        # Second pass: update imports in parallel
+        with FileWriter(fsync):
+            results = process_files_parallel(
+                files,
+                process_file_move,
+                old_path,
+                new_path,
+                extracted_def=extracted_def,
+                dry_run=dry_run,
+                source_file=source_file,
+                target_file=target_file,
+                max_workers=max_workers,
+                executor=executor,
+                pool=pool
+            )
     
-    modified_count = sum(1 for r in results if r)
+    modified_count = sum(1 for r in results if r and r[0])
+    display.show_skipped(sum(1 for r in results if r and r[0] is SKIPPED), len(files))
     
     if dry_run:
         display.show_dry_run_notice()
@@ -0,0 +1,366 @@
+"""Discovery of the Python files a command should process."""
+import os
+import re
+import subprocess
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Iterator, List, NamedTuple, Optional, Pattern, Sequence, Set, Tuple
+
+from .config import load_toml
+
+# Directories that never contain code worth refactoring. Build output only
+# counts at the top of the walk: a package may well be called 'build'
+DEFAULT_EXCLUDES = (
+    ".git",
+    ".hg",
+    ".svn",
+    ".venv",
+    "venv",
+    ".tox",
+    ".nox",
+    "node_modules",
+    "/build",
+    "/dist",
+    "site-packages",
+    "__pycache__",
+    ".mypy_cache",
+    ".pytest_cache",
+    ".ruff_cache",
+    ".epyon_cache",
+    "*.egg-info",
+)
+
+@lru_cache(maxsize=1024)
+def _glob_to_regex(pattern: str) -> Pattern[str]:
+    """
+    Translate a gitignore-style glob into a regex over '/'-separated paths.
+
+    '*' and '?' never cross a '/', while '**' matches any number of
+    directories.
+    """
+    i = 0
+    regex = ''
+    while i < len(pattern):
+        char = pattern[i]
+        if pattern.startswith('**/', i):
+            regex += '(?:.*/)?'
+            i += 3
+            continue
+        if pattern.startswith('**', i):
+            regex += '.*'
+            i += 2
+            continue
+        if char == '*':
+            regex += '[^/]*'
+        elif char == '?':
+            regex += '[^/]'
+        elif char == '[':
+            end = pattern.find(']', i + 1)
+            if end == -1:
+                regex += re.escape(char)
+            else:
+                body = pattern[i + 1:end]
+                if body.startswith('!'):
+                    body = '^' + body[1:]
+                regex += f'[{body}]'
+                i = end
+        else:
+            regex += re.escape(char)
+        i += 1
+    return re.compile(regex + r'\Z')
+
+def matches_glob(rel_path: str, pattern: str) -> bool:
+    """
+    Check a path relative to the root against an exclude/include glob.
+
+    Patterns without a '/' match any single path component (e.g., 'build'),
+    patterns with one match the whole relative path (e.g., 'src/gen/**').
+    """
+    pattern = pattern.rstrip('/')
+    if '/' not in pattern:
+        return any(_glob_to_regex(pattern).match(part) for part in rel_path.split('/'))
+    return _glob_to_regex(pattern.lstrip('/')).match(rel_path) is not None
+
+class _IgnoreRule(NamedTuple):
+    """A single line of a .gitignore file."""
+    base: str
+    regex: Pattern[str]
+    negated: bool
+    dir_only: bool
+    anchored: bool
+
+class GitIgnore:
+    """The .gitignore rules in effect for part of a tree, with git's precedence."""
+
+    def __init__(self, rules: Tuple[_IgnoreRule, ...] = ()):
+        self.rules = rules
+
+    def extend(self, gitignore_path: Path, base: str) -> "GitIgnore":
+        """
+        Return a new matcher that also applies the rules of a .gitignore file.
+
+        Args:
+            gitignore_path: The .gitignore file to read
+            base: Directory containing it, relative to the root ('' for the root)
+        """
+        try:
+            with open(gitignore_path, 'r', encoding='utf-8') as f:
+                lines = f.read().splitlines()
+        except (OSError, UnicodeDecodeError):
+            return self
+
+        rules = list(self.rules)
+        for line in lines:
+            line = line.rstrip()
+            if not line or line.startswith('#'):
+                continue
+            negated = line.startswith('!')
+            if negated:
+                line = line[1:]
+            if line.startswith('\\'):
+                line = line[1:]
+            dir_only = line.endswith('/')
+            line = line.rstrip('/')
+            anchored = '/' in line
+            rules.append(_IgnoreRule(base, _glob_to_regex(line.lstrip('/')), negated, dir_only, anchored))
+        return GitIgnore(tuple(rules))
+
+    def ignored(self, rel_path: str, is_dir: bool) -> bool:
+        """Return True if a path relative to the root is ignored; the last matching rule wins."""
+        result = False
+        for rule in self.rules:
+            if rule.dir_only and not is_dir:
+                continue
+            if rule.base:
+                if not rel_path.startswith(rule.base + '/'):
+                    continue
+                path = rel_path[len(rule.base) + 1:]
+            else:
+                path = rel_path
+            target = path if rule.anchored else path.rsplit('/', 1)[-1]
+            if rule.regex.match(target):
+                result = not rule.negated
+        return result
+
+def _enclosing_gitignore(directory: Path) -> Tuple[GitIgnore, str]:
+    """
+    Collect the .gitignore rules that apply to a directory from above it.
+
+    Returns:
+        Tuple of (rules from the repository root down to the directory's
+        parent, the directory's path relative to the repository root). If
+        the directory isn't inside a git repository there are no rules and
+        the directory acts as the root.
+    """
+    directory = Path(os.path.abspath(directory))
+    for repo_root in (directory, *directory.parents):
+        if (repo_root / '.git').exists():
+            break
+    else:
+        return GitIgnore(), ''
+
+    gitignore = GitIgnore()
+    prefix = directory.relative_to(repo_root)
+    for parent in reversed(prefix.parents):
+        base = parent.as_posix() if parent != Path('.') else ''
+        gitignore = gitignore.extend(repo_root / parent / '.gitignore', base)
+    return gitignore, prefix.as_posix() if prefix != Path('.') else ''
+
+class DiscoveryConfig(NamedTuple):
+    """File selection settings from the [tool.epyon] section of pyproject.toml."""
+    exclude: Tuple[str, ...] = ()
+    include: Tuple[str, ...] = ()
+    respect_gitignore: bool = True
+
+def load_discovery_config(directory: Path) -> DiscoveryConfig:
+    """
+    Read [tool.epyon] from the nearest pyproject.toml at or above a directory.
+
+    Supported keys are 'exclude' and 'include' (lists of globs) and
+    'respect-gitignore' (bool). Unreadable files are ignored.
+    """
+    directory = Path(os.path.abspath(directory))
+    for candidate in (directory, *directory.parents):
+        pyproject = candidate / 'pyproject.toml'
+        if not pyproject.is_file():
+            continue
+        try:
+            section = load_toml(pyproject).get('tool', {}).get('epyon', {})
+        except (OSError, ValueError):
+            return DiscoveryConfig()
+        return DiscoveryConfig(
+            exclude=tuple(section.get('exclude', ())),
+            include=tuple(section.get('include', ())),
+            respect_gitignore=bool(section.get('respect-gitignore', True)),
+        )
+    return DiscoveryConfig()
+
+def _selection(
+    directory: Path,
+    exclude: Sequence[str],
+    include: Sequence[str]
+) -> Tuple[Tuple[str, ...], Tuple[str, ...], bool]:
+    """Combine the defaults, [tool.epyon] and the given globs into (excludes, includes, respect_gitignore)."""
+    config = load_discovery_config(directory)
+    return (
+        DEFAULT_EXCLUDES + config.exclude + tuple(exclude),
+        config.include + tuple(include),
+        config.respect_gitignore,
+    )
+
+def _selected(rel_path: str, excludes: Sequence[str], includes: Sequence[str]) -> bool:
+    """Check a file path against exclude and include globs."""
+    if any(matches_glob(rel_path, pattern) for pattern in excludes):
+        return False
+    return not includes or any(matches_glob(rel_path, pattern) for pattern in includes)
+
+def iter_python_files(
+    directory: Path,
+    exclude: Sequence[str] = (),
+    include: Sequence[str] = (),
+    respect_gitignore: Optional[bool] = None,
+    on_directory: Optional[Callable[[str], None]] = None
+) -> Iterator[Path]:
+    """
+    Walk a directory and yield the Python files to process.
+
+    Excluded and ignored directories are pruned before they are entered, and
+    files are yielded as they are found, so a caller can stop early or keep
+    its own state per directory as it goes (see find_python_files for why
+    the commands collect the whole list anyway). A file reached both directly and through a symlink (or
+    through two symlinks) is only yielded the first time. Settings from
+    [tool.epyon] in pyproject.toml are merged with the arguments.
+
+    Args:
+        directory: Root directory to walk
+        exclude: Extra globs of files or directories to skip, on top of
+            DEFAULT_EXCLUDES and the configured ones
+        include: If given, only files matching one of these globs are yielded
+        respect_gitignore: Skip paths ignored by .gitignore files (default: on,
+            unless disabled in pyproject.toml)
+        on_directory: Called with the path of every directory that is entered
+
+    Yields:
+        Paths of Python files, in a stable order
+    """
+    excludes, includes, configured_gitignore = _selection(directory, exclude, include)
+    if respect_gitignore is None:
+        respect_gitignore = configured_gitignore
+
+    # .gitignore rules are matched against paths relative to the repository root
+    if respect_gitignore:
+        root_ignore, git_prefix = _enclosing_gitignore(directory)
+    else:
+        root_ignore, git_prefix = GitIgnore(), ''
+
+    def git_path(rel_path: str) -> str:
+        return f"{git_prefix}/{rel_path}" if git_prefix else rel_path
+
+    stack: List[Tuple[str, str, GitIgnore]] = [(os.fspath(directory), '', root_ignore)]
+    # Resolved paths of the files yielded so far
+    seen: Set[str] = set()
+    while stack:
+        dir_path, rel_dir, gitignore = stack.pop()
+        if on_directory is not None:
+            on_directory(dir_path)
+        if respect_gitignore:
+            base = git_path(rel_dir) if rel_dir else git_prefix
+            gitignore = gitignore.extend(Path(dir_path) / '.gitignore', base)
+
+        try:
+            with os.scandir(dir_path) as it:
+                entries = sorted(it, key=lambda entry: entry.name)
+        except OSError:
+            continue
+
+        subdirs = []
+        real_dir = os.path.realpath(dir_path)
+        for entry in entries:
+            rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+            try:
+                is_dir = entry.is_dir(follow_symlinks=False)
+            except OSError:
+                continue
+
+            if is_dir:
+                if any(matches_glob(rel_path, pattern) for pattern in excludes):
+                    continue
+                if respect_gitignore and gitignore.ignored(git_path(rel_path), True):
+                    continue
+                subdirs.append((entry.path, rel_path, gitignore))
+            elif entry.name.endswith('.py') and entry.is_file():
+                if not _selected(rel_path, excludes, includes):
+                    continue
+                if respect_gitignore and gitignore.ignored(git_path(rel_path), False):
+                    continue
+                # Only symlinks need resolving; directory symlinks are never entered
+                real_path = os.path.realpath(entry.path) if entry.is_symlink() else os.path.join(real_dir, entry.name)
+                if real_path in seen:
+                    continue
+                seen.add(real_path)
+                yield Path(entry.path)
+
+        # Visit subdirectories in name order
+        stack.extend(reversed(subdirs))
+
+def _git(directory: Path, *args: str) -> str:
+    """
+    Run a git command in a directory and return its output.
+
+    Raises:
+        ValueError: If git is missing or the command fails, e.g. outside a
+            repository or for an unknown ref
+    """
+    try:
+        result = subprocess.run(
+            ['git', '-C', os.fspath(directory), *args],
+            capture_output=True, text=True, check=True
+        )
+    except FileNotFoundError as e:
+        raise ValueError("git is not installed") from e
+    except subprocess.CalledProcessError as e:
+        message = e.stderr.strip().splitlines()
+        raise ValueError(f"git {args[0]} failed: {message[-1] if message else e}") from e
+    return result.stdout
+
+def git_changed_files(
+    directory: Path,
+    since: Optional[str] = None,
+    staged: bool = False,
+    exclude: Sequence[str] = (),
+    include: Sequence[str] = ()
+) -> List[Path]:
+    """
+    List the Python files under a directory that git reports as changed.
+
+    Args:
+        directory: Directory inside a git repository
+        since: Include files that differ from the merge base of this ref and
+            HEAD, committed or not, plus new untracked files
+        staged: Include files with staged changes
+        exclude: Extra globs of files or directories to skip
+        include: If given, only files matching one of these globs are listed
+
+    Returns:
+        Existing Python files, filtered like iter_python_files (minus
+        .gitignore, which doesn't apply to files git is tracking), sorted
+
+    Raises:
+        ValueError: If the directory isn't in a git repository or the ref is unknown
+    """
+    # -z output is NUL-separated and never quotes unusual file names
+    rel_paths = set()
+    if since is not None:
+        base = _git(directory, 'merge-base', since, 'HEAD').strip()
+        rel_paths.update(_git(directory, 'diff', '-z', '--name-only', '--relative', '--diff-filter=d', base, '--').split('\0'))
+        rel_paths.update(_git(directory, 'ls-files', '-z', '--others', '--exclude-standard').split('\0'))
+    if staged:
+        rel_paths.update(_git(directory, 'diff', '-z', '--name-only', '--relative', '--diff-filter=d', '--cached', '--').split('\0'))
+
+    excludes, includes, _ = _selection(directory, exclude, include)
+    return sorted(
+        directory / rel_path for rel_path in rel_paths
+        if rel_path.endswith('.py')
+        and _selected(rel_path, excludes, includes)
+        and (directory / rel_path).is_file()
+    )
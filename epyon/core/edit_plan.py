@@ -0,0 +1,95 @@
+"""Edit plans: the edits of a run, recorded to be checked and applied later without parsing."""
+import json
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Sequence
+
+from .cache import hash_content
+from .edits import PLAN_HEADER, Edit
+from .writer import DEFAULT_FSYNC, FileWriter
+
+def load_edit_plan(path: Path) -> Dict[str, List[Edit]]:
+    """
+    Read an edit plan written by --plan-out.
+
+    Returns:
+        Dict[str, List[Edit]]: Each file's edits, in the order to apply them
+
+    Raises:
+        ValueError: If the file isn't an edit plan
+    """
+    edits: Dict[str, List[Edit]] = {}
+    with open(path, "r", encoding="utf-8") as f:
+        header = f.readline()
+        try:
+            if json.loads(header) != PLAN_HEADER:
+                raise ValueError
+        except ValueError:
+            raise ValueError(f"{path}: expected an edit plan written by --plan-out") from None
+        for line_number, line in enumerate(f, start=2):
+            try:
+                record = json.loads(line)
+                edit = Edit(record["path"], int(record["start"]), record["old"], record["new"], record["digest"])
+            except (ValueError, TypeError, KeyError) as e:
+                raise ValueError(f"{path}:{line_number}: not an edit: {e}") from e
+            edits.setdefault(edit.path, []).append(edit)
+    return edits
+
+def replay_edits(content: str, edits: List[Edit]) -> str:
+    """
+    Apply a file's edits to its content, checking each against the content it was made for.
+
+    Raises:
+        ValueError: If the content isn't what an edit was made against
+    """
+    for edit in edits:
+        if hash_content(content.encode("utf-8")) != edit.digest:
+            raise ValueError(f"{edit.path} has changed since the plan was made")
+        lines = content.splitlines(keepends=True)
+        end = edit.start + len(edit.old_lines)
+        if lines[edit.start:end] != edit.old_lines:
+            raise ValueError(f"{edit.path} doesn't match the lines the plan replaces")
+        content = "".join(lines[:edit.start] + edit.new_lines + lines[end:])
+    return content
+
+class EditPlanResult(NamedTuple):
+    """What applying an edit plan did."""
+    # Files whose edits still apply, and their new content
+    files: Dict[str, str]
+    # One message per file that has changed since the plan was made
+    stale: List[str]
+    # Files that could not be written
+    failed: Sequence[str] = ()
+
+def check_edit_plan(edits: Dict[str, List[Edit]]) -> EditPlanResult:
+    """Read every file in a plan and replay its edits in memory, without writing anything."""
+    files: Dict[str, str] = {}
+    stale: List[str] = []
+    for file_path, file_edits in edits.items():
+        try:
+            with open(file_path, "r", encoding="utf-8") as f:
+                files[file_path] = replay_edits(f.read(), file_edits)
+        except (OSError, UnicodeDecodeError) as e:
+            stale.append(f"{file_path} could not be read: {e}")
+        except ValueError as e:
+            stale.append(str(e))
+    return EditPlanResult(files, stale)
+
+def apply_edit_plan(edits: Dict[str, List[Edit]], dry_run: bool = False, fsync: str = DEFAULT_FSYNC) -> EditPlanResult:
+    """
+    Apply an edit plan, or write nothing at all if any file has changed since it was made.
+
+    No file is parsed: every file is read, its content hash checked and its
+    edits spliced in before the first one is written.
+
+    Args:
+        edits: The plan, as returned by load_edit_plan
+        dry_run: Check the plan without writing any file
+        fsync: One of FSYNC_POLICIES
+    """
+    result = check_edit_plan(edits)
+    if dry_run or result.stale:
+        return result
+    with FileWriter(fsync) as writer:
+        for file_path in sorted(result.files):
+            writer.submit(Path(file_path), result.files[file_path])
+    return result._replace(failed=sorted(str(file_path) for file_path in writer.failed))
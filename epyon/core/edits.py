@@ -0,0 +1,247 @@
+"""Compact descriptions of the changes made to files, and the diffs built from them."""
+import json
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional
+
+from .cache import hash_content
+from .profiling import phase
+
+# Unchanged lines kept around each change, as in 'diff -u'
+CONTEXT_LINES = 3
+NO_NEWLINE = "\\ No newline at end of file\n"
+# The first line of every plan file; bump the version when the records change
+PLAN_HEADER = {"format": "epyon-edit-plan", "version": 1}
+
+class Edit(NamedTuple):
+    """
+    The span of a file that changed, with a few lines of context.
+
+    Only the lines between the first and last difference are kept, so an
+    edit to a large module stays small enough to send between processes
+    cheaply; diffs are built from it on demand.
+    """
+    path: str
+    # Index of the first line of old_lines in the original file
+    start: int
+    old_lines: List[str]
+    new_lines: List[str]
+    # Content hash of the whole original file (see cache.hash_content), so
+    # the edit can be checked against the file before it is replayed
+    digest: str = ""
+
+    def diff_lines(self, label: Optional[str] = None) -> Iterator[str]:
+        """
+        Yield the lines of a unified diff of the edit, each ending in a newline.
+
+        Args:
+            label: The path to show in the headers (default: the edit's path)
+        """
+        from difflib import unified_diff
+
+        label = label or self.path
+        lines = unified_diff(
+            self.old_lines, self.new_lines, f"a/{label}", f"b/{label}", n=CONTEXT_LINES, lineterm=""
+        )
+        for index, line in enumerate(lines):
+            if index < 2:
+                yield line + "\n"
+            elif line.startswith("@@"):
+                yield self._shift_hunk(line) + "\n"
+            elif line.endswith("\n"):
+                yield line
+            else:
+                # Only a file's last line can lack a newline
+                yield line + "\n" + NO_NEWLINE
+
+    def _shift_hunk(self, header: str) -> str:
+        """Move a hunk header from the span's line numbers to the file's."""
+        ranges = header.split(" ")
+        for position in (1, 2):
+            start, _, length = ranges[position][1:].partition(",")
+            shifted = int(start) + self.start
+            ranges[position] = ranges[position][0] + str(shifted) + ("," + length if length else "")
+        return " ".join(ranges)
+
+def make_edit(file_path: Path, before: str, after: str, context: int = CONTEXT_LINES) -> Optional[Edit]:
+    """Return the edit that turns before into after, or None if they are the same."""
+    if before == after:
+        return None
+    old = before.splitlines(keepends=True)
+    new = after.splitlines(keepends=True)
+    prefix = 0
+    limit = min(len(old), len(new))
+    while prefix < limit and old[prefix] == new[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < limit - prefix and old[-1 - suffix] == new[-1 - suffix]:
+        suffix += 1
+    start = max(0, prefix - context)
+    old_end = min(len(old), len(old) - suffix + context)
+    new_end = min(len(new), len(new) - suffix + context)
+    return Edit(str(file_path), start, old[start:old_end], new[start:new_end], hash_content(before.encode('utf-8')))
+
+# Functions the edits made in this process are handed to, if any
+_handlers: List[Callable[[Edit], None]] = []
+# Edits a worker has made, waiting to be sent back to the parent
+_outbox: Optional[List[Edit]] = None
+# Thread workers hand their edits to the handlers directly
+_lock = threading.Lock()
+
+def edits_wanted() -> bool:
+    """Whether anything in this process consumes edits."""
+    return _outbox is not None or bool(_handlers)
+
+def publish(edit: Edit) -> None:
+    """Hand an edit to every registered handler."""
+    with _lock, phase("diff"):
+        for handler in list(_handlers):
+            handler(edit)
+
+def edit_made(file_path: Path, before: str, after: str) -> None:
+    """
+    Report the change a processor made to a file, or would make on a dry run.
+
+    Inside a worker that is collecting, the edit goes back to the parent;
+    otherwise it is published to the handlers. Nothing is computed when
+    nobody consumes edits.
+    """
+    if not edits_wanted():
+        return
+    with phase("diff"):
+        edit = make_edit(file_path, before, after)
+    if edit is None:
+        return
+    if _outbox is not None:
+        _outbox.append(edit)
+    else:
+        publish(edit)
+
+@contextmanager
+def handling_edits(handler: Callable[[Edit], None]) -> Iterator[None]:
+    """Send the edits made in (or sent back to) this process to a handler while the block runs."""
+    _handlers.append(handler)
+    try:
+        yield
+    finally:
+        _handlers.remove(handler)
+
+@contextmanager
+def collecting_edits(enabled: bool = True) -> Iterator[Optional[List[Edit]]]:
+    """
+    Collect the edits made inside the block instead of publishing them.
+
+    Workers use this to send their edits back to the parent. Yields the
+    list of edits, or None if disabled.
+    """
+    global _outbox
+    if not enabled:
+        yield None
+        return
+    previous, _outbox = _outbox, []
+    try:
+        yield _outbox
+    finally:
+        _outbox = previous
+
+def patch_label(file_path: str) -> str:
+    """Return the path to use in a patch: relative to the current directory when under it."""
+    relative = os.path.relpath(file_path)
+    if relative.startswith(os.pardir):
+        relative = os.path.abspath(file_path).lstrip(os.sep)
+    return relative.replace(os.sep, "/")
+
+class PatchWriter:
+    """
+    Gathers edits and writes them as one unified patch for 'git apply'.
+
+    Paths are relative to the current directory, so apply the patch from
+    there. Files are written in path order, whatever order they finished in.
+    """
+
+    def __init__(self, path: Path):
+        """
+        Initialize the writer.
+
+        Args:
+            path: The patch file to write
+        """
+        self.path = Path(path)
+        self.edits: Dict[str, List[Edit]] = {}
+
+    def add(self, edit: Edit) -> None:
+        """Add an edit to the patch."""
+        self.edits.setdefault(edit.path, []).append(edit)
+
+    def write(self) -> int:
+        """Write the patch file, returning the number of files it changes."""
+        with open(self.path, "w", encoding="utf-8") as f:
+            for file_path in sorted(self.edits):
+                label = patch_label(file_path)
+                for edit in self.edits[file_path]:
+                    f.write(f"diff --git a/{label} b/{label}\n")
+                    f.writelines(edit.diff_lines(label))
+        return len(self.edits)
+
+    def __enter__(self) -> "PatchWriter":
+        _handlers.append(self.add)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        _handlers.remove(self.add)
+        self.write()
+
+def plan_label(file_path: str) -> str:
+    """Return the path to record in a plan: relative to the current directory when under it."""
+    relative = os.path.relpath(file_path)
+    if relative.startswith(os.pardir):
+        return Path(file_path).resolve().as_posix()
+    return relative.replace(os.sep, "/")
+
+class EditPlanWriter:
+    """
+    Gathers edits and writes them as an edit plan for 'epyon apply-plan'.
+
+    Each line after the header is one edit as JSON: the file, the content
+    hash of the file the edit was made against, and the replaced line span.
+    Files are written in path order and a file's edits in the order they
+    were made, so applying them in file order replays the run.
+    """
+
+    def __init__(self, path: Path):
+        """
+        Initialize the writer.
+
+        Args:
+            path: The plan file to write
+        """
+        self.path = Path(path)
+        self.edits: Dict[str, List[Edit]] = {}
+
+    def add(self, edit: Edit) -> None:
+        """Add an edit to the plan."""
+        self.edits.setdefault(edit.path, []).append(edit)
+
+    def write(self) -> int:
+        """Write the plan file, returning the number of files it changes."""
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write(json.dumps(PLAN_HEADER) + "\n")
+            for file_path in sorted(self.edits):
+                label = plan_label(file_path)
+                for edit in self.edits[file_path]:
+                    record = {
+                        "path": label, "digest": edit.digest, "start": edit.start,
+                        "old": edit.old_lines, "new": edit.new_lines,
+                    }
+                    f.write(json.dumps(record) + "\n")
+        return len(self.edits)
+
+    def __enter__(self) -> "EditPlanWriter":
+        _handlers.append(self.add)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        _handlers.remove(self.add)
+        self.write()
@@ -0,0 +1,173 @@
+"""Structured per-file events, for --output=jsonl."""
+import json
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, NamedTuple, Optional, TextIO, Tuple
+
+from .prefilter import SKIPPED
+
+OUTPUTS = ("human", "jsonl")
+DEFAULT_OUTPUT = "human"
+# What happened to a file, from most to least interesting
+ACTIONS = ("error", "modified", "unchanged", "skipped")
+# Details noted about the file each thread is processing, if events are recorded
+_local = threading.local()
+
+class FileEvent(NamedTuple):
+    """What a processor did to one file."""
+    path: str
+    action: str
+    matches: int
+    bytes_before: Optional[int]
+    bytes_after: Optional[int]
+    duration: float
+    error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the event as a JSON-serialisable dict."""
+        return {"event": "file", **self._asdict()}
+
+def recording() -> bool:
+    """Whether the file being processed by this thread is described by an event."""
+    return getattr(_local, "notes", None) is not None
+
+def note(**fields: Any) -> None:
+    """
+    Attach details to the event of the file being processed.
+
+    Processors note the source they read (before), the code they produced
+    (after), the number of matches and any error they swallowed. Without
+    an event being recorded this does nothing.
+    """
+    notes = getattr(_local, "notes", None)
+    if notes is not None:
+        notes.update(fields)
+
+@contextmanager
+def _noting() -> Iterator[Dict[str, Any]]:
+    """Collect the notes taken by this thread inside the block."""
+    notes: Dict[str, Any] = {}
+    previous, _local.notes = getattr(_local, "notes", None), notes
+    try:
+        yield notes
+    finally:
+        _local.notes = previous
+
+def _size(code: Optional[str]) -> Optional[int]:
+    return len(code.encode('utf-8')) if code is not None else None
+
+def _describe(file_path: Path, result: Any, notes: Dict[str, Any], duration: float) -> FileEvent:
+    """Turn a processor result and the notes taken while it ran into an event."""
+    changed = result[0] if isinstance(result, tuple) else result
+    error = notes.get("error")
+    if result is None or error is not None:
+        action = "error"
+    elif changed is SKIPPED:
+        action = "skipped"
+    elif changed:
+        action = "modified"
+    else:
+        action = "unchanged"
+
+    matches = notes.get("matches")
+    if matches is None:
+        if isinstance(changed, list):
+            matches = len(changed)
+        else:
+            matches = int(action == "modified")
+    bytes_before = _size(notes.get("before"))
+    bytes_after = _size(notes.get("after")) if action == "modified" else bytes_before
+    return FileEvent(str(file_path), action, matches, bytes_before, bytes_after, duration, error)
+
+def record(file_path: Path, processor: Callable[..., Any], *args: Any, **kwargs: Any) -> Tuple[Any, FileEvent]:
+    """
+    Run a processor on one file and describe what it did.
+
+    Returns:
+        Tuple of (result, event); the result is None if the processor raised
+    """
+    start = time.perf_counter()
+    with _noting() as notes:
+        try:
+            result = processor(file_path, *args, **kwargs)
+        except Exception as e:
+            result = None
+            notes.setdefault("error", str(e))
+    return result, _describe(file_path, result, notes, time.perf_counter() - start)
+
+class EventCollector:
+    """
+    Writes one JSON line per event to a stream.
+
+    There is a single collector, in the parent process: workers record
+    their events and send them back with their results, so lines never
+    interleave. Use it as a context manager to make it the active
+    collector that iter_files_parallel hands events to.
+    """
+
+    def __init__(self, stream: Optional[TextIO] = None):
+        """
+        Initialize the collector.
+
+        Args:
+            stream: Where to write the events (default: sys.stdout)
+        """
+        self.stream = stream if stream is not None else sys.stdout
+        self.actions: Counter = Counter()
+        self._previous: Optional[EventCollector] = None
+
+    def emit(self, event: FileEvent) -> None:
+        """Write a file event."""
+        self.actions[event.action] += 1
+        self._write(event.to_dict())
+
+    def summary(self, **fields: Any) -> None:
+        """Write the closing event with the totals per action and any extra fields."""
+        counts = {action: self.actions[action] for action in ACTIONS}
+        self._write({"event": "summary", "events": sum(self.actions.values()), **counts, **fields})
+
+    def _write(self, payload: Dict[str, Any]) -> None:
+        self.stream.write(json.dumps(payload) + "\n")
+        self.stream.flush()
+
+    def __enter__(self) -> "EventCollector":
+        global _active
+        self._previous, _active = _active, self
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        global _active
+        _active = self._previous
+
+# The collector file events go to in this process, if any
+_active: Optional[EventCollector] = None
+
+def active_collector() -> Optional[EventCollector]:
+    """Return the collector receiving file events in this process, or None."""
+    return _active
+
+def process_one(file_path: Path, processor: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """
+    Run a processor on one file in this process.
+
+    If a collector is active the file's event is sent to it; a processor
+    that raises does so as usual.
+    """
+    if _active is None:
+        return processor(file_path, *args, **kwargs)
+    collector = _active
+    start = time.perf_counter()
+    result = None
+    with _noting() as notes:
+        try:
+            result = processor(file_path, *args, **kwargs)
+            return result
+        except Exception as e:
+            notes.setdefault("error", str(e))
+            raise
+        finally:
+            collector.emit(_describe(file_path, result, notes, time.perf_counter() - start))
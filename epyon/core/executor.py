@@ -0,0 +1,144 @@
+"""Choosing how a batch of files is processed: in-process, on threads or on processes."""
+import importlib
+import os
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterable, Optional, Sequence
+
+from ..display import display
+
+if TYPE_CHECKING:
+    from concurrent.futures import ProcessPoolExecutor
+
+EXECUTORS = ("auto", "serial", "thread", "process")
+DEFAULT_EXECUTOR = "auto"
+# Below either limit, starting workers costs more than the work itself
+SERIAL_MAX_FILES = 8
+SERIAL_MAX_BYTES = 128 * 1024
+# Import scans are cheap per byte, so threads overlapping the reads win up to here
+THREAD_MAX_SCAN_BYTES = 4 * 1024 * 1024
+# Imported once by every worker of a shared pool, before its first task
+PRELOAD_MODULES = (
+    "libcst",
+    "epyon.core.import_replacer",
+    "epyon.core.call_replacer",
+    "epyon.core.def_mover",
+)
+
+def total_bytes(files: Iterable[Path]) -> int:
+    """Return the combined size of the files, counting unreadable ones as empty."""
+    total = 0
+    for file_path in files:
+        try:
+            total += os.stat(file_path).st_size
+        except OSError:
+            pass
+    return total
+
+def choose_executor(
+    requested: str,
+    file_count: int,
+    byte_count: int,
+    max_workers: Optional[int] = None,
+    scan: bool = False
+) -> str:
+    """
+    Pick the backend for a batch of files.
+
+    Small batches, and runs limited to a single worker, are processed in
+    the calling process. Otherwise, import scans (scan=True) run on a
+    thread pool until the batch is large enough for the parse to dominate,
+    and rewrites, which are CPU bound, run on a process pool.
+
+    Args:
+        requested: One of EXECUTORS; anything but "auto" is returned as is
+        file_count: Number of files in the batch
+        byte_count: Their combined size
+        max_workers: The worker limit the caller was given, if any
+        scan: True for the light import scan, False for libcst rewrites
+
+    Returns:
+        "serial", "thread" or "process"
+
+    Raises:
+        ValueError: If the requested executor is unknown
+    """
+    if requested not in EXECUTORS:
+        raise ValueError(f"Unknown executor '{requested}', expected one of {', '.join(EXECUTORS)}")
+    if requested != "auto":
+        return requested
+    if max_workers == 1 or file_count <= SERIAL_MAX_FILES or byte_count <= SERIAL_MAX_BYTES:
+        return "serial"
+    if scan and byte_count <= THREAD_MAX_SCAN_BYTES:
+        return "thread"
+    return "process"
+
+def select_executor(
+    requested: str,
+    files: Iterable[Path],
+    max_workers: Optional[int] = None,
+    scan: bool = False,
+    byte_count: Optional[int] = None
+) -> str:
+    """Choose the backend for a list of files and report the choice under --verbose."""
+    files = list(files)
+    if byte_count is None:
+        byte_count = total_bytes(files)
+    backend = choose_executor(requested, len(files), byte_count, max_workers, scan)
+    reason = "requested" if requested != "auto" else "auto"
+    display.info(f"Using the {backend} executor for {len(files)} files ({byte_count / 1024:.0f} KiB, {reason})")
+    return backend
+
+def _preload(modules: Sequence[str]) -> None:
+    """Worker initializer: import the modules every task will need."""
+    for name in modules:
+        importlib.import_module(name)
+
+class WorkerPool:
+    """
+    A process pool shared by the phases of one operation.
+
+    The pool is only started the first time a phase picks the process
+    backend, so runs small enough to stay serial never fork. Its workers
+    import libcst and the transformers once, in their initializer, instead
+    of on their first task in every phase. Use it as a context manager and
+    pass it to the functions that take a pool argument.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, preload: Sequence[str] = PRELOAD_MODULES):
+        """
+        Initialize the pool.
+
+        Args:
+            max_workers: Maximum number of worker processes (default: CPU count)
+            preload: Modules each worker imports when it starts
+        """
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.preload = tuple(preload)
+        self._executor: Optional["ProcessPoolExecutor"] = None
+
+    @property
+    def started(self) -> bool:
+        """Whether the worker processes have been started."""
+        return self._executor is not None
+
+    def get(self) -> "ProcessPoolExecutor":
+        """Return the process pool, starting it on first use."""
+        if self._executor is None:
+            from concurrent.futures import ProcessPoolExecutor
+
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers, initializer=_preload, initargs=(self.preload,)
+            )
+        return self._executor
+
+    def close(self) -> None:
+        """Shut the workers down, waiting for running tasks."""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self) -> "WorkerPool":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
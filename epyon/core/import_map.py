@@ -0,0 +1,99 @@
+"""Compact index of the files each import path appears in."""
+import sys
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Mapping, Set, Tuple
+
+class ImportMap(Mapping[str, Set[Path]]):
+    """
+    Maps import paths to the files that import them.
+
+    Every file is stored once and referred to by an integer id; each import
+    path (interned, so equal names share one string) keeps its files as a
+    sorted array of ids. On a large tree that is a few bytes per import
+    instead of a set entry and a Path reference, and it answers the same
+    questions as a Dict[str, Set[Path]]: the sets are built on lookup.
+    """
+
+    def __init__(self, files: List[Path], postings: Dict[str, "array[int]"]):
+        """
+        Initialize the map.
+
+        Args:
+            files: The indexed files; a file's id is its position
+            postings: Import path to the sorted ids of the files importing it
+        """
+        self.files = files
+        self._postings = postings
+        # Sorted once, for prefix queries
+        self._names = sorted(postings)
+
+    @classmethod
+    def build(cls, imports: Iterable[Tuple[Path, Iterable[str]]]) -> "ImportMap":
+        """Build the map from each file's import paths."""
+        files: List[Path] = []
+        postings: Dict[str, "array[int]"] = {}
+        for file_id, (file_path, names) in enumerate(imports):
+            files.append(file_path)
+            for name in names:
+                ids = postings.get(name)
+                if ids is None:
+                    ids = postings[sys.intern(name)] = array('I')
+                # Ids only grow, so each array stays sorted and a repeat is the last entry
+                if not ids or ids[-1] != file_id:
+                    ids.append(file_id)
+        return cls(files, postings)
+
+    def __getitem__(self, name: str) -> Set[Path]:
+        return {self.files[file_id] for file_id in self._postings[name]}
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._names)
+
+    def __len__(self) -> int:
+        return len(self._postings)
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._postings
+
+    def files_importing(self, name: str) -> Set[Path]:
+        """Return the files that import name exactly, or an empty set."""
+        ids = self._postings.get(name)
+        return {self.files[file_id] for file_id in ids} if ids is not None else set()
+
+    def names_above(self, name: str) -> List[str]:
+        """
+        Return the indexed import paths that contain name, outermost first.
+
+        For 'a.b.C' those are 'a' and 'a.b', if files import them: code
+        that imports a module can reach everything inside it, e.g. 'import
+        a.b' followed by 'a.b.C()'. Costs one lookup per dotted part.
+        """
+        parts = name.split(".")
+        ancestors = (".".join(parts[:depth]) for depth in range(1, len(parts)))
+        return [ancestor for ancestor in ancestors if ancestor in self._postings]
+
+    def names_under(self, prefix: str) -> List[str]:
+        """Return the indexed import paths that are prefix or inside it, e.g. 'a.b' and 'a.b.c' for 'a.b'."""
+        # Identifier characters all sort after '.', and '/' is the character after it,
+        # so prefix's descendants are exactly the names in [prefix + '.', prefix + '/')
+        start = bisect_left(self._names, prefix + ".")
+        end = bisect_left(self._names, prefix + "/", start)
+        names = self._names[start:end]
+        return [prefix] + names if prefix in self._postings else names
+
+    def files_importing_any(self, names: Iterable[str]) -> Set[Path]:
+        """Return the files that import at least one of names."""
+        ids: Set[int] = set()
+        for name in names:
+            ids.update(self._postings.get(name, ()))
+        return {self.files[file_id] for file_id in ids}
+
+    def files_importing_prefix(self, prefix: str) -> Set[Path]:
+        """Return the files that import prefix or anything inside it."""
+        return self.files_importing_any(self.names_under(prefix))
+
+    def files_reaching(self, name: str) -> Set[Path]:
+        """Return the files that import name, a module containing it, or anything inside it."""
+        return self.files_importing_any(self.names_above(name) + self.names_under(name))
@@ -1,32 +1,75 @@
 """Core functionality for import replacement."""
 import libcst as cst
 from libcst import matchers as m
-from typing import Tuple, List
+from typing import Dict, List, Optional, Sequence, Set, Tuple, Union
 from pathlib import Path
 
 from ..display import display
+from .edits import edit_made, handling_edits
+from .events import note
+from .prefilter import SKIPPED, Prefilter, get_prefilter
+from .profiling import phase
+from .executor import DEFAULT_EXECUTOR
+from .writer import DEFAULT_FSYNC, FileWriter, write_file
 from .utils import find_python_files, process_files_parallel
 
+def _split_import(import_path: str) -> Tuple[str, str]:
+    """Split an import path into module and name parts."""
+    parts = import_path.split('.')
+    # Handle cases like 'module.submodule.Name'
+    return '.'.join(parts[:-1]), parts[-1]
+
+class ImportMapping:
+    """A set of old to new import pairs indexed by (module, name) for O(1) lookup."""
+
+    def __init__(self, pairs: Dict[str, str]):
+        """
+        Initialize the mapping.
+
+        Args:
+            pairs: Dict mapping old import paths to new ones
+                (e.g., {'foo.bar.Baz': 'lorem.ipsum.Baz'})
+        """
+        self.pairs = dict(pairs)
+        self.lookup: Dict[Tuple[str, str], Tuple[str, str, str]] = {}
+        for old_import, new_import in self.pairs.items():
+            new_module, new_name = _split_import(new_import)
+            self.lookup[_split_import(old_import)] = (new_module, new_name, old_import)
+        self.prefilter = Prefilter(name for _, name in self.lookup)
+
+    def __len__(self) -> int:
+        return len(self.pairs)
+
 class ImportReplacer(cst.CSTTransformer):
     """Transform imports in a Python module using libCST."""
 
-    def __init__(self, old_import: str, new_import: str):
+    def __init__(self, old_import: str, new_import: str, mapping: Optional[ImportMapping] = None):
         """
         Initialize the transformer with the old and new import paths.
 
         Args:
             old_import: The import to be replaced (e.g., 'foo.bar.baz.PermissionDenied')
             new_import: The replacement import (e.g., 'rest_framework.exc.PermissionDenied')
+            mapping: Replace every pair in this mapping instead of a single import
         """
-        self.old_module, self.old_name = self._split_import(old_import)
-        self.new_module, self.new_name = self._split_import(new_import)
+        if mapping is None:
+            mapping = ImportMapping({old_import: new_import})
+        self.mapping = mapping
+        if old_import:
+            self.old_module, self.old_name = self._split_import(old_import)
+            self.new_module, self.new_name = self._split_import(new_import)
         self.changes_made = False
+        self.matched: Set[str] = set()
+        self._added_imports: Dict[Tuple[str, str, Optional[str]], None] = {}
+
+    @classmethod
+    def from_mapping(cls, mapping: ImportMapping) -> "ImportReplacer":
+        """Create a transformer that replaces every pair in a mapping in one pass."""
+        return cls("", "", mapping=mapping)
 
     def _split_import(self, import_path: str) -> Tuple[str, str]:
         """Split an import path into module and name parts."""
-        parts = import_path.split('.')
-        # Handle cases like 'module.submodule.Name'
-        return '.'.join(parts[:-1]), parts[-1]
+        return _split_import(import_path)
 
     def _create_module_node(self, module_path: str) -> cst.BaseExpression:
         """Create a module node from a dot-separated path."""
@@ -39,40 +82,63 @@ class ImportReplacer(cst.CSTTransformer):
             result = cst.Attribute(value=result, attr=cst.Name(value=part))
         return result
 
-    def leave_ImportFrom(self, original_node: cst.ImportFrom, updated_node: cst.ImportFrom) -> cst.ImportFrom:
-        """Process 'from x import y' style imports."""
-        # Check if this is the module we're looking to replace
-        if m.matches(updated_node.module, m.Name(value=self.old_module)) or (
-            isinstance(updated_node.module, cst.Attribute) and
-            self._get_full_module_name(updated_node.module) == self.old_module
-        ):
-            # Check if the target name is in the imports
-            for import_alias in updated_node.names:
-                if m.matches(import_alias.name, m.Name(value=self.old_name)):
-                    self.changes_made = True
-
-                    # Remove the target name from the imports while preserving formatting
-                    new_names = []
-                    for alias in updated_node.names:
-                        if not m.matches(alias.name, m.Name(value=self.old_name)):
-                            new_names.append(alias)
-
-                    # If this was the only import, replace the whole statement
-                    if not new_names:
-                        return cst.ImportFrom(
-                            module=self._create_module_node(self.new_module),
-                            names=[cst.ImportAlias(name=cst.Name(value=self.new_name))],
-                            whitespace_after_from=updated_node.whitespace_after_from,
-                            whitespace_before_import=updated_node.whitespace_before_import,
-                            whitespace_after_import=updated_node.whitespace_after_import,
-                        )
-
-                    # Otherwise, keep the existing import with the name removed
-                    return updated_node.with_changes(
-                        names=new_names
-                    )
+    def _create_alias(self, name: str, asname: Optional[str]) -> cst.ImportAlias:
+        """Create an import alias, keeping an explicit 'as' name."""
+        if asname is None:
+            return cst.ImportAlias(name=cst.Name(value=name))
+        return cst.ImportAlias(name=cst.Name(value=name), asname=cst.AsName(name=cst.Name(value=asname)))
 
-        return updated_node
+    def leave_ImportFrom(
+        self, original_node: cst.ImportFrom, updated_node: cst.ImportFrom
+    ) -> Union[cst.ImportFrom, cst.RemovalSentinel]:
+        """Process 'from x import y' style imports."""
+        if updated_node.module is None or isinstance(updated_node.names, cst.ImportStar):
+            return updated_node
+        
+        module_name = self._get_full_module_name(updated_node.module)
+        
+        # Resolve each imported name with a single dict lookup
+        kept_names = []
+        replacements = []
+        for alias in updated_node.names:
+            target = None
+            if isinstance(alias.name, cst.Name):
+                target = self.mapping.lookup.get((module_name, alias.name.value))
+            if target is None:
+                kept_names.append(alias)
+                continue
+            new_module, new_name, old_import = target
+            asname = alias.asname.name.value if alias.asname is not None else None
+            replacements.append((new_module, new_name, asname))
+            self.matched.add(old_import)
+        
+        if not replacements:
+            return updated_node
+        self.changes_made = True
+        
+        # If every name moves to the same module, rewrite the statement in place
+        new_modules = {new_module for new_module, _, _ in replacements}
+        if not kept_names and len(new_modules) == 1:
+            return cst.ImportFrom(
+                module=self._create_module_node(new_modules.pop()),
+                names=[self._create_alias(new_name, asname) for _, new_name, asname in replacements],
+                whitespace_after_from=updated_node.whitespace_after_from,
+                whitespace_before_import=updated_node.whitespace_before_import,
+                whitespace_after_import=updated_node.whitespace_after_import,
+            )
+        
+        # Otherwise the replacements are added at the top of the module
+        for replacement in replacements:
+            self._added_imports[replacement] = None
+        
+        if not kept_names:
+            return cst.RemoveFromParent()
+        
+        # Keep the existing import with the names removed; a trailing comma is
+        # only valid inside parentheses
+        if updated_node.lpar is None:
+            kept_names[-1] = kept_names[-1].with_changes(comma=cst.MaybeSentinel.DEFAULT)
+        return updated_node.with_changes(names=kept_names)
 
     def _get_full_module_name(self, node: cst.CSTNode) -> str:
         """Recursively build a full module name from an Attribute node."""
@@ -85,30 +151,78 @@ class ImportReplacer(cst.CSTTransformer):
     def visit_Module(self, node: cst.Module) -> None:
         """Process the entire module and prepare for modifications."""
         self.changes_made = False
+        self.matched = set()
+        self._added_imports = {}
 
     def leave_Module(self, original_node: cst.Module, updated_node: cst.Module) -> cst.Module:
         """
-        After processing the module, add new import if we removed one.
+        After processing the module, add new imports for names we removed.
         This ensures we add the replacement import if we removed one from an existing import.
         """
-        if self.changes_made:
-            # Add the new import at the top of the file
-            new_import = cst.SimpleStatementLine(
-                body=[
-                    cst.ImportFrom(
-                        module=self._create_module_node(self.new_module),
-                        names=[cst.ImportAlias(name=cst.Name(value=self.new_name))],
-                    )
-                ]
-            )
+        if self._added_imports:
+            # Group the new names by module, in the order they were found
+            grouped: Dict[str, List[cst.ImportAlias]] = {}
+            for new_module, new_name, asname in self._added_imports:
+                grouped.setdefault(new_module, []).append(self._create_alias(new_name, asname))
+            
+            new_imports = [
+                cst.SimpleStatementLine(
+                    body=[cst.ImportFrom(module=self._create_module_node(new_module), names=names)]
+                )
+                for new_module, names in grouped.items()
+            ]
 
             # Add to the beginning of the imports section
             return updated_node.with_changes(
-                body=[new_import] + list(updated_node.body)
+                body=new_imports + list(updated_node.body)
             )
         return updated_node
 
 
+def _transform_file(
+    file_path: Path,
+    transformer: ImportReplacer,
+    prefilter: Prefilter,
+    dry_run: bool
+) -> bool:
+    """Run an import transformer over a file, reporting and writing any changes."""
+    with phase("read"), open(file_path, 'r', encoding='utf-8') as f:
+        source_code = f.read()
+    note(before=source_code)
+
+    # Files that never mention an imported name can't match
+    with phase("prefilter"):
+        if not prefilter.matches(source_code):
+            return SKIPPED
+
+    # Parse the source code into a CST
+    with phase("parse"):
+        module = cst.parse_module(source_code)
+
+    # Apply our transformer
+    with phase("transform"):
+        modified_module = module.visit(transformer)
+
+    # If changes were made, write them back or print them
+    if transformer.changes_made:
+        with phase("codegen"):
+            modified_code = modified_module.code
+        note(after=modified_code, matches=len(transformer.matched))
+
+        # The parent shows the changes as a diff, or adds them to a patch
+        edit_made(file_path, source_code, modified_code)
+
+        # Write changes if not in dry run mode
+        if not dry_run:
+            write_file(file_path, modified_code)
+            display.success(f"Updated {file_path}")
+        else:
+            display.warning("Dry run - no changes written")
+
+        return True
+
+    return False
+
 def process_file(file_path: Path, old_import: str, new_import: str, dry_run: bool) -> bool:
     """
     Process a single Python file to replace imports.
@@ -120,48 +234,55 @@ def process_file(file_path: Path, old_import: str, new_import: str, dry_run: boo
         dry_run: If True, don't actually modify the file
 
     Returns:
-        bool: True if changes were made, False otherwise
+        bool: True if changes were made, False otherwise (SKIPPED if the
+        prefilter ruled the file out without parsing it)
     """
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            source_code = f.read()
-
-        # Parse the source code into a CST
-        module = cst.parse_module(source_code)
-
-        # Apply our transformer
         transformer = ImportReplacer(old_import, new_import)
-        modified_module = module.visit(transformer)
-
-        # If changes were made, write them back or print them
-        if transformer.changes_made:
-            modified_code = modified_module.code
+        prefilter = get_prefilter(old_import.split('.')[-1])
+        return _transform_file(file_path, transformer, prefilter, dry_run)
 
-            # Show the changes as a diff
-            display.show_diff(source_code, modified_code, file_path)
+    except Exception as e:
+        note(error=str(e))
+        display.error(f"Error processing {file_path}: {str(e)}")
+        return False
 
-            # Write changes if not in dry run mode
-            if not dry_run:
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    f.write(modified_code)
-                display.success(f"Updated {file_path}")
-            else:
-                display.warning("Dry run - no changes written")
+def process_file_mapping(file_path: Path, mapping: ImportMapping, dry_run: bool) -> List[str]:
+    """
+    Process a single Python file, replacing every import in a mapping.
 
-            return True
+    Args:
+        file_path: Path to the Python file
+        mapping: The old to new import pairs to apply
+        dry_run: If True, don't actually modify the file
 
-        return False
+    Returns:
+        List[str]: The old imports that were replaced in this file (SKIPPED
+        if the prefilter ruled the file out without parsing it)
+    """
+    try:
+        transformer = ImportReplacer.from_mapping(mapping)
+        if _transform_file(file_path, transformer, mapping.prefilter, dry_run) is SKIPPED:
+            return SKIPPED
+        return sorted(transformer.matched)
 
     except Exception as e:
+        note(error=str(e))
         display.error(f"Error processing {file_path}: {str(e)}")
-        return False
+        return []
 
 def replace_import(
     directory: Path,
     old_import: str,
     new_import: str,
     dry_run: bool = False,
-    max_workers: int = None
+    max_workers: int = None,
+    exclude: Sequence[str] = (),
+    include: Sequence[str] = (),
+    since: Optional[str] = None,
+    staged: bool = False,
+    fsync: str = DEFAULT_FSYNC,
+    executor: str = DEFAULT_EXECUTOR
 ) -> int:
     """
     Replace imports across Python files in a directory.
@@ -172,29 +293,102 @@ def replace_import(
         new_import: New import path (e.g., 'lorem.ipsum.Baz')
         dry_run: If True, don't modify files
         max_workers: Maximum number of parallel workers
+        exclude: Extra globs of files or directories to skip
+        include: If given, only process files matching one of these globs
+        since: Only process files changed since this git ref
+        staged: Only process files with staged changes
+        fsync: When to flush rewritten files to disk (see writer.FSYNC_POLICIES)
+        executor: How to run the batch (see executor.EXECUTORS); "auto" picks by size
     
     Returns:
         int: Number of files modified
     """
-    python_files = find_python_files(directory)
+    python_files = find_python_files(directory, exclude, include, since=since, staged=staged)
     if not python_files:
         display.warning(f"No Python files found in {directory}")
         return 0
     
     display.info(f"Searching {len(python_files)} files")
     
-    results = process_files_parallel(
-        python_files,
-        process_file,
-        old_import,
-        new_import,
-        dry_run=dry_run,
-        max_workers=max_workers
-    )
+    # Workers send their edits back and the diffs are shown from here
+    with FileWriter(fsync), handling_edits(display.show_edit):
+        results = process_files_parallel(
+            python_files,
+            process_file,
+            old_import,
+            new_import,
+            dry_run=dry_run,
+            max_workers=max_workers,
+            executor=executor
+        )
     
     modified_count = sum(1 for r in results if r)
+    display.show_skipped(sum(1 for r in results if r is SKIPPED), len(python_files))
+    
+    if dry_run:
+        display.show_dry_run_notice()
+    
+    return modified_count
+
+def replace_imports_from_mapping(
+    directory: Path,
+    mapping: ImportMapping,
+    dry_run: bool = False,
+    max_workers: int = None,
+    exclude: Sequence[str] = (),
+    include: Sequence[str] = (),
+    since: Optional[str] = None,
+    staged: bool = False,
+    fsync: str = DEFAULT_FSYNC,
+    executor: str = DEFAULT_EXECUTOR
+) -> Tuple[int, Dict[str, int]]:
+    """
+    Replace every import in a mapping across Python files in a single pass.
+    
+    Args:
+        directory: Root directory to process
+        mapping: The old to new import pairs to apply
+        dry_run: If True, don't modify files
+        max_workers: Maximum number of parallel workers
+        exclude: Extra globs of files or directories to skip
+        include: If given, only process files matching one of these globs
+        since: Only process files changed since this git ref
+        staged: Only process files with staged changes
+        fsync: When to flush rewritten files to disk (see writer.FSYNC_POLICIES)
+        executor: How to run the batch (see executor.EXECUTORS); "auto" picks by size
+    
+    Returns:
+        Tuple of (number of files modified, dict of old import to the number
+        of files it was replaced in)
+    """
+    file_counts = {old_import: 0 for old_import in mapping.pairs}
+    python_files = find_python_files(directory, exclude, include, since=since, staged=staged)
+    if not python_files:
+        display.warning(f"No Python files found in {directory}")
+        return 0, file_counts
+    
+    display.info(f"Searching {len(python_files)} files for {len(mapping)} imports")
+    
+    # Workers send their edits back and the diffs are shown from here
+    with FileWriter(fsync), handling_edits(display.show_edit):
+        results = process_files_parallel(
+            python_files,
+            process_file_mapping,
+            mapping,
+            dry_run=dry_run,
+            max_workers=max_workers,
+            executor=executor
+        )
+    
+    modified_count = 0
+    for matched in results:
+        if matched:
+            modified_count += 1
+            for old_import in matched:
+                file_counts[old_import] += 1
+    display.show_skipped(sum(1 for r in results if r is SKIPPED), len(python_files))
     
     if dry_run:
         display.show_dry_run_notice()
     
-    return modified_count
\ No newline at end of file
+    return modified_count, file_counts
\ No newline at end of file
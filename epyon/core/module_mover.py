@@ -0,0 +1,411 @@
+"""Core functionality for moving a whole module or package."""
+import os
+from pathlib import Path
+from typing import Dict, NamedTuple, Optional, Sequence, Set, Tuple, Union
+
+import libcst as cst
+from libcst import matchers as m
+
+from ..display import display
+from .edits import edit_made
+from .events import note
+from .executor import DEFAULT_EXECUTOR
+from .modules import ModuleIndex, _module_parts
+from .prefilter import SKIPPED, get_prefilter
+from .profiling import phase
+from .utils import build_import_map, iter_files_parallel
+from .writer import DEFAULT_FSYNC, FileWriter, write_file
+
+def renamed_module(name: str, old_module: str, new_module: str) -> Optional[str]:
+    """Return name with the old module prefix replaced, or None if name isn't old_module or inside it."""
+    if name == old_module:
+        return new_module
+    if name.startswith(old_module + '.'):
+        return new_module + name[len(old_module):]
+    return None
+
+def _dotted_name(node: cst.CSTNode) -> Optional[str]:
+    """Return the dotted name of a Name or an attribute chain rooted at one, or None."""
+    if isinstance(node, cst.Name):
+        return node.value
+    if isinstance(node, cst.Attribute):
+        value = _dotted_name(node.value)
+        return f"{value}.{node.attr.value}" if value is not None else None
+    return None
+
+def _module_node(module_path: str) -> Union[cst.Name, cst.Attribute]:
+    """Create a Name or attribute chain from a dotted path."""
+    parts = module_path.split('.')
+    result: Union[cst.Name, cst.Attribute] = cst.Name(value=parts[0])
+    for part in parts[1:]:
+        result = cst.Attribute(value=result, attr=cst.Name(value=part))
+    return result
+
+class ModuleRenamer(cst.CSTTransformer):
+    """Rewrite the imports of a module or package, and of everything inside it, to a new name."""
+
+    def __init__(self, old_module: str, new_module: str, file_path: Path, module_name: Optional[str] = None):
+        """
+        Initialize the transformer.
+
+        Args:
+            old_module: The module being moved (e.g., 'gundam.wing.zero')
+            new_module: Its new name (e.g., 'gundam.ms.zero')
+            file_path: The file being transformed
+            module_name: The file's dotted module name, needed to resolve its
+                relative imports; without it they are left alone
+        """
+        self.old_module = old_module
+        self.new_module = new_module
+        self.old_parent, _, self.old_name = old_module.rpartition('.')
+        self.new_parent, _, self.new_name = new_module.rpartition('.')
+        self.file_path = file_path
+        self.module_name = module_name
+        # Files inside the moved module keep relative imports among themselves
+        self.moving = module_name is not None and renamed_module(module_name, old_module, new_module) is not None
+        self.changes_made = False
+        self.matched = 0
+        self._rewrite_usages = False
+        self._import_depth = 0
+        self._added_imports: Dict[Tuple[str, str, Optional[str]], None] = {}
+
+    def _renamed(self, name: str) -> Optional[str]:
+        return renamed_module(name, self.old_module, self.new_module)
+
+    def _changed(self) -> None:
+        self.changes_made = True
+        self.matched += 1
+
+    def visit_Module(self, node: cst.Module) -> None:
+        """Check whether the module reaches the moved module through a plain 'import'."""
+        self.changes_made = False
+        self.matched = 0
+        self._added_imports = {}
+        # 'import gundam.wing.zero' (or 'import gundam') binds a name that
+        # code then uses as gundam.wing.zero.X, so those uses move too
+        self._rewrite_usages = any(
+            alias.asname is None and (
+                self._renamed(_dotted_name(alias.name) or '') is not None
+                or self.old_module.startswith(f"{_dotted_name(alias.name)}.")
+            )
+            for statement in m.findall(node, m.Import())
+            for alias in statement.names
+        )
+
+    def visit_Import(self, node: cst.Import) -> None:
+        self._import_depth += 1
+
+    def visit_ImportFrom(self, node: cst.ImportFrom) -> None:
+        self._import_depth += 1
+
+    def leave_Import(self, original_node: cst.Import, updated_node: cst.Import) -> cst.Import:
+        """Rewrite 'import old.module[.sub] [as x]'."""
+        self._import_depth -= 1
+        names = []
+        for alias in updated_node.names:
+            renamed = self._renamed(_dotted_name(alias.name) or '')
+            if renamed is not None:
+                alias = alias.with_changes(name=_module_node(renamed))
+                self._changed()
+            names.append(alias)
+        return updated_node.with_changes(names=names)
+
+    def _absolute(self, node: cst.ImportFrom) -> Optional[str]:
+        """Return the module a 'from' import reads from, resolving relative imports, or None."""
+        module = _dotted_name(node.module) if node.module is not None else ''
+        if module is None:
+            return None
+        level = len(node.relative)
+        if not level:
+            return module
+        if self.module_name is None:
+            return None
+        return ModuleIndex._absolute('.' * level + module, self.module_name, self.file_path)
+
+    def leave_ImportFrom(
+        self, original_node: cst.ImportFrom, updated_node: cst.ImportFrom
+    ) -> Union[cst.ImportFrom, cst.RemovalSentinel]:
+        """Rewrite 'from old.module[.sub] import x' and 'from old.parent import module'."""
+        self._import_depth -= 1
+        module = self._absolute(updated_node)
+        if not module:
+            return updated_node
+        relative = bool(updated_node.relative)
+
+        renamed = self._renamed(module)
+        if renamed is not None:
+            # Relative imports between files that move together stay valid
+            if relative and self.moving:
+                return updated_node
+            self._changed()
+            return updated_node.with_changes(module=_module_node(renamed), relative=[])
+
+        # A file that moves can't reach outside the module with a relative import
+        # any more, unless the module stays in the same package
+        absolute = {}
+        if relative and self.moving and self.old_parent != self.new_parent:
+            absolute = dict(module=_module_node(module), relative=[])
+
+        # 'from gundam.wing import zero' imports the moved module by name
+        kept_names = []
+        moved = []
+        if module == self.old_parent and not isinstance(updated_node.names, cst.ImportStar):
+            for alias in updated_node.names:
+                if isinstance(alias.name, cst.Name) and alias.name.value == self.old_name:
+                    asname = alias.asname.name.value if alias.asname is not None else None
+                    # Keep the local name the rest of the file uses
+                    if asname is None and self.new_name != self.old_name:
+                        asname = self.old_name
+                    moved.append(asname)
+                else:
+                    kept_names.append(alias)
+        if not moved:
+            if absolute:
+                self._changed()
+                return updated_node.with_changes(**absolute)
+            return updated_node
+
+        self._changed()
+        if not kept_names and len(moved) == 1:
+            if not self.new_parent:
+                return self._import_statement(moved[0])
+            return cst.ImportFrom(
+                module=_module_node(self.new_parent),
+                names=[self._alias(moved[0])],
+                whitespace_after_from=updated_node.whitespace_after_from,
+                whitespace_before_import=updated_node.whitespace_before_import,
+                whitespace_after_import=updated_node.whitespace_after_import,
+            )
+        for asname in moved:
+            self._added_imports[(self.new_parent, self.new_name, asname)] = None
+        if not kept_names:
+            return cst.RemoveFromParent()
+        if updated_node.lpar is None:
+            kept_names[-1] = kept_names[-1].with_changes(comma=cst.MaybeSentinel.DEFAULT)
+        return updated_node.with_changes(names=kept_names, **absolute)
+
+    def _alias(self, asname: Optional[str]) -> cst.ImportAlias:
+        if asname is None:
+            return cst.ImportAlias(name=cst.Name(value=self.new_name))
+        return cst.ImportAlias(name=cst.Name(value=self.new_name), asname=cst.AsName(name=cst.Name(value=asname)))
+
+    def _import_statement(self, asname: Optional[str]) -> Union[cst.ImportFrom, cst.Import]:
+        """Import the moved module under asname: 'from new.parent import name', or 'import name' at the top level."""
+        if not self.new_parent:
+            return cst.Import(names=[self._alias(asname)])
+        return cst.ImportFrom(module=_module_node(self.new_parent), names=[self._alias(asname)])
+
+    def leave_Attribute(
+        self, original_node: cst.Attribute, updated_node: cst.Attribute
+    ) -> Union[cst.Attribute, cst.Name]:
+        """Rewrite uses like gundam.wing.zero.X in files that 'import gundam.wing.zero'."""
+        if not self._rewrite_usages or self._import_depth:
+            return updated_node
+        if _dotted_name(updated_node) == self.old_module:
+            self._changed()
+            return _module_node(self.new_module)
+        # A top-level package is a plain name at the root of the chain
+        if '.' not in self.old_module and isinstance(updated_node.value, cst.Name) \
+                and updated_node.value.value == self.old_module:
+            self._changed()
+            return updated_node.with_changes(value=_module_node(self.new_module))
+        return updated_node
+
+    def leave_Module(self, original_node: cst.Module, updated_node: cst.Module) -> cst.Module:
+        """Add the imports split out of statements that also import other names."""
+        if not self._added_imports:
+            return updated_node
+        new_imports = [
+            cst.SimpleStatementLine(body=[self._import_statement(asname)]) for _, _, asname in self._added_imports
+        ]
+        return updated_node.with_changes(body=new_imports + list(updated_node.body))
+
+def _module_name(file_path: Path, root: Optional[str]) -> Optional[str]:
+    """Return a file's dotted module name relative to a source root, or None."""
+    if root is None:
+        return None
+    try:
+        parts = _module_parts(Path(os.path.abspath(file_path)).relative_to(root))
+    except ValueError:
+        return None
+    return '.'.join(parts) if parts else None
+
+def process_file_module(
+    file_path: Path,
+    old_module: str,
+    new_module: str,
+    root: Optional[str] = None,
+    dry_run: bool = False
+) -> int:
+    """
+    Rewrite the imports of a moved module in a single Python file.
+
+    Args:
+        file_path: Path to the Python file
+        old_module: The module being moved (e.g., 'gundam.wing.zero')
+        new_module: Its new name (e.g., 'gundam.ms.zero')
+        root: The source root old_module is found under, used to name the
+            file for its relative imports
+        dry_run: If True, don't modify the file
+
+    Returns:
+        int: The number of imports and uses rewritten (SKIPPED if the
+        prefilter ruled the file out without parsing it)
+    """
+    try:
+        with phase("read"), open(file_path, 'r', encoding='utf-8') as f:
+            source_code = f.read()
+        note(before=source_code)
+
+        module_name = _module_name(file_path, root)
+        transformer = ModuleRenamer(old_module, new_module, file_path, module_name)
+        # Every reference to the module spells out its last part, except the
+        # relative imports of files that move with it
+        with phase("prefilter"):
+            if not transformer.moving and not get_prefilter(transformer.old_name).matches(source_code):
+                return SKIPPED
+
+        with phase("parse"):
+            module = cst.parse_module(source_code)
+        with phase("transform"):
+            modified_module = module.visit(transformer)
+        if not transformer.changes_made:
+            return 0
+
+        with phase("codegen"):
+            modified_code = modified_module.code
+        note(after=modified_code, matches=transformer.matched)
+        edit_made(file_path, source_code, modified_code)
+        if not dry_run:
+            write_file(file_path, modified_code)
+            display.success(f"Updated {file_path}")
+        return transformer.matched
+
+    except Exception as e:
+        note(error=str(e))
+        display.error(f"Error processing {file_path}: {str(e)}")
+        return 0
+
+class ModuleMove(NamedTuple):
+    """What moving a module did."""
+    modified: int
+    total: int
+    skipped: int
+    # The file or package directory that was (or, on a dry run, would be) moved
+    source: Path
+    destination: Path
+
+def _check_module_names(old_module: str, new_module: str) -> None:
+    """Raise ValueError unless both names are dotted module names that can be swapped."""
+    for name in (old_module, new_module):
+        if not name or not all(part.isidentifier() for part in name.split('.')):
+            raise ValueError(f"'{name}' is not a module name like 'package.module'")
+    if old_module == new_module:
+        raise ValueError(f"{old_module} is already called {new_module}")
+    if renamed_module(new_module, old_module, new_module) is not None:
+        raise ValueError(f"Can't move {old_module} inside itself")
+
+def locate_module(modules: ModuleIndex, old_module: str, new_module: str) -> Tuple[Path, Path, Path]:
+    """
+    Find what to move for a module and where it goes.
+
+    Returns:
+        Tuple[Path, Path, Path]: (the module's .py file or package directory,
+        its new path, the source root the module names are relative to)
+
+    Raises:
+        ValueError: If the module can't be found, the new parent package
+            doesn't exist or the new name is taken
+    """
+    module_file = modules.module_file(old_module)
+    if module_file is None:
+        raise ValueError(f"Could not find module {old_module}")
+    source = module_file.parent if module_file.name == '__init__.py' else module_file
+    depth = len(old_module.split('.'))
+    # Absolute, so files can be named relative to it however the directory was given
+    root = Path(os.path.abspath(source)).parents[depth - 1]
+
+    new_parts = new_module.split('.')
+    parent = root.joinpath(*new_parts[:-1])
+    if not parent.is_dir():
+        raise ValueError(f"Could not find target package {'.'.join(new_parts[:-1])} at {parent}")
+    destination = parent / (new_parts[-1] + ('.py' if source.is_file() else ''))
+    for taken in (parent / (new_parts[-1] + '.py'), parent / new_parts[-1]):
+        if taken.exists():
+            raise ValueError(f"{new_module} already exists at {taken}")
+    return source, destination, root
+
+def move_module(
+    directory: Path,
+    old_module: str,
+    new_module: str,
+    dry_run: bool = False,
+    max_workers: Optional[int] = None,
+    exclude: Sequence[str] = (),
+    include: Sequence[str] = (),
+    fsync: str = DEFAULT_FSYNC,
+    executor: str = DEFAULT_EXECUTOR,
+    use_cache: bool = True,
+    rebuild_index: bool = False
+) -> ModuleMove:
+    """
+    Move a module or package and rewrite every import of it in one pass.
+
+    Only files the import index lists as importing the module, something
+    inside it or a package containing it are read, along with the files of
+    its top-level package (which may import it relatively) and the files
+    that move. Each is parsed at most once. The files are moved on disk
+    after every rewritten file has been written.
+
+    Args:
+        directory: Root directory to process
+        old_module: The module to move (e.g., 'gundam.wing.zero')
+        new_module: Its new name (e.g., 'gundam.ms.zero')
+        dry_run: If True, don't modify or move files
+        max_workers: Maximum number of parallel workers
+        exclude: Extra globs of files or directories to skip
+        include: If given, only process files matching one of these globs
+        fsync: When to flush rewritten files to disk (see writer.FSYNC_POLICIES)
+        executor: How to run the batch (see executor.EXECUTORS); "auto" picks by size
+        use_cache: If False, bypass the on-disk import index
+        rebuild_index: If True, rebuild the import index from scratch
+
+    Raises:
+        ValueError: If the names are invalid, the module can't be found or
+            the destination is taken
+    """
+    _check_module_names(old_module, new_module)
+    modules = ModuleIndex.scan(directory, exclude, include)
+    source, destination, root = locate_module(modules, old_module, new_module)
+
+    import_map = build_import_map(
+        directory, use_cache=use_cache, rebuild=rebuild_index, files=modules.files,
+        exclude=exclude, include=include, executor=executor
+    )
+    candidates: Set[Path] = import_map.files_reaching(old_module)
+    # Relative imports aren't in the index, and can only come from inside the top-level package
+    package = os.path.join(os.path.abspath(root), old_module.split('.')[0]) + os.sep
+    candidates.update(file_path for file_path in modules.files if os.path.abspath(file_path).startswith(package))
+    files = sorted(candidates)
+    display.info(f"Found {len(files)} files that may import {old_module}")
+
+    modified = skipped = 0
+    with FileWriter(fsync) as writer:
+        for _, result in iter_files_parallel(
+            files, process_file_module, old_module, new_module, str(root),
+            dry_run=dry_run, max_workers=max_workers, executor=executor
+        ):
+            if result is SKIPPED:
+                skipped += 1
+            elif result:
+                modified += 1
+
+    if dry_run:
+        display.info(f"Would move {source} to {destination}")
+        display.show_dry_run_notice()
+    elif writer.failed:
+        display.error(f"Not moving {source}: some files could not be written")
+    else:
+        os.rename(source, destination)
+        display.success(f"Moved {source} to {destination}")
+    return ModuleMove(modified, len(files), skipped, source, destination)
@@ -0,0 +1,206 @@
+"""Index of which file defines each module and symbol in a tree."""
+import ast
+import os
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+from .profiling import phase
+
+# Directories that hold the importable code in a src layout
+SRC_DIRS = ("src",)
+# Re-exports followed before giving up on finding a definition
+MAX_REEXPORT_HOPS = 8
+
+class ModuleDefinitions(NamedTuple):
+    """Top-level names in a module."""
+    defined: Set[str]
+    # Names imported with 'from x import y [as z]': local name to (module, name)
+    imported: Dict[str, Tuple[str, str]]
+
+def _module_parts(relative: Path) -> Optional[List[str]]:
+    """Return the dotted parts for a path relative to a source root, or None."""
+    parts = list(relative.parts)
+    if not parts or not parts[-1].endswith('.py'):
+        return None
+    parts[-1] = parts[-1][:-3]
+    if parts[-1] == '__init__':
+        parts.pop()
+    if not parts or not all(part.isidentifier() for part in parts):
+        return None
+    return parts
+
+def source_roots(directory: Path) -> List[Path]:
+    """
+    Return the directories module names are relative to, most specific first.
+
+    That is a src/ directory (src layout), the directory containing the
+    outermost package when the directory is itself inside a package, and
+    the directory itself, so 'pkg.mod' resolves whichever of them is passed.
+    Namespace packages need no special casing: any directory is a package.
+    """
+    directory = Path(os.path.abspath(directory))
+    roots = [directory / name for name in SRC_DIRS if (directory / name).is_dir()]
+    parent = directory
+    while (parent / '__init__.py').is_file() and parent.parent != parent:
+        parent = parent.parent
+    if parent != directory:
+        roots.append(parent)
+    roots.append(directory)
+    return roots
+
+def scan_definitions(file_path: Path) -> ModuleDefinitions:
+    """Collect a module's top-level definitions and 'from' imports using ast."""
+    defined: Set[str] = set()
+    imported: Dict[str, Tuple[str, str]] = {}
+    try:
+        with open(file_path, 'rb') as f:
+            tree = ast.parse(f.read())
+    except Exception:
+        return ModuleDefinitions(defined, imported)
+
+    for node in tree.body:
+        if isinstance(node, (ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)):
+            defined.add(node.name)
+        elif isinstance(node, ast.Assign):
+            defined.update(target.id for target in node.targets if isinstance(target, ast.Name))
+        elif isinstance(node, ast.AnnAssign) and isinstance(node.target, ast.Name):
+            defined.add(node.target.id)
+        elif isinstance(node, ast.ImportFrom):
+            module = '.' * node.level + (node.module or '')
+            for alias in node.names:
+                if alias.name != '*':
+                    imported[alias.asname or alias.name] = (module, alias.name)
+    return ModuleDefinitions(defined, imported)
+
+class ModuleIndex:
+    """
+    Map module names to files and qualified names to the file defining them.
+
+    The module map is built once from a file listing, without reading any
+    file. Symbols are resolved by scanning only the module they are looked
+    up in (and, for re-exports such as a package's __init__.py importing
+    from a submodule, the modules they come from); each module's scan is
+    kept until the file changes, so a long-lived index stays correct.
+    """
+
+    def __init__(self, directory: Path, files: Iterable[Path]):
+        """
+        Build the module map.
+
+        Args:
+            directory: Root directory the files were found in
+            files: Python files to index
+        """
+        self.directory = Path(directory)
+        self.roots = source_roots(directory)
+        self.files = list(files)
+        self.modules: Dict[str, Path] = {}
+        self.names: Dict[Path, str] = {}
+        with phase("index"):
+            for file_path in self.files:
+                absolute = Path(os.path.abspath(file_path))
+                for root in self.roots:
+                    try:
+                        parts = _module_parts(absolute.relative_to(root))
+                    except ValueError:
+                        continue
+                    if parts:
+                        name = '.'.join(parts)
+                        # The most specific root names the file; every root can look it up
+                        self.names.setdefault(absolute, name)
+                        self.modules.setdefault(name, file_path)
+        # Scanned definitions with the (mtime, size) they were scanned at
+        self._definitions: Dict[Path, Tuple[Optional[Tuple[int, int]], ModuleDefinitions]] = {}
+
+    @classmethod
+    def scan(
+        cls,
+        directory: Path,
+        exclude: Sequence[str] = (),
+        include: Sequence[str] = ()
+    ) -> "ModuleIndex":
+        """Discover the Python files under a directory and index them."""
+        from .utils import find_python_files
+
+        return cls(directory, find_python_files(directory, exclude, include))
+
+    def module_file(self, module: str) -> Optional[Path]:
+        """Return the file of a module (a .py file or a package's __init__.py), or None."""
+        file_path = self.modules.get(module)
+        if file_path is None:
+            # Files outside the listing, e.g. excluded ones, can still be imported
+            file_path = find_module_file(module, self.directory)
+        return file_path
+
+    def module_of(self, file_path: Path) -> Optional[str]:
+        """Return the dotted module name of a file, or None."""
+        return self.names.get(Path(os.path.abspath(file_path)))
+
+    def definitions(self, file_path: Path) -> ModuleDefinitions:
+        """Return the top-level names of a module file, scanning it again only if it changed."""
+        try:
+            stat = os.stat(file_path)
+            version = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            version = None
+        cached = self._definitions.get(file_path)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        definitions = scan_definitions(file_path)
+        self._definitions[file_path] = (version, definitions)
+        return definitions
+
+    def definition_file(self, qualified_name: str) -> Optional[Path]:
+        """
+        Return the file where a class, function or variable is defined.
+
+        Re-exports are followed, so 'pkg.Baz' resolves to pkg/impl.py when
+        pkg/__init__.py does 'from .impl import Baz'.
+        """
+        return self._resolve(qualified_name)
+
+    def _resolve(self, qualified_name: str) -> Optional[Path]:
+        seen = set()
+        for _ in range(MAX_REEXPORT_HOPS):
+            if qualified_name in seen:
+                return None
+            seen.add(qualified_name)
+            module, _, name = qualified_name.rpartition('.')
+            file_path = self.module_file(module) if module else None
+            if file_path is None:
+                return None
+            definitions = self.definitions(file_path)
+            if name in definitions.defined:
+                return file_path
+            source = definitions.imported.get(name)
+            if source is None:
+                return None
+            source_module, source_name = source
+            qualified_name = f"{self._absolute(source_module, module, file_path)}.{source_name}"
+        return None
+
+    @staticmethod
+    def _absolute(source_module: str, module: str, file_path: Path) -> str:
+        """Resolve a possibly relative 'from' module against the importing module."""
+        level = len(source_module) - len(source_module.lstrip('.'))
+        if not level:
+            return source_module
+        # A package's __init__ is its own package; a plain module lives in its parent
+        package = module.split('.') if file_path.name == '__init__.py' else module.split('.')[:-1]
+        base = package[:len(package) - (level - 1)] if level > 1 else package
+        rest = source_module[level:]
+        return '.'.join(base + ([rest] if rest else []))
+
+def find_module_file(module_path: str, search_path: Path) -> Optional[Path]:
+    """
+    Find the Python file of a module by probing the disk.
+
+    Tries module.py and module/__init__.py under the search path, then under
+    a src/ directory in it.
+    """
+    relative = module_path.replace('.', '/')
+    for root in [search_path] + [search_path / name for name in SRC_DIRS]:
+        for candidate in (root / (relative + '.py'), root / relative / '__init__.py'):
+            if candidate.is_file():
+                return candidate
+    return None
@@ -0,0 +1,405 @@
+"""Single-pass pipeline applying a plan of definition moves, import replacements and call rules."""
+import os
+import libcst as cst
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from ..display import display
+from .call_replacer import CallReplacer, CallRules
+from .def_mover import (
+    DefinitionExtractor, add_definition, defined_in_own_module, locate_move, split_import, write_module
+)
+from .events import note, process_one
+from .executor import DEFAULT_EXECUTOR
+from .import_replacer import ImportMapping, ImportReplacer
+from .modules import ModuleIndex
+from .prefilter import SKIPPED, Prefilter, call_path
+from .profiling import file_timer, phase
+from .sharding import Shard
+from .writer import DEFAULT_FSYNC, FileWriter
+from .utils import find_python_files, iter_files_parallel
+
+class Plan:
+    """
+    The rules of a migration plan, compiled for a single pass over each file.
+
+    Every file goes through the same stages in order: definitions are moved,
+    then imports (including those of moved definitions) are replaced, then
+    calls are rewritten.
+    """
+
+    def __init__(self, moves: Dict[str, str], imports: Dict[str, str], calls: Dict[str, str]):
+        """
+        Initialize the plan.
+
+        Args:
+            moves: Dict mapping the import paths of definitions to where they move
+            imports: Dict mapping old import paths to new ones
+            calls: Dict mapping old call patterns to new ones, in the order they are tried
+        """
+        self.moves = dict(moves)
+        self.imports = dict(imports)
+        # Importers of a moved definition follow it to its new module
+        pairs = dict(self.imports)
+        pairs.update(self.moves)
+        self.mapping = ImportMapping(pairs) if pairs else None
+        self.rules = CallRules(calls) if calls else None
+
+        needles: List[str] = []
+        if self.mapping is not None:
+            needles.extend(name for _, name in self.mapping.lookup)
+        if self.rules is not None:
+            needles.extend(self.rules.dispatch)
+        self.prefilter = Prefilter(needles)
+
+    @classmethod
+    def from_tables(cls, tables: Dict[str, Dict[str, str]]) -> "Plan":
+        """Create a plan from the tables returned by config.load_plan."""
+        return cls(tables.get('moves', {}), tables.get('imports', {}), tables.get('calls', {}))
+
+    def __len__(self) -> int:
+        return len(self.moves) + len(self.imports) + (len(self.rules) if self.rules is not None else 0)
+
+    def conflicts(self) -> List[str]:
+        """
+        Return the rules that can't be applied together in one pass.
+
+        Two rules conflict when they would rewrite the same import to
+        different targets, or when one rewrites what another produces: a
+        single pass applies only the first step of such a chain.
+        """
+        conflicts = []
+        targets: Dict[str, str] = {}
+        for old_path, new_path in self.moves.items():
+            if split_import(old_path)[1] != split_import(new_path)[1]:
+                conflicts.append(f"move {old_path} -> {new_path} would rename the definition")
+            if new_path in targets:
+                conflicts.append(f"{targets[new_path]} and {old_path} are both moved to {new_path}")
+            targets[new_path] = old_path
+            replacement = self.imports.get(old_path, new_path)
+            if replacement != new_path:
+                conflicts.append(f"{old_path} is moved to {new_path} but [imports] replaces it with {replacement}")
+
+        pairs = self.mapping.pairs if self.mapping is not None else {}
+        for old_import, new_import in pairs.items():
+            if new_import in pairs and new_import != old_import:
+                conflicts.append(
+                    f"{new_import} replaces {old_import} but is itself replaced by {pairs[new_import]}"
+                )
+
+        calls = self.rules.pairs if self.rules is not None else {}
+        chains = {call_path(old_call): old_call for old_call in reversed(list(calls))}
+        for old_call, new_call in calls.items():
+            chain = call_path(new_call)
+            if chain in chains and chain != call_path(old_call):
+                conflicts.append(f"{new_call} replaces {old_call} but is itself matched by {chains[chain]}")
+        return conflicts
+
+class PlanResult(NamedTuple):
+    """What applying a plan did to one file."""
+    # Whether the file changed (SKIPPED if the prefilter ruled it out)
+    modified: bool
+    # Old import paths of the definitions moved out of or into the file
+    moves: List[str]
+    # Old imports replaced in the file
+    imports: List[str]
+    # Old call pattern to the number of calls it replaced
+    calls: Dict[str, int]
+    # (applied rule, shadowed rule) to the number of calls both matched
+    overlaps: Dict[Tuple[str, str], int]
+    # Why the file couldn't be processed, if it couldn't
+    error: Optional[str] = None
+
+    @classmethod
+    def unchanged(cls, modified: bool = False) -> "PlanResult":
+        """Return the result for a file nothing was done to, with fresh empty totals."""
+        return cls(modified, [], [], {}, {})
+
+class PlanReport:
+    """Totals of what a plan did across a tree."""
+
+    def __init__(self, plan: Plan):
+        """
+        Initialize empty totals for every rule in a plan.
+
+        Args:
+            plan: The plan being applied
+        """
+        self.plan = plan
+        self.total = 0
+        self.modified = 0
+        self.skipped = 0
+        self.errors = 0
+        # Old import (moved definitions included) to the number of files its imports were replaced in
+        self.imports = {old_import: 0 for old_import in (plan.mapping.pairs if plan.mapping is not None else ())}
+        # Old call pattern to the number of calls it replaced
+        self.calls = {old_call: 0 for old_call in (plan.rules.pairs if plan.rules is not None else ())}
+        self.overlaps: Dict[Tuple[str, str], int] = {}
+
+    def add(self, result: Optional[PlanResult]) -> None:
+        """Add the result of one file; None means the processor raised."""
+        self.total += 1
+        if result is None or result.error is not None:
+            self.errors += 1
+            return
+        if result.modified is SKIPPED:
+            self.skipped += 1
+        elif result.modified:
+            self.modified += 1
+        for old_import in result.imports:
+            self.imports[old_import] += 1
+        for old_call, count in result.calls.items():
+            self.calls[old_call] += count
+        for key, count in result.overlaps.items():
+            self.overlaps[key] = self.overlaps.get(key, 0) + count
+
+    def rows(self) -> List[Tuple[str, str, str, int]]:
+        """
+        Return (kind, old, new, count) for every rule.
+
+        Counts are the files whose imports were replaced for moves and
+        imports, and the calls replaced for call rules.
+        """
+        rows = [("move", old, new, self.imports[old]) for old, new in self.plan.moves.items()]
+        rows.extend(
+            ("import", old, new, self.imports[old]) for old, new in self.plan.imports.items()
+            if old not in self.plan.moves
+        )
+        if self.plan.rules is not None:
+            rows.extend(("call", old, new, self.calls[old]) for old, new in self.plan.rules.pairs.items())
+        return rows
+
+def process_file_plan(
+    file_path: Path,
+    plan: Plan,
+    dry_run: bool = False,
+    parsed: Optional[Tuple[str, cst.Module]] = None,
+    moved: Sequence[str] = (),
+    definitions: Sequence[cst.CSTNode] = ()
+) -> PlanResult:
+    """
+    Run a file through every stage of a plan, generating and writing its code once.
+
+    Args:
+        file_path: Path to the Python file
+        plan: The plan to apply
+        dry_run: If True, don't modify the file
+        parsed: The file's source and module, already parsed by the caller;
+            the prefilter is skipped for such files
+        moved: Old import paths of the definitions moved out of (already
+            extracted from parsed) or into this file
+        definitions: Definitions moved into this file, appended in order
+
+    Returns:
+        PlanResult: What changed in the file (modified is SKIPPED if the
+        prefilter ruled the file out without parsing it, and error is set
+        if it couldn't be read, parsed or written)
+    """
+    try:
+        if parsed is None:
+            with phase("read"), open(file_path, 'r', encoding='utf-8') as f:
+                source_code = f.read()
+            note(before=source_code)
+
+            # Files that never mention an imported name or called attribute can't match
+            with phase("prefilter"):
+                if not plan.prefilter.matches(source_code):
+                    return PlanResult.unchanged(SKIPPED)
+
+            with phase("parse"):
+                module = cst.parse_module(source_code)
+        else:
+            source_code, module = parsed
+            note(before=source_code)
+
+        importer = ImportReplacer.from_mapping(plan.mapping) if plan.mapping is not None else None
+        caller = CallReplacer.from_rules(plan.rules) if plan.rules is not None else None
+        with phase("transform"):
+            for definition in definitions:
+                module = add_definition(module, definition)
+            if importer is not None:
+                module = module.visit(importer)
+            if caller is not None:
+                module = module.visit(caller)
+
+        moves = list(moved)
+        imports = sorted(importer.matched) if importer is not None else []
+        calls = dict(caller.hits) if caller is not None else {}
+        overlaps = dict(caller.overlaps) if caller is not None else {}
+        modified = bool(moves or imports or calls)
+        if modified:
+            note(matches=len(moves) + len(imports) + sum(calls.values()))
+            write_module(file_path, source_code, module, dry_run)
+            if not dry_run:
+                display.success(f"Updated {file_path}")
+            else:
+                display.info(f"Would update {file_path}")
+        return PlanResult(modified, moves, imports, calls, overlaps)
+
+    except Exception as e:
+        note(error=str(e))
+        display.error(f"Error processing {file_path}: {str(e)}")
+        return PlanResult.unchanged()._replace(error=str(e))
+
+def _parse_file(file_path: Path) -> Tuple[str, cst.Module]:
+    """Read and parse a file."""
+    with phase("read"), open(file_path, 'r', encoding='utf-8') as f:
+        source_code = f.read()
+    with phase("parse"):
+        return source_code, cst.parse_module(source_code)
+
+def _top_level_names(module: cst.Module) -> List[str]:
+    """Return the names of the classes and functions a module defines at the top level."""
+    return [
+        statement.name.value for statement in module.body
+        if isinstance(statement, (cst.ClassDef, cst.FunctionDef))
+    ]
+
+def _prepare_moves(
+    directory: Path,
+    plan: Plan,
+    modules: Optional[ModuleIndex]
+) -> Dict[Path, Tuple[Tuple[str, cst.Module], List[str], List[cst.CSTNode]]]:
+    """
+    Extract every moved definition before any file is written.
+
+    Each source and target module is parsed once, here, and handed to the
+    pipeline already parsed.
+
+    Returns:
+        Dict of file path to (parsed source, old import paths moved out of
+        or into it, definitions moved into it)
+
+    Raises:
+        ValueError: If a module or definition can't be found, or the target
+            already defines the name
+    """
+    paths: Dict[str, Path] = {}
+    parsed: Dict[str, Tuple[str, cst.Module]] = {}
+    moved: Dict[str, List[str]] = {}
+    definitions: Dict[str, List[cst.CSTNode]] = {}
+
+    def prepare(file_path: Path) -> str:
+        key = os.path.abspath(file_path)
+        if key not in parsed:
+            paths[key] = file_path
+            parsed[key] = _parse_file(file_path)
+            moved[key], definitions[key] = [], []
+        return key
+
+    located = []
+    for old_path, new_path in plan.moves.items():
+        source_file, target_file = locate_move(directory, old_path, new_path, modules)
+        if source_file is None:
+            raise ValueError(f"Could not find source module for {old_path}")
+        if not defined_in_own_module(old_path, source_file, modules):
+            raise ValueError(f"Could not move {old_path}")
+        if target_file is None:
+            raise ValueError(f"Could not find target module for {new_path}")
+        located.append((old_path, prepare(source_file), prepare(target_file)))
+
+    for old_path, source_key, target_key in located:
+        source_code, module = parsed[source_key]
+        with phase("transform"):
+            extractor = DefinitionExtractor(split_import(old_path)[1])
+            module = module.visit(extractor)
+        if not extractor.found:
+            raise ValueError(f"Could not find definition for {old_path}")
+        parsed[source_key] = (source_code, module)
+        moved[source_key].append(old_path)
+        moved[target_key].append(old_path)
+        definitions[target_key].append(extractor.extracted_node)
+
+    # Only check for clashes once every definition has left its module
+    for key, (_, module) in parsed.items():
+        existing = set(_top_level_names(module))
+        for definition in definitions[key]:
+            if definition.name.value in existing:
+                raise ValueError(f"{definition.name.value} is already defined in {paths[key]}")
+            existing.add(definition.name.value)
+    return {paths[key]: (parsed[key], moved[key], definitions[key]) for key in parsed}
+
+def apply_plan(
+    directory: Path,
+    plan: Plan,
+    dry_run: bool = False,
+    max_workers: Optional[int] = None,
+    exclude: Sequence[str] = (),
+    include: Sequence[str] = (),
+    since: Optional[str] = None,
+    staged: bool = False,
+    fsync: str = DEFAULT_FSYNC,
+    executor: str = DEFAULT_EXECUTOR,
+    shard: Optional[Shard] = None
+) -> PlanReport:
+    """
+    Apply a plan across Python files, parsing and writing each file once.
+
+    The modules that definitions move out of and into are prepared in this
+    process first, so nothing is written if a move can't be made; every
+    other file goes through the pipeline in parallel. With a shard every
+    definition is still extracted, so targets in this shard receive theirs,
+    but only the files belonging to the shard are written.
+
+    Args:
+        directory: Root directory to process
+        plan: The plan to apply
+        dry_run: If True, don't modify files
+        max_workers: Maximum number of parallel workers
+        exclude: Extra globs of files or directories to skip
+        include: If given, only process files matching one of these globs
+        since: Only process files changed since this git ref
+        staged: Only process files with staged changes
+        fsync: When to flush rewritten files to disk (see writer.FSYNC_POLICIES)
+        executor: How to run the batch (see executor.EXECUTORS); "auto" picks by size
+        shard: Only process the files belonging to this shard of the run
+
+    Returns:
+        PlanReport: Totals per rule and file counts
+
+    Raises:
+        ValueError: If the plan's rules conflict or a move can't be made
+    """
+    conflicts = plan.conflicts()
+    if conflicts:
+        raise ValueError("The plan has conflicting rules:\n  " + "\n  ".join(conflicts))
+
+    report = PlanReport(plan)
+    modules = None
+    if since is None and not staged:
+        modules = ModuleIndex.scan(directory, exclude, include)
+        files = modules.files
+    else:
+        files = find_python_files(directory, exclude, include, since=since, staged=staged)
+    if not files:
+        display.warning(f"No Python files found in {directory}")
+        return report
+
+    prepared = _prepare_moves(directory, plan, modules) if plan.moves else {}
+    prepared_keys = {os.path.abspath(file_path) for file_path in prepared}
+    if shard is not None:
+        file_keys = {os.path.abspath(file_path) for file_path in files}
+        selected = {os.path.abspath(file_path) for file_path in shard.select(
+            list(files) + [file_path for file_path in prepared if os.path.abspath(file_path) not in file_keys],
+            directory
+        )}
+        prepared = {file_path: value for file_path, value in prepared.items() if os.path.abspath(file_path) in selected}
+        files = [file_path for file_path in files if os.path.abspath(file_path) in selected]
+    others = [file_path for file_path in files if os.path.abspath(file_path) not in prepared_keys]
+    display.info(f"Applying {len(plan)} rules to {len(others) + len(prepared)} files")
+
+    with FileWriter(fsync):
+        for file_path, (parsed, moved, definitions) in sorted(prepared.items()):
+            with file_timer(file_path):
+                report.add(process_one(
+                    file_path, process_file_plan, plan, dry_run=dry_run,
+                    parsed=parsed, moved=moved, definitions=definitions
+                ))
+        for _, result in iter_files_parallel(
+            others, process_file_plan, plan, dry_run=dry_run, max_workers=max_workers, executor=executor
+        ):
+            report.add(result)
+
+    if dry_run:
+        display.show_dry_run_notice()
+    return report
@@ -0,0 +1,69 @@
+"""Cheap text prefilter that rejects files before any CST work."""
+import re
+from functools import lru_cache
+from typing import Iterable
+
+# Above this many needles a single regex alternation gets slow, so the
+# prefilter switches to intersecting the file's identifiers with a set
+MAX_REGEX_NEEDLES = 32
+
+_IDENTIFIER = re.compile(r'\w+')
+
+class _Skipped:
+    """Falsy marker returned by processors for files rejected by the prefilter."""
+
+    def __bool__(self) -> bool:
+        return False
+
+    def __repr__(self) -> str:
+        return "SKIPPED"
+
+    def __reduce__(self) -> str:
+        # Keep the singleton identity when results cross process boundaries
+        return "SKIPPED"
+
+SKIPPED = _Skipped()
+
+class Prefilter:
+    """
+    Decide from raw source text whether a file can possibly match.
+
+    A file passes if any of the needles appears in it as a whole word. This
+    never rejects a file a transformer would change, but lets most files skip
+    parsing entirely.
+    """
+
+    def __init__(self, needles: Iterable[str]):
+        """
+        Initialize the prefilter.
+
+        Args:
+            needles: Identifiers to look for (e.g., the imported name or the
+                final attribute of a call chain)
+        """
+        self.needles = frozenset(needle for needle in needles if needle)
+        self._pattern = None
+        if len(self.needles) <= MAX_REGEX_NEEDLES:
+            alternation = '|'.join(re.escape(needle) for needle in sorted(self.needles))
+            self._pattern = re.compile(rf'\b(?:{alternation})\b')
+
+    def matches(self, source: str) -> bool:
+        """Return True if the source might contain a match."""
+        if not self.needles:
+            return True
+        if self._pattern is not None:
+            return self._pattern.search(source) is not None
+        return not self.needles.isdisjoint(_IDENTIFIER.findall(source))
+
+@lru_cache(maxsize=64)
+def get_prefilter(*needles: str) -> Prefilter:
+    """Return a cached prefilter so workers compile each pattern only once."""
+    return Prefilter(needles)
+
+def call_tail(call: str) -> str:
+    """Return the final attribute of a call pattern (e.g., 'get' for 'self.client.get(1)')."""
+    return call.split('(', 1)[0].split('.')[-1].strip()
+
+def call_path(call: str) -> str:
+    """Return the dotted chain of a call pattern (e.g., 'self.client.get' for 'self.client.get(1)')."""
+    return call.split('(', 1)[0].strip()
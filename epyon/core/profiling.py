@@ -0,0 +1,139 @@
+"""Per-phase timing of a run, aggregated across worker processes."""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional
+
+# Phases in the order a file goes through them
+PHASES = ("discovery", "index", "read", "prefilter", "parse", "transform", "codegen", "diff", "write")
+DEFAULT_SLOWEST = 10
+# Worker threads add to the same profile; a profile itself has to stay picklable
+_lock = threading.Lock()
+
+class FileTiming(NamedTuple):
+    """Time spent on one file."""
+    path: str
+    size: int
+    seconds: float
+
+class Profile:
+    """
+    Time spent per phase and per file during a run.
+
+    Workers fill in a profile of their own for every chunk they process,
+    which the parent merges into its profile when the chunk comes back.
+    """
+
+    def __init__(self):
+        self.phases: Dict[str, float] = {}
+        self.files: List[FileTiming] = []
+        self.wall_seconds = 0.0
+
+    def add(self, phase: str, seconds: float) -> None:
+        """Add time to a phase."""
+        with _lock:
+            self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    def add_file(self, file_path: Path, seconds: float) -> None:
+        """Record the total time spent processing a file."""
+        try:
+            size = os.stat(file_path).st_size
+        except OSError:
+            size = 0
+        self.files.append(FileTiming(str(file_path), size, seconds))
+
+    def merge(self, other: "Profile") -> None:
+        """Fold another profile, e.g. one sent back by a worker, into this one."""
+        for phase, seconds in other.phases.items():
+            self.add(phase, seconds)
+        self.files.extend(other.files)
+
+    def file_totals(self) -> List[FileTiming]:
+        """Return one timing per file, adding up files that were processed more than once."""
+        totals: Dict[str, FileTiming] = {}
+        for timing in self.files:
+            previous = totals.get(timing.path)
+            if previous is not None:
+                timing = timing._replace(seconds=previous.seconds + timing.seconds)
+            totals[timing.path] = timing
+        return list(totals.values())
+
+    def slowest(self, count: int = DEFAULT_SLOWEST) -> List[FileTiming]:
+        """Return the files that took longest, slowest first."""
+        return sorted(self.file_totals(), key=lambda timing: timing.seconds, reverse=True)[:count]
+
+    def ordered_phases(self) -> List[str]:
+        """Return the recorded phases, known ones in pipeline order first."""
+        return [p for p in PHASES if p in self.phases] + sorted(set(self.phases) - set(PHASES))
+
+    def to_dict(self, slowest: int = DEFAULT_SLOWEST) -> Dict[str, Any]:
+        """Return a JSON-serialisable summary."""
+        return {
+            "wall_seconds": self.wall_seconds,
+            "files": len(self.file_totals()),
+            "phases": {phase: self.phases[phase] for phase in self.ordered_phases()},
+            "slowest": [timing._asdict() for timing in self.slowest(slowest)],
+        }
+
+    def write_json(self, path: Path, slowest: int = DEFAULT_SLOWEST) -> None:
+        """Write the summary to a JSON file."""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(slowest), f, indent=2)
+
+# The profile being recorded in this process, if any
+_current: Optional[Profile] = None
+
+def current() -> Optional[Profile]:
+    """Return the profile being recorded in this process, or None."""
+    return _current
+
+@contextmanager
+def profiling(enabled: bool = True) -> Iterator[Optional[Profile]]:
+    """
+    Record a profile for the duration of the block.
+
+    Yields the profile, or None if enabled is False, in which case the
+    phase() and file_timer() calls inside cost next to nothing.
+    """
+    global _current
+    if not enabled:
+        yield None
+        return
+
+    previous = _current
+    profile = _current = Profile()
+    start = time.perf_counter()
+    try:
+        yield profile
+    finally:
+        profile.wall_seconds = time.perf_counter() - start
+        _current = previous
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """Attribute the time spent in the block to a phase."""
+    profile = _current
+    if profile is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.add(name, time.perf_counter() - start)
+
+@contextmanager
+def file_timer(file_path: Path) -> Iterator[None]:
+    """Record the time spent in the block against a file."""
+    profile = _current
+    if profile is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.add_file(file_path, time.perf_counter() - start)
@@ -0,0 +1,241 @@
+"""Splitting a run across machines, and merging the results of the shards."""
+import hashlib
+import heapq
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from .events import ACTIONS
+
+# How files are assigned to shards: by a hash of their path, or so every
+# shard gets about the same number of source bytes
+SHARD_MODES = ("hash", "size")
+DEFAULT_SHARD_MODE = "hash"
+
+class Shard(NamedTuple):
+    """One of count shards of a run, numbered from 1."""
+    index: int
+    count: int
+    mode: str = DEFAULT_SHARD_MODE
+
+    def __str__(self) -> str:
+        return f"{self.index}/{self.count}"
+
+    def select(self, files: Sequence[Path], root: Path) -> List[Path]:
+        """
+        Return the files that belong to this shard, in their original order.
+
+        Every shard of a run must be given the same files: the assignment
+        depends only on each file's path relative to root (and, in size
+        mode, on the sizes of all of the files), so machines with the same
+        checkout agree on it wherever the checkout lives.
+
+        Args:
+            files: The files the whole run would process
+            root: The directory paths are made relative to
+        """
+        if self.count == 1:
+            return list(files)
+        if self.mode == "size":
+            owners = _balance_by_size(files, self.count)
+        else:
+            owners = [shard_of(_shard_key(file_path, root), self.count) for file_path in files]
+        return [file_path for file_path, owner in zip(files, owners) if owner == self.index - 1]
+
+def parse_shard(value: str, mode: str = DEFAULT_SHARD_MODE) -> Shard:
+    """
+    Parse a --shard value like '2/4'.
+
+    Raises:
+        ValueError: If the value isn't i/N with 1 <= i <= N, or mode is unknown
+    """
+    if mode not in SHARD_MODES:
+        raise ValueError(f"expected one of {', '.join(SHARD_MODES)}")
+    index, _, count = value.partition('/')
+    try:
+        shard = Shard(int(index), int(count), mode)
+    except ValueError:
+        raise ValueError(f"'{value}' is not a shard like 1/4") from None
+    if not 1 <= shard.index <= shard.count:
+        raise ValueError(f"'{value}' is not a shard like 1/4; the index must be between 1 and {shard.count}")
+    return shard
+
+def _shard_key(file_path: Path, root: Path) -> str:
+    """Return the machine-independent name a file is sharded by."""
+    return os.path.relpath(os.path.abspath(file_path), os.path.abspath(root)).replace(os.sep, '/')
+
+def shard_of(key: str, count: int) -> int:
+    """Return the 0-based shard a path key belongs to, stable across runs and machines."""
+    digest = hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big') % count
+
+def _balance_by_size(files: Sequence[Path], count: int) -> List[int]:
+    """
+    Assign files to shards so each gets about the same number of bytes.
+
+    Files are placed largest first on the shard with the fewest bytes so
+    far (ties go to the lowest shard, then the path decides), which keeps
+    the result deterministic.
+    """
+    sizes = []
+    for position, file_path in enumerate(files):
+        try:
+            size = os.path.getsize(file_path)
+        except OSError:
+            size = 0
+        sizes.append((-size, str(file_path), position))
+    sizes.sort()
+
+    owners = [0] * len(files)
+    loads = [(0, shard) for shard in range(count)]
+    for negative_size, _, position in sizes:
+        load, shard = heapq.heappop(loads)
+        owners[position] = shard
+        heapq.heappush(loads, (load - negative_size, shard))
+    return owners
+
+class MergedResults:
+    """The combined --output jsonl streams of the shards of a run."""
+
+    def __init__(self):
+        self.files: Dict[str, Dict[str, Any]] = {}
+        # One summary per shard stream, with the stream it came from
+        self.summaries: List[Dict[str, Any]] = []
+        self.problems: List[str] = []
+
+    def add_stream(self, path: Path) -> None:
+        """
+        Add the events of one shard's stream.
+
+        Raises:
+            ValueError: If a line isn't a JSON event
+        """
+        summary = None
+        with open(path, 'r', encoding='utf-8') as f:
+            for line_number, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    event = json.loads(line)
+                except ValueError as e:
+                    raise ValueError(f"{path}:{line_number}: not a JSON event: {e}") from e
+                kind = event.get("event") if isinstance(event, dict) else None
+                if kind == "file":
+                    self._add_file(event, path)
+                elif kind == "summary":
+                    summary = dict(event, source=str(path))
+        if summary is None:
+            self.problems.append(f"{path} has no summary event; the shard may not have finished")
+        else:
+            self.summaries.append(summary)
+
+    def _add_file(self, event: Dict[str, Any], source: Path) -> None:
+        """Record a file event, keeping the most interesting one if several shards report the file."""
+        event = dict(event, source=str(source))
+        previous = self.files.get(event["path"])
+        if previous is None:
+            self.files[event["path"]] = event
+            return
+        if previous["source"] != event["source"] and "skipped" not in (previous["action"], event["action"]):
+            self.problems.append(f"{event['path']} was processed by both {previous['source']} and {source}")
+        if ACTIONS.index(event["action"]) < ACTIONS.index(previous["action"]):
+            self.files[event["path"]] = event
+
+    def check_shards(self) -> None:
+        """Note missing or repeated shards, for streams whose summaries say which shard they were."""
+        seen: Dict[str, str] = {}
+        counts = set()
+        for summary in self.summaries:
+            shard = summary.get("shard")
+            if shard is None:
+                continue
+            if shard in seen:
+                self.problems.append(f"shard {shard} appears in both {seen[shard]} and {summary['source']}")
+            seen[shard] = summary["source"]
+            counts.add(shard.partition('/')[2])
+        if len(counts) > 1:
+            self.problems.append(f"the streams come from runs with different shard counts: {', '.join(sorted(counts))}")
+        elif counts:
+            count = int(counts.pop())
+            missing = [f"{index}/{count}" for index in range(1, count + 1) if f"{index}/{count}" not in seen]
+            if missing:
+                self.problems.append(f"missing shards: {', '.join(missing)}")
+
+    def summary(self) -> Dict[str, Any]:
+        """Return the totals of the merged run, in the shape of a summary event."""
+        counts = {action: 0 for action in ACTIONS}
+        for event in self.files.values():
+            counts[event["action"]] += 1
+        return {
+            "event": "summary",
+            "events": len(self.files),
+            **counts,
+            "shards": len(self.summaries),
+            "dry_run": any(summary.get("dry_run") for summary in self.summaries),
+        }
+
+    def events(self) -> Iterable[Dict[str, Any]]:
+        """Yield the merged file events in path order, then the summary."""
+        for path in sorted(self.files):
+            event = dict(self.files[path])
+            del event["source"]
+            yield event
+        yield self.summary()
+
+def merge_results(paths: Iterable[Path]) -> MergedResults:
+    """
+    Merge the --output jsonl streams of the shards of a run.
+
+    Raises:
+        ValueError: If a stream can't be parsed
+    """
+    merged = MergedResults()
+    for path in paths:
+        merged.add_stream(path)
+    merged.check_shards()
+    return merged
+
+def _patch_sections(path: Path) -> Iterator[Tuple[str, List[str]]]:
+    """Yield (label, lines) for each 'diff --git' section of a patch file."""
+    label: Optional[str] = None
+    lines: List[str] = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.startswith("diff --git a/"):
+                if label is not None:
+                    yield label, lines
+                label = line[len("diff --git a/"):].rsplit(" b/", 1)[0]
+                lines = []
+            elif label is None:
+                raise ValueError(f"{path}: expected a patch written by --patch-out")
+            lines.append(line)
+    if label is not None:
+        yield label, lines
+
+def merge_patches(paths: Iterable[Path], out: Path) -> int:
+    """
+    Combine the --patch-out files of the shards of a run into one patch.
+
+    Files are written in path order, as PatchWriter does.
+
+    Returns:
+        int: The number of files the merged patch changes
+
+    Raises:
+        ValueError: If a file isn't a patch, or two patches change the same file
+    """
+    sections: Dict[str, List[str]] = {}
+    sources: Dict[str, Path] = {}
+    for path in paths:
+        seen_here = set()
+        for label, lines in _patch_sections(path):
+            if label in sources and label not in seen_here:
+                raise ValueError(f"{label} is changed by both {sources[label]} and {path}")
+            sources[label] = path
+            seen_here.add(label)
+            sections.setdefault(label, []).extend(lines)
+    with open(out, 'w', encoding='utf-8') as f:
+        for label in sorted(sections):
+            f.writelines(sections[label])
+    return len(sections)
@@ -1,16 +1,112 @@
 """Common utility functions."""
 import ast
-import concurrent.futures
+import os
 from pathlib import Path
-from typing import List, Dict, Set, Callable, Any, Optional, Union, Tuple
+from typing import List, Dict, Set, Callable, Any, Iterable, Iterator, NamedTuple, Optional, Sequence, Union, Tuple
 
-def find_python_files(directory: Path) -> List[Path]:
-    """Recursively find all Python files in a directory."""
-    python_files = []
-    for path in directory.rglob('*.py'):
-        if path.is_file():
-            python_files.append(path)
-    return python_files
+from ..display import display
+from .cache import ImportIndexCache, hash_content
+from .edits import Edit, collecting_edits, edits_wanted, publish
+from .events import FileEvent, active_collector, record
+from .discovery import git_changed_files, iter_python_files
+from .executor import DEFAULT_EXECUTOR, WorkerPool, select_executor
+from .import_map import ImportMap
+from .profiling import Profile, current, file_timer, phase, profiling
+from .writer import active_writer, collecting
+
+# Upper bound on the source bytes sent to a worker in one task
+DEFAULT_CHUNK_BYTES = 256 * 1024
+# Upper bound on the number of files sent to a worker in one task
+MAX_CHUNK_FILES = 64
+
+def find_python_files(
+    directory: Path,
+    exclude: Sequence[str] = (),
+    include: Sequence[str] = (),
+    respect_gitignore: Optional[bool] = None,
+    since: Optional[str] = None,
+    staged: bool = False
+) -> List[Path]:
+    """
+    Recursively find the Python files in a directory.
+
+    Vendored, build and ignored directories are skipped; see
+    discovery.iter_python_files for the rules. With since or staged, only
+    the files git reports as changed are returned (see
+    discovery.git_changed_files).
+
+    The walk is collected into a list because everything downstream needs
+    the whole batch before it starts: chunks are built largest files first,
+    the executor is chosen by file count and size, progress bars need a
+    total, and module indexes and shards are built over every file.
+
+    Raises:
+        ValueError: If since or staged is given outside a git repository,
+            or since is not a valid ref
+    """
+    with phase("discovery"):
+        if since is not None or staged:
+            return git_changed_files(directory, since, staged, exclude, include)
+        return list(iter_python_files(directory, exclude, include, respect_gitignore))
+
+class FileScan(NamedTuple):
+    """What the index records about a file."""
+    imports: Iterable[str]
+    # Dotted attribute-call chain (e.g. 'self.client.get') to the lines calling it
+    calls: Dict[str, List[int]]
+
+def call_chain(func: ast.expr) -> Optional[str]:
+    """
+    Return the dotted chain a call is made through, e.g. 'self.client.get'.
+
+    Only attribute chains rooted at a plain name count, which are the calls
+    CallReplacer can match; 'get()' or 'make().get()' give None.
+    """
+    if not isinstance(func, ast.Attribute):
+        return None
+    parts = []
+    while isinstance(func, ast.Attribute):
+        parts.append(func.attr)
+        func = func.value
+    if not isinstance(func, ast.Name):
+        return None
+    parts.append(func.id)
+    return '.'.join(reversed(parts))
+
+def _scan_source(source: Union[str, bytes], calls: bool = True) -> FileScan:
+    """Collect fully qualified import paths, and optionally call chains, from Python source."""
+    imports = set()
+    chains: Dict[str, List[int]] = {}
+    tree = ast.parse(source)
+    
+    for node in ast.walk(tree):
+        # Import statements like "import foo.bar"
+        if isinstance(node, ast.Import):
+            for name in node.names:
+                imports.add(name.name)
+        
+        # Import from statements like "from foo import bar"
+        elif isinstance(node, ast.ImportFrom) and node.module:
+            module = node.module
+            for name in node.names:
+                if name.name == '*':
+                    imports.add(module)
+                else:
+                    imports.add(f"{module}.{name.name}")
+        
+        # Calls through attribute chains like "self.client.get(...)"
+        elif calls and isinstance(node, ast.Call):
+            chain = call_chain(node.func)
+            if chain is not None:
+                chains.setdefault(chain, []).append(node.lineno)
+    
+    for lines in chains.values():
+        lines.sort()
+    return FileScan(imports, chains)
+
+def _imports_from_source(source: Union[str, bytes]) -> Set[str]:
+    """Collect fully qualified import paths from Python source."""
+    return _scan_source(source, calls=False).imports
 
 def scan_imports(file_path: Path) -> Set[str]:
     """
@@ -22,73 +118,463 @@ def scan_imports(file_path: Path) -> Set[str]:
     Returns:
         Set of fully qualified import paths 
     """
-    imports = set()
-    
     try:
         with open(file_path, 'r', encoding='utf-8') as f:
             source = f.read()
         
-        tree = ast.parse(source)
-        
-        for node in ast.walk(tree):
-            # Import statements like "import foo.bar"
-            if isinstance(node, ast.Import):
-                for name in node.names:
-                    imports.add(name.name)
-            
-            # Import from statements like "from foo import bar"
-            elif isinstance(node, ast.ImportFrom) and node.module:
-                module = node.module
-                for name in node.names:
-                    if name.name == '*':
-                        imports.add(module)
-                    else:
-                        imports.add(f"{module}.{name.name}")
-        
-        return imports
+        return _imports_from_source(source)
     except Exception:
         # If there's any error parsing the file, return an empty set
         return set()
 
-def build_import_map(directory: Path, max_workers: Optional[int] = None) -> Dict[str, Set[Path]]:
+def scan_file(file_path: Path, known_hash: Optional[str] = None) -> Tuple[str, Optional[FileScan]]:
+    """
+    Hash a Python file and scan it for imports and call chains if its content changed.
+    
+    Args:
+        file_path: Path to the Python file
+        known_hash: Content hash from a previous scan, if any
+        
+    Returns:
+        Tuple of (content_hash, scan). The scan is None when the content
+        hash equals known_hash and the previous scan result is still valid.
+    """
+    with open(file_path, 'rb') as f:
+        data = f.read()
+    
+    digest = hash_content(data)
+    if digest == known_hash:
+        return digest, None
+    
+    try:
+        return digest, _scan_source(data)
+    except Exception:
+        return digest, FileScan(set(), {})
+
+def scan_index(
+    directory: Path,
+    max_workers: Optional[int] = None,
+    use_cache: bool = True,
+    rebuild: bool = False,
+    files: Optional[List[Path]] = None,
+    cache: Optional[ImportIndexCache] = None,
+    exclude: Sequence[str] = (),
+    include: Sequence[str] = (),
+    since: Optional[str] = None,
+    staged: bool = False,
+    executor: str = DEFAULT_EXECUTOR,
+    pool: Optional[WorkerPool] = None
+) -> Dict[Path, FileScan]:
+    """
+    Scan files for their imports and call chains.
+
+    Uses a persistent on-disk index so that only files changed since the
+    previous run are scanned again, and scans those in parallel when there
+    are enough of them to pay for the workers. See build_import_map for the
+    arguments.
+
+    Returns:
+        Dict mapping each readable file to its scan
+    """
+    if files is None:
+        files = find_python_files(directory, exclude, include, since=since, staged=staged)
+    python_files = files
+    scans: Dict[Path, FileScan] = {}
+    
+    if cache is None and use_cache:
+        cache = ImportIndexCache(directory)
+        if not rebuild:
+            cache.load()
+    
+    # Reuse cached results for files whose mtime and size are unchanged
+    pending = []
+    for file_path in python_files:
+        if cache is None:
+            pending.append((file_path, None, None))
+            continue
+        try:
+            stat = file_path.stat()
+        except OSError:
+            continue
+        entry = cache.lookup(file_path, stat)
+        if entry is not None:
+            scans[file_path] = FileScan(entry.imports, entry.calls)
+        else:
+            entry = cache.get(file_path)
+            pending.append((file_path, stat, entry.hash if entry else None))
+    
+    # Scan the remaining files, in parallel if there are enough of them
+    if pending:
+        byte_count = sum(stat.st_size for _, stat, _ in pending if stat is not None) if cache is not None else None
+        backend = select_executor(
+            executor,
+            [file_path for file_path, _, _ in pending],
+            pool.max_workers if pool is not None else max_workers,
+            scan=True,
+            byte_count=byte_count
+        )
+        with phase("index"), display.progress("Indexing files", len(pending)) as tracker:
+            for scanned, (file_path, stat, _) in zip(_map_scan(backend, pending, max_workers, pool), pending):
+                tracker.advance(errors=int(scanned is None))
+                if scanned is None:
+                    # If processing a file fails, just skip it
+                    continue
+                digest, scan = scanned
+                if scan is None:
+                    # Content is unchanged, only the file's metadata moved
+                    entry = cache.get(file_path)
+                    scan = FileScan(entry.imports, entry.calls)
+                scans[file_path] = scan
+                if cache is not None:
+                    cache.put(file_path, stat, digest, scan.imports, scan.calls)
+    
+    if cache is not None:
+        # Indexing only the changed files must not evict everything else
+        if since is None and not staged:
+            cache.retain(scans)
+        cache.save()
+    
+    return scans
+
+def build_import_map(
+    directory: Path,
+    max_workers: Optional[int] = None,
+    use_cache: bool = True,
+    rebuild: bool = False,
+    files: Optional[List[Path]] = None,
+    cache: Optional[ImportIndexCache] = None,
+    exclude: Sequence[str] = (),
+    include: Sequence[str] = (),
+    since: Optional[str] = None,
+    staged: bool = False,
+    executor: str = DEFAULT_EXECUTOR,
+    pool: Optional[WorkerPool] = None
+) -> ImportMap:
     """
     Build a map of imports to the files that contain them.
-    Uses parallel processing for speed.
+    Uses a persistent on-disk index so that only files changed since the
+    previous run are scanned again, and scans those in parallel when there
+    are enough of them to pay for the workers.
     
     Args:
         directory: Root directory to process
         max_workers: Maximum number of concurrent workers
+        use_cache: If False, neither read nor write the on-disk index
+        rebuild: If True, ignore the existing index and rebuild it from scratch
+        files: Files to index (default: every Python file under directory)
+        cache: An already loaded index to use and update, e.g. one kept in
+            memory by a long-running process
+        exclude: Extra globs of files or directories to leave out
+        include: If given, only index files matching one of these globs
+        since: Only index files changed since this git ref
+        staged: Only index files with staged changes
+        executor: One of executor.EXECUTORS; "auto" picks by workload size
+        pool: A shared process pool to scan on instead of starting one
         
     Returns:
-        Dict mapping import paths to sets of file paths
+        ImportMap: Import paths to the files importing them, answering
+            lookups like a Dict[str, Set[Path]]
+    """
+    scans = scan_index(
+        directory, max_workers, use_cache, rebuild, files, cache, exclude, include, since, staged, executor, pool
+    )
+    return ImportMap.build((file_path, scan.imports) for file_path, scan in scans.items())
+
+def build_call_index(
+    directory: Path,
+    max_workers: Optional[int] = None,
+    use_cache: bool = True,
+    rebuild: bool = False,
+    files: Optional[List[Path]] = None,
+    cache: Optional[ImportIndexCache] = None,
+    exclude: Sequence[str] = (),
+    include: Sequence[str] = (),
+    since: Optional[str] = None,
+    staged: bool = False,
+    executor: str = DEFAULT_EXECUTOR,
+    pool: Optional[WorkerPool] = None
+) -> Dict[str, Dict[Path, List[int]]]:
     """
-    python_files = find_python_files(directory)
-    import_map: Dict[str, Set[Path]] = {}
+    Build a map of attribute-call chains to the files and lines calling them.
+
+    Shares the on-disk index with build_import_map, so one scan serves both.
+    Takes the same arguments as build_import_map.
+
+    Returns:
+        Dict mapping chains like 'self.client.get' to {file path: line numbers}
+    """
+    scans = scan_index(
+        directory, max_workers, use_cache, rebuild, files, cache, exclude, include, since, staged, executor, pool
+    )
+    call_index: Dict[str, Dict[Path, List[int]]] = {}
+    for file_path, scan in scans.items():
+        for chain, lines in scan.calls.items():
+            call_index.setdefault(chain, {})[file_path] = lines
+    
+    return call_index
+
+def _try_scan(file_path: Path, known_hash: Optional[str]) -> Optional[Tuple[str, Optional[FileScan]]]:
+    """Run scan_file, returning None if the file can't be read."""
+    try:
+        return scan_file(file_path, known_hash)
+    except Exception:
+        return None
+
+def _map_scan(
+    backend: str,
+    pending: List[Tuple[Path, Any, Optional[str]]],
+    max_workers: Optional[int],
+    pool: Optional[WorkerPool] = None
+) -> Iterator[Optional[Tuple[str, Optional[FileScan]]]]:
+    """
+    Scan (file, stat, known_hash) entries on the given backend, in order.
+    
+    Results are yielded as they arrive, while the pool is still running, so
+    callers can report progress during the scan rather than after it.
+    """
+    paths = [file_path for file_path, _, _ in pending]
+    hashes = [known_hash for _, _, known_hash in pending]
+    if backend == "serial":
+        yield from map(_try_scan, paths, hashes)
+        return
+    
+    import concurrent.futures
     
-    # Process files in parallel
-    with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as executor:
-        future_to_file = {executor.submit(scan_imports, file_path): file_path 
-                          for file_path in python_files}
+    # Many small tasks per round trip keep process pools from idling
+    workers = pool.max_workers if pool is not None else max_workers or os.cpu_count() or 1
+    chunksize = max(1, len(paths) // (workers * 8))
+    if backend == "process" and pool is not None:
+        yield from pool.get().map(_try_scan, paths, hashes, chunksize=chunksize)
+        return
+    
+    pool_class = (
+        concurrent.futures.ThreadPoolExecutor if backend == "thread" else concurrent.futures.ProcessPoolExecutor
+    )
+    with pool_class(max_workers=max_workers) as executor:
+        yield from executor.map(_try_scan, paths, hashes, chunksize=chunksize)
+
+def _chunk_files(files: List[Path], workers: int, chunk_bytes: int) -> List[List[Path]]:
+    """
+    Group files into size-aware chunks, largest files first.
+    
+    The target chunk size shrinks for small trees so every worker still gets
+    several chunks, and a file larger than the target gets a chunk of its own.
+    """
+    sized = []
+    for file_path in files:
+        try:
+            sized.append((file_path.stat().st_size, file_path))
+        except OSError:
+            sized.append((0, file_path))
+    
+    # Start the biggest files first so they don't end up dominating the tail
+    sized.sort(key=lambda item: item[0], reverse=True)
+    total_bytes = sum(size for size, _ in sized)
+    target = max(1, min(chunk_bytes, total_bytes // (workers * 4)))
+    
+    chunks: List[List[Path]] = []
+    chunk: List[Path] = []
+    chunk_size = 0
+    for size, file_path in sized:
+        chunk.append(file_path)
+        chunk_size += size
+        if chunk_size >= target or len(chunk) >= MAX_CHUNK_FILES:
+            chunks.append(chunk)
+            chunk, chunk_size = [], 0
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+class _ChunkResult(NamedTuple):
+    """What a worker sends back for a chunk of files."""
+    results: List[Any]
+    profile: Optional[Profile] = None
+    writes: Optional[List[Tuple[Path, str]]] = None
+    errors: int = 0
+    events: Optional[List[FileEvent]] = None
+    edits: Optional[List[Edit]] = None
+
+def _process_chunk(
+    processor: Callable[..., Any],
+    chunk: List[Path],
+    args: Tuple[Any, ...],
+    kwargs: Dict[str, Any],
+    profile: bool = False,
+    write_behind: bool = False,
+    events: bool = False,
+    quiet: Optional[bool] = None,
+    edits: bool = False
+) -> _ChunkResult:
+    """
+    Run the processor over a chunk of files inside a worker.
+
+    With profile set the worker's timings for the chunk are sent back, and
+    with write_behind the rewritten files are sent back for the parent's
+    writer instead of being written by the worker. The number of errors the
+    processor displayed is sent back for the parent's progress bar. With
+    events set, a FileEvent per file is sent back for the parent's
+    collector, and quiet, if given, replaces the worker's display.quiet.
+    With edits set, the changes made to files are sent back as compact
+    Edits, so diffs are only built by the parent, if it wants them.
+    """
+    previous_quiet = display.quiet
+    if quiet is not None:
+        display.quiet = quiet
+    errors_at_start = display.error_count
+    results = []
+    file_events: Optional[List[FileEvent]] = [] if events else None
+    try:
+        with profiling(profile) as chunk_profile, collecting(write_behind) as writes:
+            with collecting_edits(edits) as chunk_edits:
+                for file_path in chunk:
+                    try:
+                        with file_timer(file_path):
+                            if file_events is None:
+                                result = processor(file_path, *args, **kwargs)
+                            else:
+                                result, event = record(file_path, processor, *args, **kwargs)
+                                file_events.append(event)
+                    except Exception:
+                        result = None
+                    results.append(result)
+    finally:
+        display.quiet = previous_quiet
+    return _ChunkResult(
+        results, chunk_profile, writes, display.error_count - errors_at_start, file_events, chunk_edits
+    )
+
+def iter_files_parallel(
+    files: List[Path],
+    processor: Callable[..., Any],
+    *args: Any,
+    max_workers: Optional[int] = None,
+    chunk_bytes: int = DEFAULT_CHUNK_BYTES,
+    max_in_flight: Optional[int] = None,
+    executor: str = DEFAULT_EXECUTOR,
+    pool: Optional[WorkerPool] = None,
+    **kwargs: Any
+) -> Iterator[Tuple[Path, Any]]:
+    """
+    Process files in parallel, yielding results as they finish.
+    
+    Files are sent to workers in size-aware chunks and at most max_in_flight
+    chunks are submitted at any time, so memory use in the parent stays
+    bounded regardless of how many files there are. Batches too small to
+    pay for starting workers are processed in this process instead (see
+    executor.choose_executor).
+    
+    Args:
+        files: List of file paths to process
+        processor: Function that processes a single file
+        *args: Positional arguments to pass to the processor
+        max_workers: Maximum number of concurrent workers
+        chunk_bytes: Upper bound on the source bytes sent in one chunk
+        max_in_flight: Maximum number of pending chunks (default: 2 per worker)
+        executor: One of executor.EXECUTORS; "auto" picks by workload size
+        pool: A shared process pool to run on instead of starting one
+        **kwargs: Keyword arguments to pass to the processor
+        
+    Yields:
+        Tuples of (file_path, result) in completion order. The result is
+        None if the processor raised an exception.
+    
+    If a profile is being recorded, the workers' timings are merged into it,
+    and if a FileWriter is active, the workers' rewritten files are handed to
+    it so writing overlaps with the parsing still going on in the workers.
+    If an EventCollector is active, every backend sends it one event per
+    file from this process, in completion order, and if edit handlers are
+    registered, worker processes send their edits back to be published
+    here (see edits.handling_edits). Finished files are counted on a
+    progress bar (see Display.progress).
+    """
+    profile = current()
+    writer = active_writer()
+    collector = active_collector()
+    backend = select_executor(executor, files, pool.max_workers if pool is not None else max_workers)
+    with display.progress("Processing files", len(files)) as tracker:
+        if backend == "serial":
+            # Profile, writes and errors go straight to this process's profile, writer and display
+            for file_path in files:
+                chunk_result = _process_chunk(processor, [file_path], args, kwargs, events=collector is not None)
+                for event in chunk_result.events or ():
+                    collector.emit(event)
+                tracker.advance_results(chunk_result.results)
+                yield file_path, chunk_result.results[0]
+            return
         
-        for future in concurrent.futures.as_completed(future_to_file):
-            file_path = future_to_file[future]
-            try:
-                imports = future.result()
-                for import_path in imports:
-                    if import_path not in import_map:
-                        import_map[import_path] = set()
-                    import_map[import_path].add(file_path)
-            except Exception:
-                # If processing a file fails, just skip it
-                continue
-    
-    return import_map
+        import concurrent.futures
+        from contextlib import nullcontext
+        
+        # Threads share this process's profile and writer; processes send theirs back
+        remote = backend == "process"
+        if remote and pool is not None:
+            # A shared pool outlives this batch, so it isn't shut down here
+            workers = pool.max_workers
+            running = nullcontext(pool.get())
+        else:
+            workers = max_workers or os.cpu_count() or 1
+            pool_class = concurrent.futures.ProcessPoolExecutor if remote else concurrent.futures.ThreadPoolExecutor
+            running = pool_class(max_workers=max_workers)
+        limit = max_in_flight or workers * 2
+        chunks = iter(_chunk_files(files, workers, chunk_bytes))
+        
+        with running as pool_executor:
+            in_flight: Dict[concurrent.futures.Future, List[Path]] = {}
+            
+            def submit_next() -> bool:
+                chunk = next(chunks, None)
+                if chunk is None:
+                    return False
+                future = pool_executor.submit(
+                    _process_chunk, processor, chunk, args, kwargs,
+                    remote and profile is not None, remote and writer is not None,
+                    collector is not None, display.quiet if remote else None, remote and edits_wanted()
+                )
+                in_flight[future] = chunk
+                return True
+            
+            while len(in_flight) < limit and submit_next():
+                pass
+            
+            # Refill the window as chunks complete
+            while in_flight:
+                done, _ = concurrent.futures.wait(in_flight, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    chunk = in_flight.pop(future)
+                    worker_errors = 0
+                    try:
+                        chunk_result = future.result()
+                        chunk_results = chunk_result.results
+                        if chunk_result.profile is not None:
+                            profile.merge(chunk_result.profile)
+                        for file_path, content in chunk_result.writes or ():
+                            writer.submit(file_path, content)
+                        for event in chunk_result.events or ():
+                            collector.emit(event)
+                        for edit in chunk_result.edits or ():
+                            publish(edit)
+                        # Errors shown by threads are already counted by this process's display
+                        if remote:
+                            worker_errors = chunk_result.errors
+                    except Exception as e:
+                        # If a whole chunk fails, report None for each of its files
+                        chunk_results = [None] * len(chunk)
+                        if collector is not None:
+                            for file_path in chunk:
+                                collector.emit(FileEvent(str(file_path), "error", 0, None, None, 0.0, str(e)))
+                    submit_next()
+                    tracker.advance_results(chunk_results, worker_errors)
+                    yield from zip(chunk, chunk_results)
 
 def process_files_parallel(
     files: List[Path],
     processor: Callable[..., Any],
     *args: Any,
     max_workers: Optional[int] = None,
+    chunk_bytes: int = DEFAULT_CHUNK_BYTES,
+    max_in_flight: Optional[int] = None,
+    executor: str = DEFAULT_EXECUTOR,
+    pool: Optional[WorkerPool] = None,
     **kwargs: Any
 ) -> List[Any]:
     """
@@ -99,28 +585,25 @@ def process_files_parallel(
         processor: Function that processes a single file
         *args: Positional arguments to pass to the processor
         max_workers: Maximum number of concurrent workers
+        chunk_bytes: Upper bound on the source bytes sent in one chunk
+        max_in_flight: Maximum number of pending chunks (default: 2 per worker)
+        executor: One of executor.EXECUTORS; "auto" picks by workload size
+        pool: A shared process pool to run on instead of starting one
         **kwargs: Keyword arguments to pass to the processor
         
     Returns:
         List of results from the processor function
     """
-    results = []
-    
-    with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as executor:
-        future_to_file = {}
-        
-        # Submit all jobs
-        for file_path in files:
-            future = executor.submit(processor, file_path, *args, **kwargs)
-            future_to_file[future] = file_path
-        
-        # Process as they complete
-        for future in concurrent.futures.as_completed(future_to_file):
-            try:
-                result = future.result()
-                results.append(result)
-            except Exception as e:
-                # If a job fails, append None to keep the same length
-                results.append(None)
-    
-    return results 
\ No newline at end of file
+    return [
+        result for _, result in iter_files_parallel(
+            files,
+            processor,
+            *args,
+            max_workers=max_workers,
+            chunk_bytes=chunk_bytes,
+            max_in_flight=max_in_flight,
+            executor=executor,
+            pool=pool,
+            **kwargs
+        )
+    ]
@@ -0,0 +1,228 @@
+"""Write-behind stage that commits rewritten files atomically."""
+import os
+import queue
+import stat
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, List, Optional, Set, Tuple
+
+from ..display import display
+from .profiling import current, phase
+
+# none: leave flushing to the OS; batch: fsync everything once at the end;
+# each: fsync every file before it replaces the original
+FSYNC_POLICIES = ("none", "batch", "each")
+DEFAULT_FSYNC = "none"
+# Finished files waiting to be written before producers have to wait
+MAX_PENDING_WRITES = 256
+
+def _fsync_path(path: Path) -> None:
+    """Flush a file or directory to disk; directories can't be opened on every platform."""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+def atomic_write(file_path: Path, content: str, fsync: bool = False) -> None:
+    """
+    Replace a file's content through a temp file and a rename.
+
+    Readers, and the tree after a crash, see either the old or the new
+    content, never a partial write. The file's permissions are kept, and a
+    symlink is written through: its target is replaced, not the link.
+
+    Args:
+        file_path: File to write
+        content: New text content
+        fsync: Flush the data and the directory entry to disk before returning
+    """
+    file_path = Path(os.path.realpath(file_path))
+    tmp_path = file_path.with_name(f".{file_path.name}.{os.getpid()}.epyon-tmp")
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        try:
+            os.chmod(tmp_path, stat.S_IMODE(os.stat(file_path).st_mode))
+        except FileNotFoundError:
+            pass
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+    if fsync:
+        _fsync_path(file_path.parent)
+
+class FileWriter:
+    """
+    A background thread that commits finished files while parsing continues.
+
+    Producers hand over (path, content) pairs with submit() or write_file();
+    the thread writes each one with atomic_write. Use it as a context
+    manager, which also makes it the target of write_file() in this process
+    and of the outputs workers send back through iter_files_parallel.
+    """
+
+    def __init__(self, fsync: str = DEFAULT_FSYNC, max_pending: int = MAX_PENDING_WRITES):
+        """
+        Initialize the writer.
+
+        Args:
+            fsync: One of FSYNC_POLICIES
+            max_pending: Queued files before submit() blocks
+
+        Raises:
+            ValueError: If the fsync policy is unknown
+        """
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy '{fsync}', expected one of {', '.join(FSYNC_POLICIES)}")
+        self.fsync = fsync
+        self.written: List[Path] = []
+        self.errors: List[Tuple[Path, Exception]] = []
+        self.write_seconds = 0.0
+        self._queue: "queue.Queue[Optional[Tuple[Path, str]]]" = queue.Queue(max_pending)
+        self._thread: Optional[threading.Thread] = None
+        self._previous: Optional["FileWriter"] = None
+
+    def start(self) -> None:
+        """Start the writer thread."""
+        self._thread = threading.Thread(target=self._run, name="epyon-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, file_path: Path, content: str) -> None:
+        """Queue a file to be written, waiting if too many writes are pending."""
+        self._queue.put((Path(file_path), content))
+
+    def flush(self) -> None:
+        """Wait until every queued file has been written."""
+        self._queue.join()
+
+    def close(self) -> None:
+        """Write everything still queued, apply the batch fsync and stop the thread."""
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+        if self.fsync == "batch":
+            start = time.perf_counter()
+            directories: Set[Path] = set()
+            for file_path in self.written:
+                _fsync_path(file_path)
+                directories.add(file_path.parent)
+            for directory in directories:
+                _fsync_path(directory)
+            self.write_seconds += time.perf_counter() - start
+
+    @property
+    def failed(self) -> Set[Path]:
+        """Files that could not be written."""
+        return {file_path for file_path, _ in self.errors}
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                file_path, content = item
+                start = time.perf_counter()
+                try:
+                    atomic_write(file_path, content, fsync=self.fsync == "each")
+                    self.written.append(file_path)
+                except Exception as e:
+                    self.errors.append((file_path, e))
+                self.write_seconds += time.perf_counter() - start
+            finally:
+                self._queue.task_done()
+
+    def __enter__(self) -> "FileWriter":
+        global _active
+        self.start()
+        self._previous, _active = _active, self
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        global _active
+        _active = self._previous
+        self.close()
+        # Writes overlap with other work, so they're only counted once here
+        profile = current()
+        if profile is not None and self.write_seconds:
+            profile.add("write", self.write_seconds)
+        for file_path, error in self.errors:
+            display.error(f"Error writing {file_path}: {error}")
+        for failures in _failure_lists:
+            failures.extend(file_path for file_path, _ in self.errors)
+
+# The writer that write_file() hands files to in this process, if any
+_active: Optional[FileWriter] = None
+# Lists the files every writer failed to write are added to, while watched
+_failure_lists: List[List[Path]] = []
+# Files a worker has finished, waiting to be sent back to the parent
+_outbox: Optional[List[Tuple[Path, str]]] = None
+
+def active_writer() -> Optional[FileWriter]:
+    """Return the writer receiving files in this process, or None."""
+    return _active
+
+@contextmanager
+def watching_failures() -> Iterator[List[Path]]:
+    """
+    Collect the files that the writers closed inside the block could not write.
+
+    Commands use this to fail the run when a change never reached the disk.
+    """
+    failures: List[Path] = []
+    _failure_lists.append(failures)
+    try:
+        yield failures
+    finally:
+        _failure_lists.remove(failures)
+
+@contextmanager
+def collecting(enabled: bool = True) -> Iterator[Optional[List[Tuple[Path, str]]]]:
+    """
+    Collect the files written inside the block instead of writing them.
+
+    Workers use this to send their finished files back to the parent's
+    writer. Yields the list of (path, content) pairs, or None if disabled.
+    """
+    global _outbox
+    if not enabled:
+        yield None
+        return
+    previous, _outbox = _outbox, []
+    try:
+        yield _outbox
+    finally:
+        _outbox = previous
+
+def write_file(file_path: Path, content: str) -> None:
+    """
+    Commit a rewritten file.
+
+    Inside a worker that is collecting, the file goes back to the parent;
+    with an active FileWriter, it is queued; otherwise it is written
+    atomically right away.
+    """
+    if _outbox is not None:
+        _outbox.append((Path(file_path), content))
+    elif _active is not None:
+        _active.submit(file_path, content)
+    else:
+        with phase("write"):
+            atomic_write(file_path, content)
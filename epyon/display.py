@@ -1,13 +1,14 @@
 """Display utilities for Epyon."""
 from rich.console import Console
-from rich.syntax import Syntax
 from rich.theme import Theme
-from rich.panel import Panel
-from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn, TaskProgressColumn, TimeElapsedColumn
-from rich import print as rprint
-from difflib import unified_diff
+import time
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Optional, List, Any
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+if TYPE_CHECKING:
+    from .core.edits import Edit
+    from .core.profiling import Profile
 
 # Create a custom theme for Gundam-inspired colors
 theme = Theme({
@@ -22,6 +23,22 @@ theme = Theme({
 })
 
 console = Console(theme=theme)
+# Created on first use, for messages that must stay off stdout
+_stderr_console: Optional[Console] = None
+
+# Redraw progress bars at most this often, however fast files finish
+PROGRESS_REFRESH_SECONDS = 0.1
+
+@contextmanager
+def redirect_output(stream: TextIO) -> Iterator[None]:
+    """Send console output to another stream for the duration of the block."""
+    # Keep the unset default so the console goes back to following sys.stdout
+    previous = console._file
+    console.file = stream
+    try:
+        yield
+    finally:
+        console.file = previous
 
 class Display:
     """Display utilities for Epyon."""
@@ -29,11 +46,28 @@ class Display:
     def __init__(self):
         """Initialize the display with default settings."""
         self.verbose = False
+        # Errors shown by this process, so progress bars can count them
+        self.error_count = 0
+        # Set when stdout carries machine-readable output: per-file messages
+        # are dropped and warnings and errors go to stderr
+        self.quiet = False
+        self._live = False
     
+    def _messages(self) -> Console:
+        """Return the console warnings and errors are printed on."""
+        global _stderr_console
+        if not self.quiet:
+            return console
+        if _stderr_console is None:
+            _stderr_console = Console(theme=theme, stderr=True)
+        return _stderr_console
+
     @staticmethod
     def show_diff(old_content: str, new_content: str, file_path: Optional[Path] = None) -> None:
         """Display a unified diff of the changes."""
-        if old_content == new_content:
+        from difflib import unified_diff
+
+        if old_content == new_content or display.quiet:
             return
 
         # Generate unified diff
@@ -48,8 +82,18 @@ class Display:
         # If we have a file path, show it in a header
         if file_path:
             console.print(f"\n[path]Transforming {file_path}[/path]")
+        Display._print_diff_lines(diff_lines)
+
+    def show_edit(self, edit: "Edit") -> None:
+        """Display an edit sent back by a worker as a unified diff."""
+        if self.quiet:
+            return
+        console.print(f"\n[path]Transforming {edit.path}[/path]")
+        self._print_diff_lines(edit.diff_lines())
 
-        # Print the diff with syntax highlighting
+    @staticmethod
+    def _print_diff_lines(diff_lines: Iterable[str]) -> None:
+        """Print diff lines with syntax highlighting."""
         for line in diff_lines:
             if line.startswith('+'):
                 console.print(f"[diff.plus]{line.rstrip()}[/diff.plus]")
@@ -63,6 +107,8 @@ class Display:
     @staticmethod
     def show_code(content: str, file_path: Optional[Path] = None) -> None:
         """Display code with syntax highlighting."""
+        from rich.syntax import Syntax
+
         syntax = Syntax(content, "python", theme="monokai", line_numbers=True)
         if file_path:
             console.print(f"\n[path]{file_path}[/path]")
@@ -70,18 +116,22 @@ class Display:
 
     def error(self, message: str) -> None:
         """Display an error message."""
-        console.print(f"[error]Error:[/error] {message}")
+        self.error_count += 1
+        self._messages().print(f"[error]Error:[/error] {message}")
 
     def warning(self, message: str) -> None:
         """Display a warning message."""
-        console.print(f"[warning]Warning:[/warning] {message}")
+        self._messages().print(f"[warning]Warning:[/warning] {message}")
 
     def success(self, message: str) -> None:
         """Display a success message."""
-        console.print(f"[success]Success:[/success] {message}")
+        if not self.quiet:
+            console.print(f"[success]Success:[/success] {message}")
 
     def info(self, message: str) -> None:
         """Display an info message."""
+        if self.quiet:
+            return
         if self.verbose:
             console.print(f"[info]Info:[/info] {message}")
         else:
@@ -92,6 +142,9 @@ class Display:
     @staticmethod
     def operation_summary(total: int, modified: int, errors: int = 0) -> None:
         """Display an operation summary."""
+        from rich import print as rprint
+        from rich.panel import Panel
+
         rprint(Panel.fit(
             f"[bold]Operation Summary[/bold]\n"
             f"Total files processed: {total}\n"
@@ -105,43 +158,274 @@ class Display:
         console.print("\n[yellow]Running in dry-run mode - no files were modified[/]")
 
     @staticmethod
-    def show_summary(modified_count: int, total_files: int) -> None:
+    def show_summary(modified_count: int, total_files: int, skipped_count: int = 0) -> None:
         """Display operation summary."""
         if modified_count > 0:
             console.print(f"\n[green]Modified imports in {modified_count} of {total_files} files[/]")
         else:
             console.print("\n[yellow]No matching imports found[/]")
+        Display.show_skipped(skipped_count, total_files)
+
+    @staticmethod
+    def show_mapping_summary(pairs: Dict[str, str], file_counts: Dict[str, int]) -> None:
+        """Display how many files each mapping touched."""
+        from rich.table import Table
+
+        table = Table(title="Mapping Summary")
+        table.add_column("Old import", style="path")
+        table.add_column("New import", style="path")
+        table.add_column("Files", justify="right", style="success")
+        
+        touched = sorted(
+            (old_import for old_import, count in file_counts.items() if count),
+            key=lambda old_import: (-file_counts[old_import], old_import)
+        )
+        for old_import in touched:
+            table.add_row(old_import, pairs[old_import], str(file_counts[old_import]))
+        
+        if touched:
+            console.print(table)
+        unused = len(file_counts) - len(touched)
+        if unused:
+            console.print(f"[warning]{unused} of {len(file_counts)} mappings matched no files[/warning]")
+
+    @staticmethod
+    def show_rule_summary(pairs: Dict[str, str], hits: Dict[str, int]) -> None:
+        """Display how many calls each replace-call rule replaced."""
+        from rich.table import Table
+
+        table = Table(title="Rule Summary")
+        table.add_column("Old call", style="path")
+        table.add_column("New call", style="path")
+        table.add_column("Calls", justify="right", style="success")
+        
+        used = sorted(
+            (old_call for old_call, count in hits.items() if count),
+            key=lambda old_call: (-hits[old_call], old_call)
+        )
+        for old_call in used:
+            table.add_row(old_call, pairs[old_call], str(hits[old_call]))
+        
+        if used:
+            console.print(table)
+        unused = len(hits) - len(used)
+        if unused:
+            console.print(f"[warning]{unused} of {len(hits)} rules matched no calls[/warning]")
+
+    @staticmethod
+    def show_plan_summary(
+        rows: List[Tuple[str, str, str, int]], overlaps: Dict[Tuple[str, str], int], errors: int = 0
+    ) -> None:
+        """Display what each rule of a plan did, the calls more than one rule matched and the files that failed."""
+        from rich.table import Table
+
+        table = Table(title="Plan Summary")
+        table.add_column("Rule")
+        table.add_column("Old", style="path")
+        table.add_column("New", style="path")
+        table.add_column("Files/Calls", justify="right", style="success")
+        for kind, old, new, count in rows:
+            table.add_row(kind, old, new, str(count))
+        console.print(table)
+        
+        for (applied, shadowed), count in sorted(overlaps.items()):
+            console.print(
+                f"[warning]Conflict: {count} calls matched both {applied} and {shadowed}; "
+                f"applied {applied}[/warning]"
+            )
+        if errors:
+            console.print(f"[error]{errors} files could not be processed[/error]")
+
+    @staticmethod
+    def show_merged_results(
+        summaries: List[Dict[str, Any]],
+        total: Dict[str, Any],
+        patch_path: Optional[Path] = None,
+        patched: Optional[int] = None
+    ) -> None:
+        """Display the summary of each shard of a run and the merged totals."""
+        from rich.table import Table
+
+        table = Table(title="Merged Results")
+        table.add_column("Shard")
+        table.add_column("Results", style="path")
+        for action in ("modified", "unchanged", "skipped", "error"):
+            table.add_column(action.capitalize(), justify="right")
+        for summary in sorted(summaries, key=lambda summary: summary["source"]):
+            table.add_row(
+                summary.get("shard", "-"), summary["source"],
+                *(str(summary.get(action, 0)) for action in ("modified", "unchanged", "skipped", "error"))
+            )
+        table.add_row(
+            "total", f"{total['events']} files",
+            *(str(total[action]) for action in ("modified", "unchanged", "skipped", "error")),
+            style="bold"
+        )
+        console.print(table)
+        if patch_path is not None:
+            console.print(f"[success]Wrote changes to {patched} files to {patch_path}[/success]")
+
+    @staticmethod
+    def show_call_stats(chain: str, candidates: int, total_files: int, call_sites: int) -> None:
+        """Display how far the call-chain index narrowed a replace-call run."""
+        share = f"{candidates / total_files:.1%}" if total_files else "-"
+        console.print(
+            f"[info]Call index: {chain} is called {call_sites} times in {candidates} of "
+            f"{total_files} files; parsing {share} of the tree[/info]"
+        )
+
+    @staticmethod
+    def show_skipped(skipped_count: int, total_files: int) -> None:
+        """Display how many files the prefilter ruled out without parsing."""
+        if skipped_count > 0:
+            console.print(f"[info]Prefilter skipped {skipped_count} of {total_files} files[/info]")
+            
+    @staticmethod
+    def show_profile(profile: "Profile", slowest: int = 10) -> None:
+        """Display where a run spent its time and the slowest files."""
+        from rich.table import Table
+
+        total = sum(profile.phases.values())
+        table = Table(title="Profile")
+        table.add_column("Phase")
+        table.add_column("Seconds", justify="right")
+        table.add_column("Share", justify="right")
+        for phase in profile.ordered_phases():
+            seconds = profile.phases[phase]
+            table.add_row(phase, f"{seconds:.3f}", f"{seconds / total:.0%}" if total else "-")
+        console.print(table)
+        console.print(
+            f"[info]Wall time {profile.wall_seconds:.3f}s for {len(profile.file_totals())} files; "
+            f"phase times are summed across worker processes[/info]"
+        )
+        
+        timings = profile.slowest(slowest)
+        if timings:
+            table = Table(title=f"Slowest {len(timings)} files")
+            table.add_column("File", style="path")
+            table.add_column("Size (KiB)", justify="right")
+            table.add_column("Seconds", justify="right")
+            for timing in timings:
+                table.add_row(timing.path, f"{timing.size / 1024:.1f}", f"{timing.seconds:.3f}")
+            console.print(table)
             
     @staticmethod
     def show_version(version: str) -> None:
         """Display version information."""
         console.print(f"[bold cyan]Epyon[/bold cyan] version [bold]{version}[/bold]")
         
-    def track_parallel_progress(self, items: List[Any], description: str = "Processing") -> None:
+    @contextmanager
+    def progress(self, description: str, total: int) -> Iterator["ProgressTracker"]:
         """
-        Track progress of parallel operations.
-        Only shows progress if verbose mode is enabled.
-        
+        Track a batch of files while the block runs.
+
+        A bar with files/sec, ETA, matches and errors is drawn only when
+        the console is a terminal and no other bar is showing; otherwise
+        the tracker just counts.
+
         Args:
-            items: List of items being processed
-            description: Description of the operation
+            description: What is being done to the files
+            total: Number of files in the batch
         """
-        if not self.verbose:
+        bar = None
+        if console.is_terminal and total and not self._live:
+            from rich.progress import (
+                BarColumn, MofNCompleteColumn, Progress, TextColumn, TimeRemainingColumn
+            )
+
+            bar = Progress(
+                TextColumn("[bold blue]{task.description}"),
+                BarColumn(),
+                MofNCompleteColumn(),
+                TextColumn("{task.fields[rate]:.0f} files/s"),
+                TimeRemainingColumn(),
+                TextColumn("[success]{task.fields[matched]} matched[/success]"),
+                TextColumn("[error]{task.fields[errors]} errors[/error]"),
+                console=console,
+                auto_refresh=False,
+            )
+        tracker = ProgressTracker(self, description, total, bar)
+        if bar is None:
+            yield tracker
             return
-            
-        total_items = len(items)
-        with Progress(
-            SpinnerColumn(),
-            TextColumn("[bold blue]{task.description}"),
-            BarColumn(),
-            TaskProgressColumn(),
-            TimeElapsedColumn(),
-        ) as progress:
-            task = progress.add_task(f"[cyan]{description}...", total=total_items)
-            
-            # This is just a placeholder - actual progress tracking would require modifications
-            # to the parallel processing functions to update progress
-            progress.update(task, completed=total_items)
+        
+        self._live = True
+        try:
+            with bar:
+                tracker.refresh()
+                try:
+                    yield tracker
+                finally:
+                    tracker.refresh()
+        finally:
+            self._live = False
+
+class ProgressTracker:
+    """
+    Counts of finished files, matches and errors for one batch.
+
+    Counting is cheap; the bar, if there is one, is redrawn at most every
+    PROGRESS_REFRESH_SECONDS so it never slows the run down. Errors are
+    the ones reported to the tracker plus every display.error() shown by
+    this process since the batch started.
+    """
+
+    def __init__(self, owner: Display, description: str, total: int, bar: Any = None):
+        self.description = description
+        self.total = total
+        self.completed = 0
+        self.matched = 0
+        self.reported_errors = 0
+        self._owner = owner
+        self._errors_at_start = owner.error_count
+        self._bar = bar
+        self._task = bar.add_task(description, total=total, rate=0.0, matched=0, errors=0) if bar else None
+        self._started = time.perf_counter()
+        self._last_refresh = 0.0
+
+    @property
+    def errors(self) -> int:
+        """Errors seen so far in the batch."""
+        return self.reported_errors + self._owner.error_count - self._errors_at_start
+
+    def advance(self, files: int = 1, matched: int = 0, errors: int = 0) -> None:
+        """Record finished files, redrawing the bar if it is due."""
+        self.completed += files
+        self.matched += matched
+        self.reported_errors += errors
+        if self._bar is not None and time.perf_counter() - self._last_refresh >= PROGRESS_REFRESH_SECONDS:
+            self.refresh()
+
+    def advance_results(self, results: Iterable[Any], errors: int = 0) -> None:
+        """
+        Record processor results.
+
+        None means the processor raised; a result counts as matched if it is
+        truthy or, for (changed, extra) tuples, if its first item is.
+        """
+        files = matched = failed = 0
+        for result in results:
+            files += 1
+            if result is None:
+                failed += 1
+            elif (result[0] if isinstance(result, tuple) else result):
+                matched += 1
+        self.advance(files, matched, errors + failed)
+
+    def refresh(self) -> None:
+        """Redraw the bar now."""
+        self._last_refresh = now = time.perf_counter()
+        if self._bar is None:
+            return
+        elapsed = now - self._started
+        self._bar.update(
+            self._task,
+            completed=self.completed,
+            rate=self.completed / elapsed if elapsed > 0 else 0.0,
+            matched=self.matched,
+            errors=self.errors,
+        )
+        self._bar.refresh()
             
 # Create a singleton instance
 display = Display() 
\ No newline at end of file
@@ -0,0 +1,33 @@
+"""Tests for the benchmark corpus and runner."""
+from benchmarks.corpus import TARGET_IMPORT, CorpusSpec, generate_corpus
+from benchmarks.run import run_case
+
+def test_corpus_is_deterministic(tmp_path):
+    """Test that the same spec produces identical files."""
+    spec = CorpusSpec(files=30, lines=20, match_ratio=0.2, seed=7)
+    first = generate_corpus(tmp_path / "a", spec)
+    second = generate_corpus(tmp_path / "b", spec)
+
+    assert len(first) == 30
+    assert [path.read_text() for path in first] == [path.read_text() for path in second]
+    matching = [path for path in first if TARGET_IMPORT.rsplit(".", 1)[0] in path.read_text()]
+    assert len(matching) == 6
+
+def test_run_case(tmp_path, monkeypatch):
+    """Test that a case reports its file count and timings."""
+    monkeypatch.setenv("EPYON_CACHE_DIR", str(tmp_path / "cache"))
+    generate_corpus(tmp_path / "corpus", CorpusSpec(files=10, lines=20, match_ratio=0.5))
+
+    result = run_case("replace-import", tmp_path / "corpus", workers=1)
+    # 10 generated modules plus the bench package's own five files
+    assert result["files"] == 15
+    assert result["seconds"] > 0
+
+def test_traced_cases_report_allocations(tmp_path, monkeypatch):
+    """Test that the import map memory cases report the peak Python allocation."""
+    monkeypatch.setenv("EPYON_CACHE_DIR", str(tmp_path / "cache"))
+    generate_corpus(tmp_path / "corpus", CorpusSpec(files=10, lines=20))
+
+    result = run_case("import map (compact)", tmp_path / "corpus", workers=1)
+    assert result["traced_peak"] > 0
+    assert run_case("find_python_files", tmp_path / "corpus", workers=1)["traced_peak"] is None
@@ -0,0 +1,152 @@
+"""Tests for the import index cache."""
+import json
+import os
+import pytest
+
+from epyon.core.cache import CACHE_VERSION, ImportIndexCache, IndexEntry, get_cache_dir
+from epyon.core.utils import build_call_index, build_import_map
+
+@pytest.fixture
+def project(tmp_path, monkeypatch):
+    """Create a small project with an isolated cache directory."""
+    monkeypatch.setenv("EPYON_CACHE_DIR", str(tmp_path / "cache"))
+    root = tmp_path / "src"
+    root.mkdir()
+    (root / "a.py").write_text("from gundam.wing import WingZero\n")
+    (root / "b.py").write_text("import gundam.epyon\n")
+
+    # Backdate the files so their mtimes are outside the racy window
+    for file_path in root.iterdir():
+        os.utime(file_path, ns=(1_000_000_000, 1_000_000_000))
+    return root
+
+def test_get_cache_dir_default(tmp_path, monkeypatch):
+    """Test that the cache lives under the project root by default."""
+    monkeypatch.delenv("EPYON_CACHE_DIR", raising=False)
+    assert get_cache_dir(tmp_path) == tmp_path / ".epyon_cache"
+
+def test_build_import_map_writes_cache(project):
+    """Test that building the import map persists the index."""
+    import_map = build_import_map(project)
+
+    assert import_map["gundam.wing.WingZero"] == {project / "a.py"}
+    assert import_map["gundam.epyon"] == {project / "b.py"}
+
+    cache = ImportIndexCache(project)
+    cache.load()
+    assert cache.get(project / "a.py").imports == ["gundam.wing.WingZero"]
+
+def test_warm_run_reuses_unchanged_files(project):
+    """Test that files with unchanged mtime and size are not scanned again."""
+    build_import_map(project)
+
+    # Plant a fake result; it is only returned if the file is not rescanned
+    cache = ImportIndexCache(project)
+    cache.load()
+    entry = cache.get(project / "a.py")
+    cache.entries["a.py"] = entry._replace(imports=["cached.Only"])
+    cache.dirty = True
+    cache.save()
+
+    import_map = build_import_map(project)
+    assert import_map["cached.Only"] == {project / "a.py"}
+    assert "gundam.wing.WingZero" not in import_map
+
+def test_changed_file_is_rescanned(project):
+    """Test that modified files are scanned again."""
+    build_import_map(project)
+
+    (project / "a.py").write_text("from gundam.wing import Epyon\n")
+    import_map = build_import_map(project)
+
+    assert import_map["gundam.wing.Epyon"] == {project / "a.py"}
+    assert "gundam.wing.WingZero" not in import_map
+
+def test_deleted_file_is_dropped(project):
+    """Test that removed files disappear from the index."""
+    build_import_map(project)
+    (project / "b.py").unlink()
+
+    import_map = build_import_map(project)
+    assert "gundam.epyon" not in import_map
+
+    cache = ImportIndexCache(project)
+    cache.load()
+    assert cache.get(project / "b.py") is None
+
+def test_version_mismatch_invalidates(project):
+    """Test that an index written by another version is discarded."""
+    build_import_map(project)
+    cache = ImportIndexCache(project)
+    payload = json.loads(cache.path.read_text())
+    payload["version"] = CACHE_VERSION + 1
+    cache.path.write_text(json.dumps(payload))
+
+    cache.load()
+    assert cache.entries == {}
+
+def test_no_cache_and_rebuild(project):
+    """Test the cache escape hatches."""
+    cache = ImportIndexCache(project)
+
+    build_import_map(project, use_cache=False)
+    assert not cache.path.exists()
+
+    build_import_map(project)
+    cache.load()
+    cache.entries["a.py"] = cache.entries["a.py"]._replace(imports=["cached.Only"])
+    cache.dirty = True
+    cache.save()
+
+    import_map = build_import_map(project, rebuild=True)
+    assert "cached.Only" not in import_map
+    assert import_map["gundam.wing.WingZero"] == {project / "a.py"}
+
+def test_recently_modified_files_are_rehashed(tmp_path):
+    """Test that files inside the racy window never match on stat alone."""
+    file_path = tmp_path / "fresh.py"
+    file_path.write_text("import os\n")
+
+    cache = ImportIndexCache(tmp_path, cache_dir=tmp_path / "cache")
+    stat = file_path.stat()
+    cache.put(file_path, stat, "digest", {"os"})
+
+    assert cache.get(file_path) == IndexEntry(-1, stat.st_size, "digest", ["os"], {})
+    assert cache.lookup(file_path, stat) is None
+
+def test_unchanged_index_is_not_rewritten(project):
+    """Test that a warm run with no changes leaves the index file alone."""
+    build_import_map(project)
+    cache = ImportIndexCache(project)
+    os.utime(cache.path, ns=(1_000_000_000, 1_000_000_000))
+
+    build_import_map(project)
+    assert cache.path.stat().st_mtime_ns == 1_000_000_000
+
+def test_partial_build_keeps_other_entries(project, monkeypatch):
+    """Test that indexing only changed files doesn't evict the rest of the index."""
+    build_import_map(project)
+    monkeypatch.setattr("epyon.core.utils.git_changed_files", lambda *args: [project / "a.py"])
+
+    import_map = build_import_map(project, since="main")
+    assert import_map == {"gundam.wing.WingZero": {project / "a.py"}}
+
+    cache = ImportIndexCache(project)
+    cache.load()
+    assert cache.get(project / "b.py") is not None
+
+def test_call_chains_are_cached(project, monkeypatch):
+    """Test that the call index is stored with the imports and reused on a warm run."""
+    (project / "c.py").write_text("self.assert_ok(1)\n")
+    os.utime(project / "c.py", ns=(1_000_000_000, 1_000_000_000))
+    assert build_call_index(project) == {"self.assert_ok": {project / "c.py": [1]}}
+
+    cache = ImportIndexCache(project)
+    cache.load()
+    assert cache.get(project / "c.py").calls == {"self.assert_ok": [1]}
+
+    # A warm run answers from the cache without scanning the file
+    def fail(*args):
+        raise AssertionError("scanned a cached file")
+    monkeypatch.setattr("epyon.core.utils.scan_file", fail)
+    assert build_call_index(project) == {"self.assert_ok": {project / "c.py": [1]}}
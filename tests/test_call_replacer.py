@@ -4,7 +4,8 @@ from pathlib import Path
 import pytest
 import libcst as cst
 
-from epyon.core.call_replacer import CallReplacer, replace_call
+from epyon.core.call_replacer import CallReplacer, CallRules, replace_call, replace_calls_from_rules
+from epyon.core.profiling import profiling
 
 def test_call_replacer_simple():
     """Test replacing a simple method call."""
@@ -155,4 +156,81 @@ def test_function():
         with open(test_file, 'r') as f:
             content = f.read()
             assert "assert_403_FORBIDDEN" not in content
-            assert "assert_401_UNAUTHORIZED" in content 
\ No newline at end of file
+            assert "assert_401_UNAUTHORIZED" in content 
+def test_replace_call_parses_only_indexed_files(tmp_path, capsys):
+    """Test that files without the exact call chain are never parsed."""
+    (tmp_path / "calls.py").write_text("self.assert_401_UNAUTHORIZED(response)\n")
+    # These mention the method, so the text prefilter alone would let them through
+    (tmp_path / "other_base.py").write_text("client.assert_401_UNAUTHORIZED(response)\n")
+    (tmp_path / "mention.py").write_text("# self.assert_401_UNAUTHORIZED is deprecated\n")
+
+    with profiling() as profile:
+        modified_count = replace_call(
+            tmp_path, "self.assert_401_UNAUTHORIZED", "self.assert_403_FORBIDDEN", stats=True, use_cache=False
+        )
+
+    assert modified_count == 1
+    assert {timing.path for timing in profile.file_totals()} == {str(tmp_path / "calls.py")}
+    assert "called 1 times in 1 of 3 files" in capsys.readouterr().out
+    assert (tmp_path / "other_base.py").read_text() == "client.assert_401_UNAUTHORIZED(response)\n"
+
+def test_call_rules_dispatch_on_final_attribute():
+    """Test that rules are grouped by final attribute and tried in order."""
+    rules = CallRules({
+        "self.assertEqual(404, response.status_code)": "self.assertNotFound(response)",
+        "self.client.get": "self.client.fetch",
+        "self.assertEqual": "self.assertEquals",
+    })
+
+    assert sorted(rules.dispatch) == ["assertEqual", "get"]
+    assert [rule.old_call for rule in rules.dispatch["assertEqual"]] == [
+        "self.assertEqual(404, response.status_code)", "self.assertEqual"
+    ]
+    assert rules.chains == ["self.assertEqual", "self.client.get"]
+    assert rules.prefilter.matches("x.get()") and not rules.prefilter.matches("x.post()")
+
+def test_call_replacer_applies_rules_in_one_pass():
+    """Test that one traversal applies every rule and counts hits per rule."""
+    code = """
+def test_function():
+    self.assertEqual(404, response.status_code)
+    self.assertEqual(1, 2)
+    self.client.get(url)
+    client.get(url)
+    get(url)
+"""
+    rules = CallRules({
+        "self.assertEqual(404, response.status_code)": "self.assertNotFound(response)",
+        "self.assertEqual": "self.assertEquals",
+        "self.client.get": "self.client.fetch",
+        "self.unused": "self.other",
+    })
+    transformer = CallReplacer.from_rules(rules)
+    modified = cst.parse_module(code).visit(transformer)
+
+    assert "self.assertNotFound(response)" in modified.code
+    assert "self.assertEquals(1, 2)" in modified.code
+    assert "self.client.fetch(url)" in modified.code
+    assert "    client.get(url)" in modified.code
+    assert transformer.replacements == 3
+    assert transformer.hits == {
+        "self.assertEqual(404, response.status_code)": 1,
+        "self.assertEqual": 1,
+        "self.client.get": 1,
+    }
+
+def test_replace_calls_from_rules(tmp_path):
+    """Test applying a rule set across a tree and totalling the hits."""
+    (tmp_path / "a.py").write_text("self.old_a()\nself.old_a()\n")
+    (tmp_path / "b.py").write_text("self.old_a()\nself.helper.old_b(1)\n")
+    (tmp_path / "c.py").write_text("self.unrelated()\n")
+    rules = CallRules({"self.old_a": "self.new_a", "self.helper.old_b": "self.helper.new_b", "self.gone": "self.x"})
+
+    with profiling() as profile:
+        modified_count, hits = replace_calls_from_rules(tmp_path, rules, use_cache=False)
+
+    assert modified_count == 2
+    assert hits == {"self.old_a": 3, "self.helper.old_b": 1, "self.gone": 0}
+    assert {timing.path for timing in profile.file_totals()} == {str(tmp_path / "a.py"), str(tmp_path / "b.py")}
+    assert (tmp_path / "b.py").read_text() == "self.new_a()\nself.helper.new_b(1)\n"
+
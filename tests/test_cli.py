@@ -1,5 +1,6 @@
 """Tests for the CLI module."""
 from pathlib import Path
+import subprocess
 import pytest
 from typer.testing import CliRunner
 from epyon.cli import app
@@ -130,6 +131,21 @@ x = Class()
         assert "from new.module import Class" in content
         assert "from old.module import Class" not in content
 
+def test_replace_import_reports_prefilter_skips(tmp_path):
+    """Test that files ruled out by the prefilter are counted in the summary."""
+    (tmp_path / "match.py").write_text("from old.module import Class\n")
+    (tmp_path / "other.py").write_text("import os\n")
+
+    result = runner.invoke(app, [
+        "replace-import",
+        "old.module.Class",
+        "new.module.Class",
+        str(tmp_path)
+    ])
+    assert result.exit_code == 0
+    assert "Modified imports in 1 of 2 files" in result.stdout
+    assert "Prefilter skipped 1 of 2 files" in result.stdout
+
 def test_replace_import_no_matches(tmp_path):
     """Test replace_import when no matching imports are found."""
     test_file = tmp_path / "test.py"
@@ -195,4 +211,84 @@ z = TrowaBarton()
     assert "from gundam.wing.pilots import (" in import_section
     assert "HeeroYuy," in import_section
     assert "TrowaBarton" in import_section
-    assert "DuoMaxwell" not in import_section 
\ No newline at end of file
+    assert "DuoMaxwell" not in import_section 
+
+def test_replace_import_mapping(tmp_path):
+    """Test replacing a whole mapping file in one run."""
+    mapping_file = tmp_path / "migrations.csv"
+    mapping_file.write_text("gundam.wing.zero.WingZero,gundam.wing.custom.WingZeroCustom\n"
+                            "gundam.wing.epyon.BeamSaber,gundam.wing.tallgeese.BeamSaber\n")
+    src = tmp_path / "src"
+    src.mkdir()
+    (src / "a.py").write_text("from gundam.wing.zero import WingZero\n")
+    (src / "b.py").write_text("from gundam.wing.zero import WingZero\nfrom gundam.wing.epyon import BeamSaber\n")
+
+    result = runner.invoke(app, ["replace-import", "--mapping", str(mapping_file), str(src)])
+    assert result.exit_code == 0
+    assert "Mapping Summary" in result.stdout
+    assert "Modified imports in 2 of 2 files" in result.stdout
+    assert (src / "b.py").read_text() == ("from gundam.wing.custom import WingZeroCustom\n"
+                                          "from gundam.wing.tallgeese import BeamSaber\n")
+
+def test_replace_import_mapping_rejects_extra_arguments(tmp_path):
+    """Test that --mapping takes only the path."""
+    mapping_file = tmp_path / "migrations.csv"
+    mapping_file.write_text("a.B,c.B\n")
+
+    result = runner.invoke(app, ["replace-import", "--mapping", str(mapping_file), "a.B", "c.B", str(tmp_path)])
+    assert result.exit_code == 2
+
+def test_replace_import_invalid_mapping(tmp_path):
+    """Test that a malformed mapping file is reported."""
+    mapping_file = tmp_path / "migrations.csv"
+    mapping_file.write_text("a.B,c.B,d.B\n")
+
+    result = runner.invoke(app, ["replace-import", "--mapping", str(mapping_file), str(tmp_path)])
+    assert result.exit_code == 1
+    assert "Could not load mapping" in result.stdout
+
+def test_replace_call_rules(tmp_path):
+    """Test replacing every call in a rules file and reporting hits per rule."""
+    rules_file = tmp_path / "rules.toml"
+    rules_file.write_text('[calls]\n"self.old_a" = "self.new_a"\n"self.old_b" = "self.new_b"\n')
+    src = tmp_path / "src"
+    src.mkdir()
+    (src / "a.py").write_text("self.old_a()\nself.old_a()\n")
+
+    result = runner.invoke(app, ["replace-call", "--rules", str(rules_file), "--directory", str(src), "--no-cache"])
+    assert result.exit_code == 0
+    assert "Rule Summary" in result.stdout
+    assert "1 of 2 rules matched no calls" in result.stdout
+    assert (src / "a.py").read_text() == "self.new_a()\nself.new_a()\n"
+
+def test_replace_call_rules_arguments(tmp_path):
+    """Test that --rules replaces the call arguments, which are otherwise required."""
+    rules_file = tmp_path / "rules.toml"
+    rules_file.write_text('[calls]\n"print" = "self.log"\n')
+
+    result = runner.invoke(app, ["replace-call", "--rules", str(rules_file), "self.a", "self.b"])
+    assert result.exit_code == 2
+    result = runner.invoke(app, ["replace-call", "self.a"])
+    assert result.exit_code == 2
+    result = runner.invoke(app, ["replace-call", "--rules", str(rules_file), "--directory", str(tmp_path)])
+    assert result.exit_code == 1
+    assert "Could not load rules" in result.stdout
+
+def test_replace_import_since(tmp_path):
+    """Test that --since only touches files changed since the ref."""
+    git = ["git", "-c", "user.name=Test", "-c", "user.email=test@example.com"]
+    for name in ("a.py", "b.py"):
+        (tmp_path / name).write_text("from old.module import Class\n")
+    subprocess.run(git + ["init", "-q"], cwd=tmp_path, check=True)
+    subprocess.run(git + ["add", "."], cwd=tmp_path, check=True)
+    subprocess.run(git + ["commit", "-q", "-m", "initial"], cwd=tmp_path, check=True)
+    (tmp_path / "b.py").write_text("from old.module import Class\nx = 1\n")
+
+    result = runner.invoke(app, ["replace-import", "old.module.Class", "new.module.Class", str(tmp_path), "--since", "HEAD"])
+    assert result.exit_code == 0
+    assert "old.module" in (tmp_path / "a.py").read_text()
+    assert "new.module" in (tmp_path / "b.py").read_text()
+
+    result = runner.invoke(app, ["replace-import", "old.module.Class", "new.module.Class", str(tmp_path), "--since", "nope"])
+    assert result.exit_code == 1
+    assert "git merge-base failed" in result.stdout
@@ -0,0 +1,121 @@
+"""Tests for the config module."""
+import pytest
+
+from epyon.core.config import load_call_rules, load_import_mapping, load_plan, load_toml
+
+def test_load_toml_mapping(tmp_path):
+    """Test loading import pairs from a TOML file."""
+    mapping_file = tmp_path / "migrations.toml"
+    mapping_file.write_text("""
+[imports]
+"gundam.wing.zero.WingZero" = "gundam.wing.custom.WingZeroCustom"
+"gundam.wing.epyon.BeamSaber" = "gundam.wing.tallgeese.BeamSaber"
+""")
+
+    assert load_import_mapping(mapping_file) == {
+        "gundam.wing.zero.WingZero": "gundam.wing.custom.WingZeroCustom",
+        "gundam.wing.epyon.BeamSaber": "gundam.wing.tallgeese.BeamSaber",
+    }
+
+def test_load_csv_mapping(tmp_path):
+    """Test loading import pairs from a CSV file with a header and comments."""
+    mapping_file = tmp_path / "migrations.csv"
+    mapping_file.write_text(
+        "old,new\n"
+        "# Wing Zero moves first\n"
+        "gundam.wing.zero.WingZero, gundam.wing.custom.WingZeroCustom\n"
+        "\n"
+        "gundam.wing.epyon.BeamSaber,gundam.wing.tallgeese.BeamSaber\n"
+    )
+
+    assert load_import_mapping(mapping_file) == {
+        "gundam.wing.zero.WingZero": "gundam.wing.custom.WingZeroCustom",
+        "gundam.wing.epyon.BeamSaber": "gundam.wing.tallgeese.BeamSaber",
+    }
+
+@pytest.mark.parametrize("filename,content,message", [
+    ("m.toml", "[other]\n", r"expected an \[imports\] table"),
+    ("m.toml", "[imports\n", "Invalid TOML"),
+    ("m.toml", "[imports]\n\"a.B\" = 1\n", "must be a string"),
+    ("m.csv", "a.B,c.B,extra\n", "expected two columns"),
+    ("m.csv", "a.B,c.B\na.B,d.B\n", "mapped to more than one import"),
+    ("m.csv", "NoModule,c.B\n", "is not a dotted import path"),
+    ("m.json", "{}", "must end in .toml or .csv"),
+])
+def test_load_mapping_errors(tmp_path, filename, content, message):
+    """Test that malformed mapping files are rejected with a clear message."""
+    mapping_file = tmp_path / filename
+    mapping_file.write_text(content)
+
+    with pytest.raises(ValueError, match=message):
+        load_import_mapping(mapping_file)
+
+def test_load_call_rules(tmp_path):
+    """Test loading call rules from a TOML file, keeping their order."""
+    rules_file = tmp_path / "rules.toml"
+    rules_file.write_text("""
+[calls]
+"self.assertEqual(404, response.status_code)" = "self.assertNotFound(response)"
+"self.assertEquals" = "self.assertEqual"
+""")
+
+    assert list(load_call_rules(rules_file).items()) == [
+        ("self.assertEqual(404, response.status_code)", "self.assertNotFound(response)"),
+        ("self.assertEquals", "self.assertEqual"),
+    ]
+
+@pytest.mark.parametrize("filename,content,message", [
+    ("r.toml", "[imports]\n", r"expected a \[calls\] table"),
+    ("r.toml", "[calls]\n", r"expected a \[calls\] table"),
+    ("r.toml", "[calls]\n\"self.a\" = 1\n", "must be a string"),
+    ("r.toml", "[calls]\n\"print\" = \"self.log\"\n", "is not an attribute call"),
+    ("r.toml", "[calls]\n\"self.a\" = \"self..b\"\n", "is not an attribute call"),
+    ("r.csv", "self.a,self.b\n", "must end in .toml"),
+])
+def test_load_call_rules_errors(tmp_path, filename, content, message):
+    """Test that malformed rules files are rejected with a clear message."""
+    rules_file = tmp_path / filename
+    rules_file.write_text(content)
+
+    with pytest.raises(ValueError, match=message):
+        load_call_rules(rules_file)
+
+def test_load_plan(tmp_path):
+    """Test loading a plan, with missing tables left empty."""
+    plan_file = tmp_path / "plan.toml"
+    plan_file.write_text("""
+[moves]
+"gundam.wing.zero.WingZero" = "gundam.wing.custom.WingZero"
+
+[calls]
+"self.assertEquals" = "self.assertEqual"
+""")
+
+    assert load_plan(plan_file) == {
+        "moves": {"gundam.wing.zero.WingZero": "gundam.wing.custom.WingZero"},
+        "imports": {},
+        "calls": {"self.assertEquals": "self.assertEqual"},
+    }
+
+@pytest.mark.parametrize("content,message", [
+    ("", "the plan has no rules"),
+    ("[renames]\n", r"unknown table \[renames\]"),
+    ("moves = 1\n", r"expected a \[moves\] table"),
+    ("[imports]\n\"a.B\" = 2\n", "must be a string"),
+    ("[moves]\n\"Name\" = \"a.Name\"\n", "is not a dotted import path"),
+    ("[calls]\n\"print\" = \"self.log\"\n", "is not an attribute call"),
+])
+def test_load_plan_errors(tmp_path, content, message):
+    """Test that malformed plans are rejected with a clear message."""
+    plan_file = tmp_path / "plan.toml"
+    plan_file.write_text(content)
+
+    with pytest.raises(ValueError, match=message):
+        load_plan(plan_file)
+
+def test_load_toml(tmp_path):
+    """Test loading a plain TOML document."""
+    toml_file = tmp_path / "pyproject.toml"
+    toml_file.write_text("[tool.epyon]\nexclude = ['build']\n")
+
+    assert load_toml(toml_file) == {"tool": {"epyon": {"exclude": ["build"]}}}
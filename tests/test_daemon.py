@@ -0,0 +1,186 @@
+"""Tests for the daemon module."""
+import os
+import threading
+import time
+from pathlib import Path
+import pytest
+from typer.testing import CliRunner
+
+from epyon.cli import app
+from epyon.core.daemon import DaemonState, ModuleCache, handle_request, send_request, serve
+
+runner = CliRunner()
+
+def _backdate(*file_paths: Path) -> None:
+    """Move mtimes outside the racy window so the caches trust them."""
+    for file_path in file_paths:
+        os.utime(file_path, ns=(1_000_000_000, 1_000_000_000))
+
+@pytest.fixture
+def project(tmp_path, monkeypatch):
+    """Create a small project with an isolated cache directory."""
+    monkeypatch.setenv("EPYON_CACHE_DIR", str(tmp_path / "cache"))
+    root = tmp_path / "project"
+    root.mkdir()
+    (root / "calls.py").write_text("def test(self):\n    self.assert_401_UNAUTHORIZED()\n")
+    (root / "imports.py").write_text("from gundam.wing.zero import WingZero\n")
+    (root / "other.py").write_text("import os\n")
+    _backdate(*root.iterdir())
+    return root
+
+def _run(state, request):
+    """Handle a request and collect the events it emits."""
+    events = []
+    handle_request(state, request, events.append)
+    return events
+
+def test_module_cache_reuses_parsed_modules(tmp_path):
+    """Test that unchanged files are parsed once."""
+    file_path = tmp_path / "a.py"
+    file_path.write_text("x = 1\n")
+    _backdate(file_path)
+    cache = ModuleCache()
+
+    first = cache.parse(file_path)
+    assert cache.parse(file_path) is first
+    assert (cache.hits, cache.misses) == (1, 1)
+
+def test_module_cache_detects_changes(tmp_path):
+    """Test that a changed file is read and parsed again."""
+    file_path = tmp_path / "a.py"
+    file_path.write_text("x = 1\n")
+    _backdate(file_path)
+    cache = ModuleCache()
+    cache.parse(file_path)
+
+    file_path.write_text("x = 22\n")
+    assert cache.read(file_path) == "x = 22\n"
+    assert cache.parse(file_path).code == "x = 22\n"
+
+def test_module_cache_evicts_least_recently_used(tmp_path):
+    """Test the LRU bound."""
+    files = []
+    for name in ("a", "b", "c"):
+        file_path = tmp_path / f"{name}.py"
+        file_path.write_text(f"{name} = 1\n")
+        files.append(file_path)
+    _backdate(*files)
+    cache = ModuleCache(max_entries=2)
+
+    cache.parse(files[0])
+    cache.parse(files[1])
+    cache.parse(files[0])
+    cache.parse(files[2])
+
+    assert len(cache) == 2
+    assert files[1] not in cache._entries
+
+def test_daemon_state_rediscovers_new_files(project):
+    """Test that the cached file list notices added files."""
+    state = DaemonState()
+    assert len(state.files(project)) == 3
+
+    (project / "new.py").write_text("import sys\n")
+    os.utime(project, ns=(2_000_000_000, 2_000_000_000))
+    assert len(state.files(project)) == 4
+
+def test_handle_replace_import(project):
+    """Test a replace-import request streams output and a summary."""
+    state = DaemonState()
+    events = _run(state, {
+        "command": "replace-import",
+        "old": "gundam.wing.zero.WingZero",
+        "new": "gundam.wing.custom.WingZeroCustom",
+        "path": str(project),
+    })
+
+    assert events[-1] == {
+        "event": "done", "modified": 1, "total": 3, "skipped": 2, "matched": {"gundam.wing.zero.WingZero": 1}
+    }
+    assert any(event["event"] == "output" and "Updated" in event["text"] for event in events)
+    assert (project / "imports.py").read_text() == "from gundam.wing.custom import WingZeroCustom\n"
+
+def test_handle_replace_call_dry_run(project):
+    """Test a dry-run replace-call request leaves files alone."""
+    events = _run(DaemonState(), {
+        "command": "replace-call",
+        "old": "self.assert_401_UNAUTHORIZED",
+        "new": "self.assert_403_FORBIDDEN",
+        "path": str(project),
+        "dry_run": True,
+    })
+
+    assert events[-1]["modified"] == 1
+    assert "assert_401_UNAUTHORIZED" in (project / "calls.py").read_text()
+
+def test_handle_move_def(project):
+    """Test a move-def request uses the warm import map."""
+    (project / "zero.py").write_text("class WingZero:\n    pass\n")
+    (project / "custom.py").write_text("")
+    (project / "imports.py").write_text("from zero import WingZero\n")
+
+    events = _run(DaemonState(), {
+        "command": "move-def",
+        "old": "zero.WingZero",
+        "new": "custom.WingZero",
+        "path": str(project),
+    })
+
+    assert events[-1]["event"] == "done"
+    assert events[-1]["modified"] == 3
+    assert "class WingZero" in (project / "custom.py").read_text()
+    assert (project / "imports.py").read_text() == "from custom import WingZero\n"
+
+def test_handle_unknown_command():
+    """Test that unknown commands are reported, not fatal."""
+    events = []
+    assert handle_request(DaemonState(), {"command": "explode"}, events.append)
+    assert events == [{"event": "error", "message": "Unknown command 'explode'"}]
+
+def test_socket_round_trip(project, tmp_path):
+    """Test the CLI client against a daemon serving a real socket."""
+    socket_path = tmp_path / "epyon.sock"
+    server = threading.Thread(target=serve, args=(socket_path,), daemon=True)
+    server.start()
+    for _ in range(100):
+        if socket_path.exists():
+            break
+        time.sleep(0.01)
+
+    result = runner.invoke(app, [
+        "replace-call",
+        "self.assert_401_UNAUTHORIZED",
+        "self.assert_403_FORBIDDEN",
+        "--directory",
+        str(project),
+        "--daemon",
+    ], env={"EPYON_SOCKET": str(socket_path)})
+    assert result.exit_code == 0
+    assert "Modified imports in 1 of 3 files" in result.stdout
+    assert "assert_403_FORBIDDEN" in (project / "calls.py").read_text()
+
+    assert list(send_request({"command": "shutdown"}, socket_path)) == [{"event": "done", "shutdown": True}]
+    server.join(timeout=5)
+    assert not socket_path.exists()
+
+def test_client_without_daemon(tmp_path):
+    """Test the error shown when no daemon is running."""
+    result = runner.invoke(app, [
+        "replace-import", "a.B", "c.B", str(tmp_path), "--daemon"
+    ], env={"EPYON_SOCKET": str(tmp_path / "missing.sock")})
+    assert result.exit_code == 1
+    assert "No epyon daemon is listening" in result.stdout
+
+@pytest.mark.parametrize("option,message", [
+    (["--no-cache"], "--no-cache and --rebuild-index can't be used with --daemon"),
+    (["--rebuild-index"], "--no-cache and --rebuild-index can't be used with --daemon"),
+    (["--stats"], "--stats can't be used with --daemon"),
+    (["--executor", "process"], "--executor can't be used with --daemon"),
+])
+def test_replace_call_daemon_rejects_local_options(tmp_path, option, message):
+    """Test that replace-call options the daemon can't honour are rejected rather than dropped."""
+    result = runner.invoke(app, [
+        "replace-call", "self.a", "self.b", "--directory", str(tmp_path), "--daemon", *option
+    ], env={"EPYON_SOCKET": str(tmp_path / "missing.sock")})
+    assert result.exit_code == 1
+    assert message in result.stdout
@@ -2,7 +2,7 @@
 import pytest
 from pathlib import Path
 import libcst as cst
-from epyon.core.def_mover import DefinitionExtractor, process_file_move, find_module_file
+from epyon.core.def_mover import DefinitionExtractor, find_module_file, find_relevant_files, process_file_move
 
 def test_extract_class_definition():
     """Test extracting a class definition."""
@@ -190,4 +190,24 @@ def test_process_file_move_invalid_file(tmp_path):
     )
     
     assert not changes_made
-    assert extracted_def is None 
\ No newline at end of file
+    assert extracted_def is None 
+
+def test_find_relevant_files_follows_module_imports(tmp_path):
+    """Test that files reaching the definition through an import of its module or package are found."""
+    (tmp_path / "gundam").mkdir()
+    (tmp_path / "gundam" / "__init__.py").write_text("")
+    (tmp_path / "gundam" / "zero.py").write_text("class WingZero:\n    pass\n")
+    (tmp_path / "gundam" / "custom.py").write_text("")
+    files = {
+        "direct.py": "from gundam.zero import WingZero\n",
+        "module.py": "import gundam.zero\n\ngundam.zero.WingZero()\n",
+        "package.py": "import gundam\n\ngundam.zero.WingZero()\n",
+        "sibling.py": "from gundam import zero\n\nzero.WingZero()\n",
+        "unrelated.py": "from gundam.zero_extra import WingZero\nimport gundam.custom\n",
+    }
+    for name, source in files.items():
+        (tmp_path / name).write_text(source)
+
+    relevant = find_relevant_files(tmp_path, "gundam.zero.WingZero", "gundam.custom.WingZero", use_cache=False)
+
+    assert {path.name for path in relevant} == {"direct.py", "module.py", "package.py", "sibling.py", "zero.py", "custom.py"}
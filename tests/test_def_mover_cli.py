@@ -1 +1,62 @@
- 
\ No newline at end of file
+"""Tests for the move-def command."""
+import pytest
+from typer.testing import CliRunner
+
+from epyon.cli import app
+
+runner = CliRunner()
+
+@pytest.fixture
+def project(tmp_path, monkeypatch):
+    """Create a small package with a definition to move."""
+    monkeypatch.setenv("EPYON_CACHE_DIR", str(tmp_path / "cache"))
+    root = tmp_path / "project"
+    (root / "myapp" / "core").mkdir(parents=True)
+    (root / "myapp" / "__init__.py").touch()
+    (root / "myapp" / "core" / "__init__.py").touch()
+    (root / "myapp" / "models.py").write_text("class User:\n    pass\n")
+    (root / "myapp" / "core" / "models.py").write_text("# Receives User\n")
+    (root / "myapp" / "auth.py").write_text("from myapp.models import User\n\nuser = User()\n")
+    (root / "myapp" / "unrelated.py").write_text("import os\n")
+    return root
+
+@pytest.mark.parametrize("flags", [[], ["--no-cache"], ["--rebuild-index"]])
+def test_move_def(project, flags):
+    """Test moving a class and updating its importers."""
+    result = runner.invoke(app, [
+        "move-def",
+        "myapp.models.User",
+        "myapp.core.models.User",
+        str(project),
+        *flags
+    ])
+    assert result.exit_code == 0
+    assert "Modified imports in 3 of 3 files" in result.stdout
+
+    assert "class User" not in (project / "myapp" / "models.py").read_text()
+    assert "class User" in (project / "myapp" / "core" / "models.py").read_text()
+    assert "from myapp.core.models import User" in (project / "myapp" / "auth.py").read_text()
+    assert (project / "myapp" / "unrelated.py").read_text() == "import os\n"
+
+def test_move_def_no_cache_leaves_no_index(project, tmp_path):
+    """Test that --no-cache doesn't persist the import index."""
+    runner.invoke(app, [
+        "move-def",
+        "myapp.models.User",
+        "myapp.core.models.User",
+        str(project),
+        "--no-cache",
+        "--dry-run"
+    ])
+    assert not (tmp_path / "cache").exists()
+
+def test_move_def_missing_definition(project):
+    """Test moving a definition that doesn't exist."""
+    result = runner.invoke(app, [
+        "move-def",
+        "myapp.models.Missing",
+        "myapp.core.models.Missing",
+        str(project)
+    ])
+    assert result.exit_code == 1
+    assert "Could not find definition" in result.stdout
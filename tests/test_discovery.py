@@ -0,0 +1,185 @@
+"""Tests for Python file discovery."""
+from pathlib import Path
+import subprocess
+import types
+
+import pytest
+
+from epyon.core.discovery import (
+    GitIgnore,
+    git_changed_files,
+    iter_python_files,
+    load_discovery_config,
+    matches_glob,
+)
+from epyon.core.utils import find_python_files
+
+def _touch(root: Path, *paths: str) -> None:
+    for path in paths:
+        file_path = root / path
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        file_path.write_text("")
+
+def _found(root: Path, **kwargs) -> list:
+    return [path.relative_to(root).as_posix() for path in iter_python_files(root, **kwargs)]
+
+@pytest.fixture
+def tree(tmp_path):
+    """Create a project with code next to vendored and build directories."""
+    _touch(
+        tmp_path,
+        "app/models.py",
+        "app/views.py",
+        "app/notes.txt",
+        ".venv/lib/site.py",
+        "node_modules/pkg/setup.py",
+        "build/lib/app/models.py",
+        "epyon.egg-info/stub.py",
+        "tests/test_models.py",
+    )
+    return tmp_path
+
+@pytest.mark.parametrize("rel_path, pattern, expected", [
+    ("build/lib/a.py", "build", True),
+    ("src/rebuild/a.py", "build", False),
+    ("pkg/foo.egg-info", "*.egg-info", True),
+    ("src/gen/deep/a.py", "src/gen/**", True),
+    ("src/gen.py", "src/gen/**", False),
+    ("a/b/c_pb2.py", "**/*_pb2.py", True),
+    ("c_pb2.py", "**/*_pb2.py", True),
+    ("app/models.py", "app/*.py", True),
+    ("app/sub/models.py", "app/*.py", False),
+])
+def test_matches_glob(rel_path, pattern, expected):
+    """Test component and path glob matching."""
+    assert matches_glob(rel_path, pattern) is expected
+
+def test_default_excludes_are_pruned(tree):
+    """Test that vendored and build directories are never entered."""
+    assert _found(tree) == ["app/models.py", "app/views.py", "tests/test_models.py"]
+
+def test_nested_build_packages_are_kept(tree):
+    """Test that only the top-level build and dist directories count as build output."""
+    _touch(tree, "app/build/__init__.py", "app/dist/steps.py", "dist/app-1.0/setup.py")
+    assert sorted(_found(tree)) == [
+        "app/build/__init__.py", "app/dist/steps.py", "app/models.py", "app/views.py", "tests/test_models.py"
+    ]
+
+def test_pruned_directories_are_not_walked(tree):
+    """Test that excluded directories are skipped before they are listed."""
+    entered = []
+    list(iter_python_files(tree, exclude=["tests"], on_directory=entered.append))
+    assert sorted(Path(path).relative_to(tree).as_posix() for path in entered) == [".", "app"]
+
+def test_exclude_and_include(tree):
+    """Test the extra exclude and include globs."""
+    assert _found(tree, exclude=["tests"]) == ["app/models.py", "app/views.py"]
+    assert _found(tree, include=["app/**"]) == ["app/models.py", "app/views.py"]
+    assert _found(tree, exclude=["views.py"], include=["app/**"]) == ["app/models.py"]
+
+def test_gitignore(tree):
+    """Test that root and nested .gitignore files are honoured, with negation."""
+    (tree / ".gitignore").write_text("# generated\ngenerated/\n*_pb2.py\n!keep_pb2.py\n")
+    (tree / "app" / ".gitignore").write_text("/views.py\n")
+    _touch(tree, "generated/api.py", "app/api_pb2.py", "app/keep_pb2.py", "tests/views.py")
+
+    assert _found(tree) == ["app/keep_pb2.py", "app/models.py", "tests/test_models.py", "tests/views.py"]
+    assert "app/views.py" in _found(tree, respect_gitignore=False)
+
+def test_gitignore_above_the_walked_directory(tree):
+    """Test that rules from the repository root apply to a subdirectory walk."""
+    (tree / ".git").mkdir()
+    (tree / ".gitignore").write_text("app/views.py\n")
+    assert _found(tree / "app") == ["models.py"]
+
+def test_gitignore_last_match_wins(tmp_path):
+    """Test git's precedence between rules."""
+    (tmp_path / ".gitignore").write_text("*.py\n!keep.py\n")
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "sub" / ".gitignore").write_text("keep.py\n")
+
+    gitignore = GitIgnore().extend(tmp_path / ".gitignore", "")
+    assert gitignore.ignored("a.py", False)
+    assert not gitignore.ignored("sub/keep.py", False)
+
+    nested = gitignore.extend(tmp_path / "sub" / ".gitignore", "sub")
+    assert nested.ignored("sub/keep.py", False)
+    assert not nested.ignored("keep.py", False)
+
+def test_pyproject_config(tree):
+    """Test that [tool.epyon] in pyproject.toml configures discovery."""
+    (tree / "pyproject.toml").write_text(
+        '[tool.epyon]\nexclude = ["tests"]\ninclude = ["**/models.py", "tests/*"]\n'
+    )
+    assert load_discovery_config(tree / "app").exclude == ("tests",)
+    assert _found(tree) == ["app/models.py"]
+
+def test_invalid_pyproject_is_ignored(tree):
+    """Test that an unreadable pyproject.toml falls back to the defaults."""
+    (tree / "pyproject.toml").write_text("[tool.epyon\n")
+    assert load_discovery_config(tree).exclude == ()
+    assert len(_found(tree)) == 3
+
+def test_discovery_is_lazy(tree):
+    """Test that files are yielded before the walk finishes."""
+    files = iter_python_files(tree)
+    assert isinstance(files, types.GeneratorType)
+    assert next(files) == tree / "app" / "models.py"
+
+def test_symlinked_files_are_found_once(tmp_path):
+    """Test that a file reachable under two names is only yielded the first time."""
+    _touch(tmp_path, "real/x.py")
+    (tmp_path / "link.py").symlink_to(tmp_path / "real" / "x.py")
+    (tmp_path / "real" / "again.py").symlink_to("x.py")
+    (tmp_path / "real" / "y.py").symlink_to(tmp_path / "missing.py")
+
+    assert _found(tmp_path) == ["link.py"]
+
+def test_find_python_files_uses_discovery(tree):
+    """Test that the shared helper applies the same rules."""
+    assert sorted(find_python_files(tree, exclude=["app"])) == [tree / "tests" / "test_models.py"]
+
+def _git(repo: Path, *args: str) -> None:
+    subprocess.run(
+        ["git", "-c", "user.name=Test", "-c", "user.email=test@example.com", *args],
+        cwd=repo, check=True, capture_output=True
+    )
+
+@pytest.fixture
+def repo(tmp_path):
+    """Create a git repository with two committed modules."""
+    _touch(tmp_path, "pkg/a.py", "pkg/b.py", "pkg/gone.py")
+    _git(tmp_path, "init", "-q")
+    _git(tmp_path, "add", ".")
+    _git(tmp_path, "commit", "-q", "-m", "initial")
+    return tmp_path
+
+def test_git_changed_files_since(repo):
+    """Test that committed, uncommitted and untracked changes since a ref are listed."""
+    _git(repo, "tag", "base")
+    (repo / "pkg" / "a.py").write_text("x = 1\n")
+    _git(repo, "commit", "-q", "-am", "change a")
+    (repo / "pkg" / "b.py").write_text("y = 2\n")
+    (repo / "pkg" / "gone.py").unlink()
+    _touch(repo, "pkg/new.py", "pkg/notes.txt")
+
+    assert git_changed_files(repo, since="base") == [repo / "pkg" / p for p in ("a.py", "b.py", "new.py")]
+    assert git_changed_files(repo / "pkg", since="base", exclude=["b.py"]) == [
+        repo / "pkg" / "a.py", repo / "pkg" / "new.py"
+    ]
+
+def test_git_changed_files_staged(repo):
+    """Test that only staged files are listed with staged."""
+    (repo / "pkg" / "a.py").write_text("x = 1\n")
+    (repo / "pkg" / "b.py").write_text("y = 2\n")
+    _git(repo, "add", "pkg/a.py")
+
+    assert git_changed_files(repo, staged=True) == [repo / "pkg" / "a.py"]
+    assert find_python_files(repo, staged=True) == [repo / "pkg" / "a.py"]
+
+def test_git_changed_files_errors(repo, tmp_path_factory):
+    """Test that unknown refs and non-repositories are reported."""
+    with pytest.raises(ValueError, match="merge-base"):
+        git_changed_files(repo, since="no-such-ref")
+    with pytest.raises(ValueError):
+        git_changed_files(tmp_path_factory.mktemp("plain"), since="HEAD")
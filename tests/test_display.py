@@ -1,6 +1,13 @@
 """Tests for the display module."""
+from io import StringIO
 from pathlib import Path
-from epyon.display import Display, console
+
+from rich.console import Console
+
+from epyon.core.import_replacer import process_file
+from epyon.core.prefilter import SKIPPED
+from epyon.core.utils import process_files_parallel
+from epyon.display import PROGRESS_REFRESH_SECONDS, Display, ProgressTracker, console
 
 def test_show_diff_with_changes(capsys):
     """Test showing diff when there are changes."""
@@ -53,4 +60,69 @@ def test_show_diff_multiline_changes(capsys):
     assert "Transforming test.py" in captured.out
     assert "-    DuoMaxwell," in captured.out
     assert "     HeeroYuy," in captured.out
-    assert "     TrowaBarton" in captured.out 
\ No newline at end of file
+    assert "     TrowaBarton" in captured.out 
+class _CountingBar:
+    """Stands in for a rich Progress and counts redraws."""
+
+    def __init__(self):
+        self.refreshes = 0
+        self.fields = {}
+
+    def add_task(self, description, **fields):
+        return 0
+
+    def update(self, task, **fields):
+        self.fields = fields
+
+    def refresh(self):
+        self.refreshes += 1
+
+def test_progress_tracker_counts_results():
+    """Test how results are counted as matched or failed."""
+    display = Display()
+    tracker = ProgressTracker(display, "Processing", 6)
+
+    tracker.advance_results([True, SKIPPED, None, (True, None), (False, None), ["a.b"]])
+    display.error("boom")
+    assert (tracker.completed, tracker.matched, tracker.errors) == (6, 3, 2)
+
+def test_progress_tracker_throttles_redraws(monkeypatch):
+    """Test that counting thousands of files only redraws a few times."""
+    now = [0.0]
+    monkeypatch.setattr("epyon.display.time.perf_counter", lambda: now[0])
+    bar = _CountingBar()
+    tracker = ProgressTracker(Display(), "Processing", 10_000, bar)
+
+    for _ in range(10_000):
+        now[0] += 0.0001
+        tracker.advance(matched=1)
+    assert tracker.matched == 10_000
+    assert bar.refreshes <= 1 + int(1.0 / PROGRESS_REFRESH_SECONDS) + 1
+    tracker.refresh()
+    assert bar.fields["completed"] == 10_000
+    assert round(bar.fields["rate"]) == 10_000
+
+def test_progress_bar_on_terminal(tmp_path, monkeypatch):
+    """Test that a real run draws the bar with worker errors on a terminal."""
+    output = StringIO()
+    monkeypatch.setattr("epyon.display.console", Console(file=output, force_terminal=True, width=200))
+    files = []
+    for i in range(4):
+        file_path = tmp_path / f"f{i}.py"
+        file_path.write_text("x = 1\n" if i else "x = (\n")
+        files.append(file_path)
+
+    results = process_files_parallel(
+        files, process_file, "x", "y", max_workers=2, executor="process", dry_run=True
+    )
+    assert results == [False] * 4
+    assert "4/4" in output.getvalue()
+    assert "0 matched" in output.getvalue()
+    assert "1 errors" in output.getvalue()
+
+def test_no_progress_bar_off_terminal(capsys):
+    """Test that piped output only counts."""
+    with Display().progress("Processing", 3) as tracker:
+        tracker.advance(3)
+    assert tracker.completed == 3
+    assert capsys.readouterr().out == ""
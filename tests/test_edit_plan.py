@@ -0,0 +1,146 @@
+"""Tests for recording edit plans with --plan-out and replaying them with apply-plan."""
+import json
+from pathlib import Path
+
+import pytest
+from typer.testing import CliRunner
+
+from epyon.cli import app
+from epyon.core.edit_plan import apply_edit_plan, load_edit_plan, replay_edits
+from epyon.core.edits import PLAN_HEADER, EditPlanWriter, edit_made, make_edit
+
+from .test_pipeline import PLAN, _make_tree
+
+runner = CliRunner()
+
+def _tree(root: Path) -> dict:
+    return {path.relative_to(root).as_posix(): path.read_text() for path in sorted(root.rglob("*.py"))}
+
+def test_replay_edits_checks_the_content_hash():
+    """Test that edits are spliced in only over the content they were made against."""
+    before = "a\nb\nc\n"
+    middle = before.replace("b\n", "B\n")
+    after = middle + "d\n"
+    edits = [make_edit(Path("m.py"), before, middle), make_edit(Path("m.py"), middle, after)]
+
+    assert replay_edits(before, edits) == after
+    with pytest.raises(ValueError, match="has changed since the plan was made"):
+        replay_edits(middle, edits)
+
+def test_writer_records_edits_in_path_order(tmp_path, monkeypatch):
+    """Test the plan file layout: a header, then one JSON edit per line."""
+    monkeypatch.chdir(tmp_path)
+    plan_path = tmp_path / "plan.epyon"
+    with EditPlanWriter(plan_path):
+        edit_made(tmp_path / "b.py", "x\n", "y\n")
+        edit_made(tmp_path / "a.py", "x\n", "z\n")
+
+    lines = [json.loads(line) for line in plan_path.read_text().splitlines()]
+    assert lines[0] == PLAN_HEADER
+    assert [(line["path"], line["new"]) for line in lines[1:]] == [("a.py", ["z\n"]), ("b.py", ["y\n"])]
+    assert list(load_edit_plan(plan_path)) == ["a.py", "b.py"]
+
+def test_load_edit_plan_rejects_other_files(tmp_path):
+    """Test that a file without the plan header isn't mistaken for a plan."""
+    plan_path = tmp_path / "changes.patch"
+    plan_path.write_text("diff --git a/m.py b/m.py\n")
+    with pytest.raises(ValueError, match="expected an edit plan"):
+        load_edit_plan(plan_path)
+
+def test_plan_then_apply_matches_a_direct_run(tmp_path, monkeypatch):
+    """Test that a dry run's plan, applied later, leaves the same tree as running the plan directly."""
+    for tree in ("direct", "planned"):
+        (tmp_path / tree).mkdir()
+        _make_tree(tmp_path / tree)
+    plan_file = tmp_path / "plan.toml"
+    plan_file.write_text(PLAN)
+    monkeypatch.chdir(tmp_path)
+
+    assert runner.invoke(app, ["apply", str(plan_file), "direct", "--executor", "serial"]).exit_code == 0
+    result = runner.invoke(app, [
+        "apply", str(plan_file), "planned", "--dry-run", "--executor", "process", "--plan-out", "edits.epyon"
+    ])
+    assert result.exit_code == 0
+    assert _tree(tmp_path / "planned") != _tree(tmp_path / "direct")
+
+    result = runner.invoke(app, ["apply-plan", "edits.epyon", "--dry-run"])
+    assert result.exit_code == 0
+    assert "applies cleanly to 3 files" in result.stdout
+    result = runner.invoke(app, ["apply-plan", "edits.epyon"])
+    assert result.exit_code == 0
+    assert "Modified 3 files" in result.stdout
+    assert _tree(tmp_path / "planned") == _tree(tmp_path / "direct")
+
+def test_replace_call_plan_out(tmp_path, monkeypatch):
+    """Test that replace-call records its edits with --plan-out."""
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / "test_x.py").write_text("def test(self):\n    self.old_check()\n")
+    monkeypatch.chdir(tmp_path)
+
+    result = runner.invoke(app, [
+        "replace-call", "self.old_check", "self.new_check", "--directory", "src", "--dry-run", "--plan-out", "calls.epyon"
+    ])
+    assert result.exit_code == 0
+    assert runner.invoke(app, ["apply-plan", "calls.epyon"]).exit_code == 0
+    assert (tmp_path / "src" / "test_x.py").read_text() == "def test(self):\n    self.new_check()\n"
+
+def test_move_def_plan_out_when_the_source_imports_the_moved_name(tmp_path, monkeypatch):
+    """Test that a move-def plan applies when the source file is both shrunk and re-pointed."""
+    files = {
+        "geometry/__init__.py": "",
+        "geometry/old.py": (
+            "class Square:\n    pass\n\n\n"
+            "def make():\n    from geometry.old import Square\n    return Square()\n"
+        ),
+        "geometry/new.py": "",
+        "user.py": "from geometry.old import Square\n",
+    }
+    for tree in ("direct", "planned"):
+        for name, source in files.items():
+            (tmp_path / tree / name).parent.mkdir(parents=True, exist_ok=True)
+            (tmp_path / tree / name).write_text(source)
+    monkeypatch.chdir(tmp_path)
+
+    move = ["move-def", "geometry.old.Square", "geometry.new.Square"]
+    assert runner.invoke(app, move + ["direct", "--no-cache"]).exit_code == 0
+    result = runner.invoke(app, move + ["planned", "--no-cache", "--dry-run", "--plan-out", "edits.epyon"])
+    assert result.exit_code == 0
+
+    result = runner.invoke(app, ["apply-plan", "edits.epyon"])
+    assert result.exit_code == 0, result.stdout
+    assert _tree(tmp_path / "planned") == _tree(tmp_path / "direct")
+    assert "from geometry.new import Square" in (tmp_path / "planned" / "geometry" / "old.py").read_text()
+
+def test_apply_plan_writes_nothing_when_a_file_changed(tmp_path, monkeypatch):
+    """Test that one stale file stops the whole plan from being applied."""
+    _make_tree(tmp_path)
+    plan_file = tmp_path / "plan.toml"
+    plan_file.write_text(PLAN)
+    monkeypatch.chdir(tmp_path)
+    runner.invoke(app, ["apply", "plan.toml", ".", "--dry-run", "--plan-out", "edits.epyon"])
+    (tmp_path / "user.py").write_text((tmp_path / "user.py").read_text() + "# edited\n")
+    before = _tree(tmp_path)
+
+    result = runner.invoke(app, ["apply-plan", "edits.epyon"])
+    assert result.exit_code == 1
+    assert "user.py has changed since the plan was made" in result.stdout
+    assert "nothing was written" in result.stdout
+    assert _tree(tmp_path) == before
+
+    applied = apply_edit_plan(load_edit_plan(tmp_path / "edits.epyon"))
+    assert applied.stale == ["user.py has changed since the plan was made"]
+    assert sorted(applied.files) == ["gundam/custom.py", "gundam/zero.py"]
+
+def test_plan_out_with_daemon_is_rejected(tmp_path):
+    """Test that --plan-out can't be sent to the daemon."""
+    result = runner.invoke(app, ["replace-call", "a.b", "a.c", "--daemon", "--plan-out", str(tmp_path / "p.epyon")])
+    assert result.exit_code == 1
+    assert "--plan-out can't be used with --daemon" in result.stdout
+
+def test_apply_plan_rejects_a_bad_plan(tmp_path):
+    """Test that a file that isn't a plan is reported."""
+    plan_path = tmp_path / "plan.epyon"
+    plan_path.write_text("{}\n")
+    result = runner.invoke(app, ["apply-plan", str(plan_path)])
+    assert result.exit_code == 1
+    assert "Could not load edit plan" in result.stdout
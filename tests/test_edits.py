@@ -0,0 +1,132 @@
+"""Tests for compact edits, parent-side diffs and --patch-out."""
+import difflib
+import subprocess
+from pathlib import Path
+
+import pytest
+from typer.testing import CliRunner
+
+from epyon.cli import app
+from epyon.core.edits import NO_NEWLINE, Edit, PatchWriter, edit_made, edits_wanted, handling_edits, make_edit
+from epyon.core.utils import process_files_parallel
+
+runner = CliRunner()
+
+BEFORE = "".join(f"line{i}\n" for i in range(100))
+
+def _full_diff(before: str, after: str, label: str) -> str:
+    return "".join(
+        line if line.endswith("\n") else line + "\n"
+        for line in difflib.unified_diff(
+            before.splitlines(keepends=True), after.splitlines(keepends=True), f"a/{label}", f"b/{label}"
+        )
+    )
+
+def _replace_line(file_path: Path) -> bool:
+    before = file_path.read_text()
+    edit_made(file_path, before, before.replace("line50\n", "changed\n"))
+    return True
+
+def test_make_edit_keeps_only_the_changed_span():
+    """Test that an edit holds the changed lines plus context, not the whole file."""
+    edit = make_edit(Path("m.py"), BEFORE, BEFORE.replace("line50\n", "changed\n"))
+    assert edit.start == 47
+    assert edit.old_lines == [f"line{i}\n" for i in range(47, 54)]
+    assert edit.new_lines[3] == "changed\n"
+    assert make_edit(Path("m.py"), BEFORE, BEFORE) is None
+
+@pytest.mark.parametrize("after", [
+    BEFORE.replace("line50\n", "changed\n"),
+    BEFORE.replace("line1\n", "").replace("line98\n", "a\nb\n"),
+    "new\n" + BEFORE,
+    BEFORE + "tail\n",
+    BEFORE.replace("line10\n", "").replace("line11\n", ""),
+])
+def test_diff_matches_a_full_diff(after):
+    """Test that the diff built from an edit matches diffing the whole file."""
+    edit = make_edit(Path("m.py"), BEFORE, after)
+    assert "".join(edit.diff_lines()) == _full_diff(BEFORE, after, "m.py")
+
+def test_diff_marks_missing_newline():
+    """Test that a last line without a newline is marked for patch tools."""
+    edit = make_edit(Path("m.py"), "a\nb\nc", "a\nb\nd")
+    assert "".join(edit.diff_lines()).endswith("-c\n" + NO_NEWLINE + "+d\n" + NO_NEWLINE)
+
+def test_edits_are_only_made_when_wanted(tmp_path):
+    """Test that processors pay nothing for edits nobody consumes."""
+    received = []
+    assert not edits_wanted()
+    edit_made(tmp_path / "a.py", "a\n", "b\n")
+    with handling_edits(received.append):
+        assert edits_wanted()
+        edit_made(tmp_path / "a.py", "a\n", "b\n")
+        edit_made(tmp_path / "b.py", "a\n", "a\n")
+    assert [edit.path for edit in received] == [str(tmp_path / "a.py")]
+
+@pytest.mark.parametrize("executor", ["serial", "thread", "process"])
+def test_workers_send_edits_to_parent(tmp_path, executor):
+    """Test that every backend delivers the edits to the parent's handlers."""
+    files = []
+    for i in range(6):
+        file_path = tmp_path / f"mod{i}.py"
+        file_path.write_text(BEFORE)
+        files.append(file_path)
+    received = []
+    with handling_edits(received.append):
+        process_files_parallel(files, _replace_line, max_workers=2, executor=executor)
+    assert sorted(edit.path for edit in received) == sorted(str(f) for f in files)
+    assert all(isinstance(edit, Edit) and len(edit.old_lines) == 7 for edit in received)
+
+def test_patch_writer_sorts_files(tmp_path, monkeypatch):
+    """Test that the patch lists files in path order with git headers."""
+    monkeypatch.chdir(tmp_path)
+    patch_path = tmp_path / "changes.patch"
+    with PatchWriter(patch_path) as patch:
+        edit_made(tmp_path / "b.py", "x\n", "y\n")
+        edit_made(tmp_path / "a.py", "x\n", "y\n")
+    assert len(patch.edits) == 2
+    text = patch_path.read_text()
+    assert text.index("diff --git a/a.py b/a.py") < text.index("diff --git a/b.py b/b.py")
+    assert "--- a/b.py\n+++ b/b.py\n" in text
+
+def test_cli_patch_out_applies_with_git(tmp_path, monkeypatch):
+    """Test that a dry run's patch turns the tree into what a real run writes."""
+    for tree in ("dry", "real"):
+        (tmp_path / tree).mkdir()
+        for i in range(12):
+            (tmp_path / tree / f"mod{i}.py").write_text("from a.b import C\n" + BEFORE + ("print(C)" if i % 2 else ""))
+        (tmp_path / tree / "other.py").write_text(BEFORE)
+
+    monkeypatch.chdir(tmp_path / "dry")
+    result = runner.invoke(app, [
+        "replace-import", "a.b.C", "a.d.C", ".", "--dry-run", "--executor", "process", "--patch-out", "../changes.patch"
+    ])
+    assert result.exit_code == 0
+    assert "Transforming" in result.output
+    assert (tmp_path / "dry" / "mod0.py").read_text().startswith("from a.b import C\n")
+    subprocess.run(["git", "apply", "../changes.patch"], check=True)
+
+    result = runner.invoke(app, ["replace-import", "a.b.C", "a.d.C", str(tmp_path / "real")])
+    assert result.exit_code == 0
+    for path in (tmp_path / "real").glob("*.py"):
+        assert (tmp_path / "dry" / path.name).read_text() == path.read_text()
+
+def test_cli_patch_out_for_calls(tmp_path):
+    """Test that replace-call dry runs can be written to a patch without showing diffs."""
+    (tmp_path / "calls.py").write_text("self.old_name(x)\n")
+    patch_path = tmp_path / "calls.patch"
+    result = runner.invoke(app, [
+        "replace-call", "self.old_name", "self.new_name", "--directory", str(tmp_path),
+        "--dry-run", "--patch-out", str(patch_path)
+    ])
+    assert result.exit_code == 0
+    assert "Transforming" not in result.output
+    assert "-self.old_name(x)\n+self.new_name(x)\n" in patch_path.read_text()
+
+def test_cli_patch_out_conflicts_with_daemon(tmp_path):
+    """Test that the daemon's changes can't be written to a patch."""
+    result = runner.invoke(app, [
+        "replace-import", "a.B", "c.B", str(tmp_path), "--daemon", "--patch-out", str(tmp_path / "x.patch")
+    ])
+    assert result.exit_code == 1
+    assert "--patch-out can't be used with --daemon" in result.output
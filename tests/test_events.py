@@ -0,0 +1,135 @@
+"""Tests for the per-file event stream behind --output=jsonl."""
+import io
+import json
+from pathlib import Path
+
+import pytest
+from typer.testing import CliRunner
+
+from epyon.cli import app
+from epyon.core.events import EventCollector, FileEvent, note, process_one, record, recording
+from epyon.core.prefilter import SKIPPED
+from epyon.core.utils import process_files_parallel
+from epyon.display import display
+
+runner = CliRunner()
+
+def _events(stdout: str):
+    return [json.loads(line) for line in stdout.splitlines()]
+
+def _noting_processor(file_path: Path) -> bool:
+    assert recording()
+    note(before="abc", after="abcdef", matches=2)
+    return True
+
+def _failing_processor(file_path: Path) -> bool:
+    raise RuntimeError("boom")
+
+def test_record_describes_a_file(tmp_path):
+    """Test that notes taken by a processor end up in its event."""
+    result, event = record(tmp_path / "a.py", _noting_processor)
+    assert result is True
+    assert event.action == "modified"
+    assert (event.matches, event.bytes_before, event.bytes_after) == (2, 3, 6)
+    assert event.duration >= 0
+    assert not recording()
+
+def test_record_derives_action_from_result(tmp_path):
+    """Test how results that weren't annotated are described."""
+    file_path = tmp_path / "a.py"
+    assert record(file_path, lambda _: SKIPPED)[1].action == "skipped"
+    assert record(file_path, lambda _: (False, None))[1].action == "unchanged"
+    mapped = record(file_path, lambda _: ["a.B", "c.D"])[1]
+    assert (mapped.action, mapped.matches) == ("modified", 2)
+    failed = record(file_path, _failing_processor)
+    assert failed[0] is None
+    assert (failed[1].action, failed[1].error) == ("error", "boom")
+
+def test_note_without_recording_is_ignored():
+    """Test that processors can note details when nobody is listening."""
+    note(before="abc")
+    assert not recording()
+
+def test_collector_writes_json_lines(tmp_path):
+    """Test that the collector writes an event per file and a summary."""
+    stream = io.StringIO()
+    collector = EventCollector(stream)
+    collector.emit(FileEvent("a.py", "modified", 1, 10, 12, 0.5))
+    collector.emit(FileEvent("b.py", "skipped", 0, 4, 4, 0.1))
+    collector.summary(dry_run=True)
+    events = _events(stream.getvalue())
+    assert events[0] == {
+        "event": "file", "path": "a.py", "action": "modified", "matches": 1,
+        "bytes_before": 10, "bytes_after": 12, "duration": 0.5, "error": None,
+    }
+    assert events[-1] == {
+        "event": "summary", "events": 2, "error": 0, "modified": 1, "unchanged": 0, "skipped": 1, "dry_run": True,
+    }
+
+def test_process_one_emits_to_active_collector(tmp_path):
+    """Test that work done outside iter_files_parallel is reported too."""
+    stream = io.StringIO()
+    assert process_one(tmp_path / "a.py", lambda _: recording()) is False
+    with EventCollector(stream):
+        assert process_one(tmp_path / "a.py", _noting_processor) is True
+        with pytest.raises(RuntimeError):
+            process_one(tmp_path / "b.py", _failing_processor)
+    assert [event["action"] for event in _events(stream.getvalue())] == ["modified", "error"]
+
+@pytest.mark.parametrize("executor", ["serial", "thread", "process"])
+def test_workers_send_events_to_parent(tmp_path, executor):
+    """Test that every backend delivers one event per file to the parent's collector."""
+    files = []
+    for i in range(6):
+        file_path = tmp_path / f"mod{i}.py"
+        file_path.write_text("x = 1\n")
+        files.append(file_path)
+    stream = io.StringIO()
+    with EventCollector(stream) as collector:
+        process_files_parallel(files, _noting_processor, max_workers=2, executor=executor)
+    events = _events(stream.getvalue())
+    assert sorted(event["path"] for event in events) == sorted(str(f) for f in files)
+    assert collector.actions["modified"] == 6
+
+def test_cli_jsonl_output(tmp_path):
+    """Test that --output jsonl puts only JSON on stdout."""
+    (tmp_path / "uses.py").write_text("from a.b import C\n")
+    (tmp_path / "other.py").write_text("x = 1\n")
+    result = runner.invoke(app, [
+        "replace-import", "a.b.C", "a.d.C", str(tmp_path), "--output", "jsonl", "--executor", "process"
+    ])
+    assert result.exit_code == 0
+    events = _events(result.stdout)
+    by_path = {event["path"]: event for event in events if event["event"] == "file"}
+    assert by_path[str(tmp_path / "uses.py")]["action"] == "modified"
+    assert by_path[str(tmp_path / "uses.py")]["bytes_after"] == len("from a.d import C\n")
+    assert by_path[str(tmp_path / "other.py")]["action"] == "skipped"
+    assert events[-1]["event"] == "summary"
+    assert events[-1]["modified"] == 1
+    assert "Updated" not in result.output
+    assert not display.quiet
+    assert (tmp_path / "uses.py").read_text() == "from a.d import C\n"
+
+def test_cli_jsonl_dry_run_reports_new_size(tmp_path):
+    """Test that dry runs still describe the code they would write."""
+    (tmp_path / "calls.py").write_text("self.old_name(x)\nself.old_name(y)\n")
+    result = runner.invoke(app, [
+        "replace-call", "self.old_name", "self.new", "--directory", str(tmp_path), "--dry-run", "--output", "jsonl"
+    ])
+    assert result.exit_code == 0
+    event, summary = _events(result.stdout)
+    assert (event["action"], event["matches"]) == ("modified", 2)
+    assert event["bytes_after"] < event["bytes_before"]
+    assert summary["dry_run"] is True
+    assert (tmp_path / "calls.py").read_text() == "self.old_name(x)\nself.old_name(y)\n"
+
+def test_cli_rejects_unknown_output(tmp_path):
+    """Test that an unknown --output value is a usage error."""
+    result = runner.invoke(app, ["replace-import", "a.B", "c.B", str(tmp_path), "--output", "xml"])
+    assert result.exit_code == 2
+
+def test_cli_jsonl_conflicts_with_daemon(tmp_path):
+    """Test that the daemon's streamed output can't be turned into events."""
+    result = runner.invoke(app, ["move-def", "a.B", "c.B", str(tmp_path), "--daemon", "--output", "jsonl"])
+    assert result.exit_code == 1
+    assert "--output can't be used with --daemon" in result.output
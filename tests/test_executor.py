@@ -0,0 +1,108 @@
+"""Tests for choosing the executor backend and the shared worker pool."""
+import os
+import sys
+from pathlib import Path
+
+import pytest
+from typer.testing import CliRunner
+
+from epyon.cli import app
+from epyon.core.def_mover import move_definition
+from epyon.core.executor import (
+    SERIAL_MAX_BYTES,
+    SERIAL_MAX_FILES,
+    THREAD_MAX_SCAN_BYTES,
+    WorkerPool,
+    choose_executor,
+    total_bytes,
+)
+from epyon.core.utils import build_import_map, process_files_parallel
+
+runner = CliRunner()
+
+MANY = SERIAL_MAX_FILES * 10
+
+def test_small_batches_run_serially():
+    """Test that too few files or bytes aren't worth starting workers for."""
+    assert choose_executor("auto", 3, 10 ** 9) == "serial"
+    assert choose_executor("auto", MANY, SERIAL_MAX_BYTES) == "serial"
+    assert choose_executor("auto", MANY, 10 ** 9, max_workers=1) == "serial"
+
+def test_large_batches_run_in_parallel():
+    """Test that scans prefer threads until they are big, and rewrites use processes."""
+    assert choose_executor("auto", MANY, THREAD_MAX_SCAN_BYTES, scan=True) == "thread"
+    assert choose_executor("auto", MANY, THREAD_MAX_SCAN_BYTES + 1, scan=True) == "process"
+    assert choose_executor("auto", MANY, SERIAL_MAX_BYTES + 1) == "process"
+
+def test_requested_executor_wins():
+    """Test that an explicit choice overrides the heuristics."""
+    assert choose_executor("process", 1, 0) == "process"
+    assert choose_executor("serial", MANY, 10 ** 9) == "serial"
+    with pytest.raises(ValueError, match="executor"):
+        choose_executor("fibers", 1, 0)
+
+def test_total_bytes(tmp_path):
+    """Test that sizes add up and missing files count as empty."""
+    (tmp_path / "a.py").write_text("x" * 10)
+    assert total_bytes([tmp_path / "a.py", tmp_path / "missing.py"]) == 10
+
+def test_cli_reports_executor(tmp_path):
+    """Test that --verbose reports the chosen backend."""
+    (tmp_path / "a.py").write_text("from foo.bar import Baz\n")
+
+    result = runner.invoke(app, [
+        "replace-import", "foo.bar.Baz", "lorem.ipsum.Baz", str(tmp_path), "--verbose",
+    ])
+    assert result.exit_code == 0
+    assert "Using the serial executor for 1 files" in result.stdout
+    assert (tmp_path / "a.py").read_text() == "from lorem.ipsum import Baz\n"
+
+def test_cli_rejects_unknown_executor(tmp_path):
+    """Test the --executor option validation."""
+    result = runner.invoke(app, [
+        "replace-import", "foo.bar.Baz", "lorem.ipsum.Baz", str(tmp_path), "--executor", "fibers",
+    ])
+    assert result.exit_code == 2
+
+def _worker_state(file_path: Path) -> tuple:
+    """Processor used by the tests; must be importable by worker processes."""
+    return os.getpid(), "colorsys" in sys.modules
+
+def test_worker_pool_starts_lazily(tmp_path):
+    """Test that a pool no batch needed never starts any processes."""
+    (tmp_path / "a.py").write_text("import os\n")
+    with WorkerPool(2) as pool:
+        process_files_parallel([tmp_path / "a.py"], _worker_state, pool=pool)
+        assert not pool.started
+
+def test_worker_pool_is_shared(tmp_path):
+    """Test that successive phases reuse the same preloaded workers."""
+    files = []
+    for i in range(6):
+        file_path = tmp_path / f"f{i}.py"
+        file_path.write_text(f"import mod{i}\n")
+        files.append(file_path)
+
+    with WorkerPool(2, preload=("colorsys",)) as pool:
+        import_map = build_import_map(tmp_path, use_cache=False, executor="process", pool=pool)
+        first = process_files_parallel(files, _worker_state, executor="process", pool=pool)
+        second = process_files_parallel(files, _worker_state, executor="process", pool=pool)
+    assert not pool.started
+
+    assert set(import_map) == {f"mod{i}" for i in range(6)}
+    assert all(preloaded for _, preloaded in first + second)
+    assert len({pid for pid, _ in first + second}) <= 2
+
+def test_move_definition_on_processes(tmp_path):
+    """Test a whole move-def run on a shared process pool."""
+    (tmp_path / "source.py").write_text("class Bar:\n    pass\n")
+    (tmp_path / "target.py").write_text("x = 1\n")
+    for i in range(4):
+        (tmp_path / f"user{i}.py").write_text("from source import Bar\n")
+
+    modified = move_definition(
+        tmp_path, "source.Bar", "target.Bar", max_workers=2, use_cache=False, executor="process"
+    )
+    assert modified == 5
+    assert "class Bar" in (tmp_path / "target.py").read_text()
+    assert (tmp_path / "user0.py").read_text() == "from target import Bar\n"
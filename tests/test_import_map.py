@@ -0,0 +1,54 @@
+"""Tests for the compact import map."""
+from pathlib import Path
+
+from epyon.core.import_map import ImportMap
+
+A, B, C = Path("a.py"), Path("b.py"), Path("c.py")
+
+def _map() -> ImportMap:
+    return ImportMap.build([
+        (A, ["gundam.wing", "gundam.wing.zero.WingZero", "os"]),
+        (B, ["gundam.wing.zero", "gundam.wing.zero", "gundam.wingman"]),
+        (C, ["gundam.wing_custom.Epyon", "os"]),
+    ])
+
+def test_import_map_reads_like_a_dict():
+    """Test that the compact map answers like the Dict[str, Set[Path]] it replaces."""
+    import_map = _map()
+
+    assert import_map == {
+        "gundam.wing": {A},
+        "gundam.wing.zero.WingZero": {A},
+        "gundam.wing.zero": {B},
+        "gundam.wingman": {B},
+        "gundam.wing_custom.Epyon": {C},
+        "os": {A, C},
+    }
+    assert list(import_map) == sorted(import_map)
+    assert "os" in import_map and "sys" not in import_map
+
+def test_files_importing():
+    """Test exact lookups, with files listed once however often they import a name."""
+    import_map = _map()
+
+    assert import_map.files_importing("gundam.wing.zero") == {B}
+    assert list(import_map._postings["gundam.wing.zero"]) == [1]
+    assert import_map.files_importing("sys") == set()
+
+def test_prefix_queries_stop_at_dotted_boundaries():
+    """Test that a prefix matches itself and its submodules, not names that merely start with it."""
+    import_map = _map()
+
+    assert import_map.names_under("gundam.wing") == ["gundam.wing", "gundam.wing.zero", "gundam.wing.zero.WingZero"]
+    assert import_map.files_importing_prefix("gundam.wing") == {A, B}
+    assert import_map.files_importing_prefix("gundam") == {A, B, C}
+    assert import_map.files_importing_prefix("gundam.epyon") == set()
+
+def test_ancestor_queries():
+    """Test that the modules containing a name are found with one lookup per dotted part."""
+    import_map = _map()
+
+    assert import_map.names_above("gundam.wing.zero.WingZero") == ["gundam.wing", "gundam.wing.zero"]
+    assert import_map.names_above("os") == []
+    assert import_map.files_reaching("gundam.wing.zero") == {A, B}
+    assert import_map.files_reaching("gundam.wingman.Heero") == {B}
@@ -2,7 +2,15 @@
 import pytest
 from pathlib import Path
 import libcst as cst
-from epyon.core.import_replacer import ImportReplacer, process_file, find_python_files
+from epyon.core.import_replacer import (
+    ImportMapping,
+    ImportReplacer,
+    find_python_files,
+    process_file,
+    process_file_mapping,
+    replace_imports_from_mapping,
+)
+from epyon.core.prefilter import SKIPPED
 
 def test_simple_import_replacement():
     """Test basic import replacement functionality."""
@@ -127,4 +135,86 @@ def test_split_import():
     
     module, name = transformer._split_import("ClassName")
     assert module == ""
-    assert name == "ClassName" 
\ No newline at end of file
+    assert name == "ClassName" 
+def test_replace_only_import_in_place():
+    """Test that a fully replaced statement is rewritten once, in place."""
+    source_code = """import os
+from foo.bar import OldClass
+"""
+    transformer = ImportReplacer("foo.bar.OldClass", "new.module.NewClass")
+    modified = cst.parse_module(source_code).visit(transformer)
+
+    assert modified.code == """import os
+from new.module import NewClass
+"""
+
+def test_import_alias_is_preserved():
+    """Test that an explicit 'as' name survives the replacement."""
+    source_code = """from foo.bar import OldClass as MyClass, Other
+"""
+    transformer = ImportReplacer("foo.bar.OldClass", "new.module.NewClass")
+    modified = cst.parse_module(source_code).visit(transformer)
+
+    assert modified.code == """from new.module import NewClass as MyClass
+from foo.bar import Other
+"""
+
+def test_remove_last_name_drops_trailing_comma():
+    """Test that removing the last name doesn't leave invalid syntax behind."""
+    source_code = """from foo.bar import Other, OldClass
+"""
+    transformer = ImportReplacer("foo.bar.OldClass", "new.module.NewClass")
+    modified = cst.parse_module(source_code).visit(transformer)
+
+    assert "from foo.bar import Other\n" in modified.code
+    cst.parse_module(modified.code)
+
+def test_star_import_is_ignored():
+    """Test that star imports from the old module are left alone."""
+    source_code = """from foo.bar import *
+"""
+    transformer = ImportReplacer("foo.bar.OldClass", "new.module.NewClass")
+    modified = cst.parse_module(source_code).visit(transformer)
+
+    assert not transformer.changes_made
+    assert modified.code == source_code
+
+def test_mapping_replaces_many_imports_in_one_pass():
+    """Test applying a whole mapping with a single transformer."""
+    source_code = """from a.b import X, Y, Keep
+from c import Z
+"""
+    mapping = ImportMapping({"a.b.X": "n.X", "a.b.Y": "m.Y", "c.Z": "d.Z", "q.W": "r.W"})
+    transformer = ImportReplacer.from_mapping(mapping)
+    modified = cst.parse_module(source_code).visit(transformer)
+
+    assert transformer.matched == {"a.b.X", "a.b.Y", "c.Z"}
+    assert modified.code == """from n import X
+from m import Y
+from a.b import Keep
+from d import Z
+"""
+
+def test_process_file_mapping(tmp_path):
+    """Test that process_file_mapping reports which mappings touched the file."""
+    test_file = tmp_path / "test.py"
+    test_file.write_text("from a.b import X\n")
+    mapping = ImportMapping({"a.b.X": "n.X", "c.Z": "d.Z"})
+
+    assert process_file_mapping(test_file, mapping, dry_run=False) == ["a.b.X"]
+    assert test_file.read_text() == "from n import X\n"
+
+    other_file = tmp_path / "other.py"
+    other_file.write_text("import os\n")
+    assert process_file_mapping(other_file, mapping, dry_run=False) is SKIPPED
+
+def test_replace_imports_from_mapping(tmp_path):
+    """Test the directory-wide mapping replacement and its per-mapping counts."""
+    (tmp_path / "one.py").write_text("from a.b import X\n")
+    (tmp_path / "two.py").write_text("from a.b import X\nfrom c import Z\n")
+    mapping = ImportMapping({"a.b.X": "n.X", "c.Z": "d.Z", "q.W": "r.W"})
+
+    modified_count, file_counts = replace_imports_from_mapping(tmp_path, mapping, max_workers=2)
+
+    assert modified_count == 2
+    assert file_counts == {"a.b.X": 2, "c.Z": 1, "q.W": 0}
@@ -0,0 +1,132 @@
+"""Tests for moving whole modules and packages."""
+from pathlib import Path
+import pytest
+from typer.testing import CliRunner
+
+from epyon.cli import app
+from epyon.core.module_mover import move_module, renamed_module
+
+runner = CliRunner()
+
+USER = (
+    "import gundam.wing.zero\n"
+    "import gundam.wing.zero.core as core\n"
+    "from gundam.wing.zero import WingZero\n"
+    "from gundam.wing import zero, other\n"
+    "from gundam.wing.zero_custom import Custom\n"
+    "\n"
+    "gundam.wing.zero.WingZero(core.WingZero, zero.WingZero)\n"
+)
+
+def _make_tree(root: Path) -> None:
+    files = {
+        "gundam/__init__.py": "",
+        "gundam/wing/__init__.py": "from . import zero\n",
+        "gundam/wing/zero/__init__.py": "from .core import WingZero\n",
+        "gundam/wing/zero/core.py": "from ..other import helper\n\n\nclass WingZero:\n    pass\n",
+        "gundam/wing/other.py": "from .zero.core import WingZero\n\n\ndef helper():\n    pass\n",
+        "gundam/wing/zero_custom.py": "class Custom:\n    pass\n",
+        "gundam/ms/__init__.py": "",
+        "user.py": USER,
+        "unrelated.py": "import os\n",
+    }
+    for name, source in files.items():
+        (root / name).parent.mkdir(parents=True, exist_ok=True)
+        (root / name).write_text(source)
+
+def test_renamed_module_matches_whole_parts():
+    """Test that only the module itself and its submodules are renamed."""
+    assert renamed_module("a.b", "a.b", "c.d") == "c.d"
+    assert renamed_module("a.b.e", "a.b", "c.d") == "c.d.e"
+    assert renamed_module("a.bc", "a.b", "c.d") is None
+
+def test_move_package(tmp_path):
+    """Test that a package moves on disk and every kind of import of it follows."""
+    _make_tree(tmp_path)
+
+    result = move_module(tmp_path, "gundam.wing.zero", "gundam.ms.zero", executor="serial", use_cache=False)
+
+    assert not (tmp_path / "gundam" / "wing" / "zero").exists()
+    assert result.destination == tmp_path / "gundam" / "ms" / "zero"
+    # Relative imports inside the package still work; those leaving it are made absolute
+    assert (tmp_path / "gundam/ms/zero/__init__.py").read_text() == "from .core import WingZero\n"
+    assert (tmp_path / "gundam/ms/zero/core.py").read_text().startswith("from gundam.wing.other import helper\n")
+    assert (tmp_path / "gundam/wing/__init__.py").read_text() == "from gundam.ms import zero\n"
+    assert (tmp_path / "gundam/wing/other.py").read_text().startswith("from gundam.ms.zero.core import WingZero\n")
+    assert (tmp_path / "user.py").read_text() == (
+        "from gundam.ms import zero\n"
+        "import gundam.ms.zero\n"
+        "import gundam.ms.zero.core as core\n"
+        "from gundam.ms.zero import WingZero\n"
+        "from gundam.wing import other\n"
+        "from gundam.wing.zero_custom import Custom\n"
+        "\n"
+        "gundam.ms.zero.WingZero(core.WingZero, zero.WingZero)\n"
+    )
+    assert result.modified == 4
+    # unrelated.py is neither in the top-level package nor an importer, so it's never read
+    assert result.total == 8
+
+def test_move_module_from_a_relative_directory(tmp_path, monkeypatch):
+    """Test that relative imports are still resolved when the directory is given as '.'."""
+    _make_tree(tmp_path)
+    monkeypatch.chdir(tmp_path)
+
+    result = move_module(Path("."), "gundam.wing.zero", "gundam.ms.zero", executor="serial", use_cache=False)
+
+    assert (tmp_path / "gundam/wing/__init__.py").read_text() == "from gundam.ms import zero\n"
+    assert (tmp_path / "gundam/wing/other.py").read_text().startswith("from gundam.ms.zero.core import WingZero\n")
+    assert (tmp_path / "gundam/ms/zero/core.py").read_text().startswith("from gundam.wing.other import helper\n")
+    assert result.modified == 4
+
+def test_move_module_to_the_top_level_keeps_local_names(tmp_path):
+    """Test moving a .py module to a new name, keeping the names importers bound."""
+    _make_tree(tmp_path)
+
+    move_module(tmp_path, "gundam.wing.other", "toolbox", executor="serial", use_cache=False)
+
+    assert (tmp_path / "toolbox.py").is_file()
+    assert not (tmp_path / "gundam" / "wing" / "other.py").exists()
+    user = (tmp_path / "user.py").read_text()
+    assert user.startswith("import toolbox as other\n")
+    assert "from gundam.wing import zero\n" in user
+    assert (tmp_path / "gundam/wing/zero/core.py").read_text().startswith("from toolbox import helper\n")
+
+def test_move_module_dry_run(tmp_path):
+    """Test that a dry run neither rewrites nor moves anything."""
+    _make_tree(tmp_path)
+    before = {path: path.read_text() for path in tmp_path.rglob("*.py")}
+
+    result = move_module(tmp_path, "gundam.wing.zero", "gundam.ms.zero", dry_run=True, use_cache=False)
+
+    assert result.modified == 4
+    assert {path: path.read_text() for path in tmp_path.rglob("*.py")} == before
+
+@pytest.mark.parametrize("old,new,message", [
+    ("gundam.wing.missing", "gundam.ms.missing", "Could not find module gundam.wing.missing"),
+    ("gundam.wing.zero", "gundam.nowhere.zero", "Could not find target package gundam.nowhere"),
+    ("gundam.wing.zero", "gundam.wing.zero_custom", "already exists"),
+    ("gundam.wing", "gundam.wing.inner", "inside itself"),
+    ("gundam.wing.zero", "gundam.ms.0zero", "is not a module name"),
+])
+def test_move_module_errors(tmp_path, old, new, message):
+    """Test that moves that can't be made are rejected before any file changes."""
+    _make_tree(tmp_path)
+    before = {path: path.read_text() for path in tmp_path.rglob("*.py")}
+
+    with pytest.raises(ValueError, match=message):
+        move_module(tmp_path, old, new, use_cache=False)
+    assert {path: path.read_text() for path in tmp_path.rglob("*.py")} == before
+
+def test_cli_move_module(tmp_path):
+    """Test the move-module command and its error reporting."""
+    _make_tree(tmp_path)
+
+    result = runner.invoke(app, ["move-module", "gundam.wing.zero", "gundam.ms.zero", str(tmp_path), "--no-cache"])
+    assert result.exit_code == 0
+    assert "Modified imports in 4 of 8 files" in result.stdout
+    assert (tmp_path / "gundam" / "ms" / "zero" / "core.py").is_file()
+
+    result = runner.invoke(app, ["move-module", "gundam.wing.zero", "gundam.ms.zero", str(tmp_path), "--no-cache"])
+    assert result.exit_code == 1
+    assert "Could not find module gundam.wing.zero" in result.stdout
@@ -0,0 +1,117 @@
+"""Tests for the module and symbol index."""
+from epyon.core.def_mover import move_definition, process_file_move
+from epyon.core.modules import ModuleIndex, find_module_file, source_roots
+
+def _write(root, relative, content=""):
+    file_path = root / relative
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+    file_path.write_text(content)
+    return file_path
+
+def _index(root):
+    return ModuleIndex(root, sorted(root.rglob("*.py")))
+
+def test_module_names(tmp_path):
+    """Test plain modules, packages, src layouts and namespace packages."""
+    flat = _write(tmp_path, "tools.py")
+    package = _write(tmp_path, "pkg/__init__.py")
+    module = _write(tmp_path, "pkg/mod.py")
+    src = _write(tmp_path, "src/app/core.py")
+    namespace = _write(tmp_path, "ns/part/leaf.py")
+    _write(tmp_path, "scripts/not-a-module.py")
+
+    modules = _index(tmp_path)
+    assert modules.module_file("tools") == flat
+    assert modules.module_file("pkg") == package
+    assert modules.module_file("pkg.mod") == module
+    assert modules.module_file("app.core") == src
+    assert modules.module_file("src.app.core") == src
+    assert modules.module_file("ns.part.leaf") == namespace
+    assert modules.module_of(src) == "app.core"
+    assert modules.module_file("missing") is None
+
+def test_directory_inside_package(tmp_path):
+    """Test that names are absolute when the target directory is a subpackage."""
+    _write(tmp_path, "pkg/__init__.py")
+    _write(tmp_path, "pkg/sub/__init__.py")
+    module = _write(tmp_path, "pkg/sub/mod.py")
+
+    assert source_roots(tmp_path / "pkg" / "sub")[0] == tmp_path
+    modules = ModuleIndex(tmp_path / "pkg" / "sub", [module])
+    assert modules.module_file("pkg.sub.mod") == module
+    assert modules.module_of(module) == "pkg.sub.mod"
+
+def test_definition_file_follows_reexports(tmp_path):
+    """Test that symbols resolve to the module that really defines them."""
+    impl = _write(tmp_path, "pkg/impl.py", "class Baz:\n    pass\n\nLIMIT: int = 3\n")
+    _write(tmp_path, "pkg/__init__.py", "from .impl import Baz as Baz\n")
+    _write(tmp_path, "api.py", "from pkg import Baz\n")
+    _write(tmp_path, "loop_a.py", "from loop_b import X\n")
+    _write(tmp_path, "loop_b.py", "from loop_a import X\n")
+
+    modules = _index(tmp_path)
+    assert modules.definition_file("pkg.impl.Baz") == impl
+    assert modules.definition_file("pkg.impl.LIMIT") == impl
+    assert modules.definition_file("pkg.Baz") == impl
+    assert modules.definition_file("api.Baz") == impl
+    assert modules.definition_file("loop_a.X") is None
+    assert modules.definition_file("pkg.impl.Missing") is None
+
+def test_definitions_are_rescanned_after_changes(tmp_path):
+    """Test that a long-lived index notices edited modules."""
+    module = _write(tmp_path, "mod.py", "class Old:\n    pass\n")
+    modules = _index(tmp_path)
+    assert modules.definition_file("mod.Old") == module
+
+    module.write_text("class New:\n    pass\n\n\n")
+    assert modules.definition_file("mod.Old") is None
+    assert modules.definition_file("mod.New") == module
+
+def test_find_module_file_probes_packages(tmp_path):
+    """Test the on-disk fallback for packages and src layouts."""
+    package = _write(tmp_path, "pkg/__init__.py")
+    src = _write(tmp_path, "src/app/core.py")
+
+    assert find_module_file("pkg", tmp_path) == package
+    assert find_module_file("app.core", tmp_path) == src
+    assert find_module_file("nope", tmp_path) is None
+
+def test_process_file_move_with_known_files(tmp_path):
+    """Test that explicit source and target files replace the path guesses."""
+    target = _write(tmp_path, "src/lib/dest.py", "x = 1\n")
+    other = _write(tmp_path, "dest.py", "y = 2\n")
+    source = _write(tmp_path, "src/lib/models.py", "class Bar:\n    pass\n")
+
+    changed, extracted = process_file_move(source, "lib.models.Bar", "lib.dest.Bar", source_file=source)
+    assert changed and extracted is not None
+
+    changed, _ = process_file_move(
+        other, "lib.models.Bar", "lib.dest.Bar", extracted_def=extracted, source_file=source, target_file=target
+    )
+    assert not changed
+    changed, _ = process_file_move(
+        target, "lib.models.Bar", "lib.dest.Bar", extracted_def=extracted, source_file=source, target_file=target
+    )
+    assert changed
+    assert "class Bar" in target.read_text()
+
+def test_move_definition_src_layout(tmp_path):
+    """Test moving a class between modules of a src-layout package."""
+    _write(tmp_path, "src/pkg/__init__.py")
+    _write(tmp_path, "src/pkg/models.py", "class Bar:\n    pass\n")
+    target = _write(tmp_path, "src/pkg/shapes.py", "x = 1\n")
+    user = _write(tmp_path, "tests/test_bar.py", "from pkg.models import Bar\n")
+
+    assert move_definition(tmp_path, "pkg.models.Bar", "pkg.shapes.Bar", use_cache=False) == 2
+    assert "class Bar" in target.read_text()
+    assert user.read_text() == "from pkg.shapes import Bar\n"
+
+def test_move_definition_refuses_reexport(tmp_path, capsys):
+    """Test that a name a package only re-exports isn't moved out of the wrong file."""
+    impl = _write(tmp_path, "pkg/impl.py", "class Baz:\n    pass\n")
+    _write(tmp_path, "pkg/__init__.py", "from .impl import Baz\n")
+    _write(tmp_path, "other.py", "x = 1\n")
+
+    assert move_definition(tmp_path, "pkg.Baz", "other.Baz", use_cache=False) == 0
+    assert "move pkg.impl.Baz instead" in capsys.readouterr().out
+    assert "class Baz" in impl.read_text()
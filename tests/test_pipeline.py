@@ -0,0 +1,176 @@
+"""Tests for the single-pass plan pipeline and the apply command."""
+from pathlib import Path
+import pytest
+from typer.testing import CliRunner
+
+from epyon.cli import app
+from epyon.core import pipeline
+from epyon.core.config import load_plan
+from epyon.core.pipeline import Plan, apply_plan
+
+runner = CliRunner()
+
+PLAN = """
+[moves]
+"gundam.zero.WingZero" = "gundam.custom.WingZero"
+
+[imports]
+"gundam.epyon.BeamSaber" = "gundam.tallgeese.BeamSaber"
+
+[calls]
+"self.assertEqual(404, response.status_code)" = "self.assertNotFound(response)"
+"self.assertEqual" = "self.assertEquals"
+"helpers.old_fire" = "helpers.fire"
+"""
+
+def _make_tree(root: Path) -> None:
+    (root / "gundam").mkdir()
+    (root / "gundam" / "__init__.py").write_text("")
+    (root / "gundam" / "zero.py").write_text(
+        "class WingZero:\n    def fire(self):\n        return helpers.old_fire()\n\n\ndef keep():\n    pass\n"
+    )
+    (root / "gundam" / "custom.py").write_text('"""Custom suits."""\n')
+    (root / "user.py").write_text(
+        "from gundam.zero import WingZero\n"
+        "from gundam.epyon import BeamSaber\n"
+        "\n"
+        "def test(self):\n"
+        "    self.assertEqual(404, response.status_code)\n"
+        "    self.assertEqual(1, 2)\n"
+        "    helpers.old_fire()\n"
+    )
+    (root / "other.py").write_text("print('unrelated')\n")
+
+def test_plan_conflicts():
+    """Test that rules which can't be applied in one pass are reported."""
+    plan = Plan(
+        moves={"a.b.C": "a.d.C", "a.b.E": "a.d.F", "x.y.G": "a.d.C"},
+        imports={"a.b.C": "z.C", "m.A": "n.A", "n.A": "o.A"},
+        calls={"self.a": "self.b", "self.b": "self.c", "self.d(1)": "self.d(2)"},
+    )
+
+    assert plan.conflicts() == [
+        "a.b.C is moved to a.d.C but [imports] replaces it with z.C",
+        "move a.b.E -> a.d.F would rename the definition",
+        "move x.y.G -> a.d.C would rename the definition",
+        "a.b.C and x.y.G are both moved to a.d.C",
+        "n.A replaces m.A but is itself replaced by o.A",
+        "self.b replaces self.a but is itself matched by self.b",
+    ]
+    assert Plan({"a.b.C": "a.d.C"}, {"e.F": "g.F"}, {"self.x": "self.y"}).conflicts() == []
+
+def test_apply_plan_parses_each_file_once(tmp_path, monkeypatch):
+    """Test that moves, imports and calls are applied together with one parse per file."""
+    _make_tree(tmp_path)
+    plan_file = tmp_path / "plan.toml"
+    plan_file.write_text(PLAN)
+    sources = {path.read_text(): path.name for path in tmp_path.rglob("*.py")}
+    parsed = []
+    parse_module = pipeline.cst.parse_module
+    monkeypatch.setattr(pipeline.cst, "parse_module", lambda code: parsed.append(code) or parse_module(code))
+
+    report = apply_plan(tmp_path, Plan.from_tables(load_plan(plan_file)), executor="serial")
+
+    assert report.modified == 3
+    # Files no rule mentions are never parsed, and the others are parsed once each
+    assert sorted(sources[code] for code in parsed) == ["custom.py", "user.py", "zero.py"]
+    assert (tmp_path / "gundam" / "zero.py").read_text().strip() == "def keep():\n    pass"
+    assert (tmp_path / "gundam" / "custom.py").read_text().endswith(
+        "class WingZero:\n    def fire(self):\n        return helpers.fire()\n"
+    )
+    assert (tmp_path / "user.py").read_text() == (
+        "from gundam.custom import WingZero\n"
+        "from gundam.tallgeese import BeamSaber\n"
+        "\n"
+        "def test(self):\n"
+        "    self.assertNotFound(response)\n"
+        "    self.assertEquals(1, 2)\n"
+        "    helpers.fire()\n"
+    )
+    assert ("move", "gundam.zero.WingZero", "gundam.custom.WingZero", 1) in report.rows()
+    assert ("call", "helpers.old_fire", "helpers.fire", 2) in report.rows()
+    assert report.overlaps == {("self.assertEqual(404, response.status_code)", "self.assertEqual"): 1}
+
+@pytest.mark.parametrize("plan,message", [
+    (Plan({"gundam.zero.Missing": "gundam.custom.Missing"}, {}, {}), "Could not find definition"),
+    (Plan({"gundam.zero.WingZero": "gundam.nowhere.WingZero"}, {}, {}), "Could not find target module"),
+    (Plan({"gundam.zero.WingZero": "gundam.custom.WingZero", "gundam.zero.keep": "gundam.custom.keep"},
+          {}, {"self.a": "self.b", "self.b": "self.c"}), "conflicting rules"),
+])
+def test_apply_plan_writes_nothing_on_errors(tmp_path, plan, message):
+    """Test that a plan that can't be applied fails before any file is written."""
+    _make_tree(tmp_path)
+    before = {path: path.read_text() for path in tmp_path.rglob("*.py")}
+
+    with pytest.raises(ValueError, match=message):
+        apply_plan(tmp_path, plan, executor="serial")
+    assert {path: path.read_text() for path in tmp_path.rglob("*.py")} == before
+
+def test_apply_plan_rejects_name_clash(tmp_path):
+    """Test that moving a definition into a module that already defines the name fails."""
+    _make_tree(tmp_path)
+    (tmp_path / "gundam" / "custom.py").write_text("class WingZero:\n    pass\n")
+
+    with pytest.raises(ValueError, match="WingZero is already defined in"):
+        apply_plan(tmp_path, Plan({"gundam.zero.WingZero": "gundam.custom.WingZero"}, {}, {}))
+
+def test_cli_apply(tmp_path):
+    """Test the apply command's dry run, patch and summary."""
+    _make_tree(tmp_path)
+    plan_file = tmp_path / "plan.toml"
+    plan_file.write_text(PLAN)
+    patch_path = tmp_path / "plan.patch"
+
+    result = runner.invoke(app, [
+        "apply", str(plan_file), str(tmp_path), "--dry-run", "--executor", "process", "--patch-out", str(patch_path)
+    ])
+    assert result.exit_code == 0
+    assert "Plan Summary" in result.stdout
+    assert "Conflict: 1 calls matched both" in result.stdout
+    assert (tmp_path / "user.py").read_text().startswith("from gundam.zero import WingZero\n")
+    assert "+from gundam.custom import WingZero\n" in patch_path.read_text()
+
+@pytest.mark.parametrize("executor", ["serial", "process"])
+def test_cli_apply_reports_files_that_fail(tmp_path, executor):
+    """Test that a file that can't be parsed is counted as an error and fails the run."""
+    _make_tree(tmp_path)
+    (tmp_path / "broken.py").write_text("def test(self):\n    self.assertEqual(1,\n")
+    plan_file = tmp_path / "plan.toml"
+    plan_file.write_text(PLAN)
+
+    report = apply_plan(tmp_path, Plan.from_tables(load_plan(plan_file)), dry_run=True, executor=executor)
+    assert report.errors == 1
+    assert report.modified == 3
+
+    result = runner.invoke(app, ["apply", str(plan_file), str(tmp_path), "--executor", executor])
+    assert result.exit_code == 1
+    assert "1 files could not be processed" in result.stdout
+    assert (tmp_path / "user.py").read_text().startswith("from gundam.custom import WingZero\n")
+
+def test_cli_apply_invalid_plan(tmp_path):
+    """Test that a malformed plan is reported."""
+    plan_file = tmp_path / "plan.toml"
+    plan_file.write_text("[renames]\n")
+
+    result = runner.invoke(app, ["apply", str(plan_file), str(tmp_path)])
+    assert result.exit_code == 1
+    assert "Could not load plan" in result.stdout
+
+def test_apply_plan_shards_combine_to_a_single_run(tmp_path):
+    """Test that shards of a plan together make the same changes as one run."""
+    from epyon.core.sharding import Shard
+
+    plan = Plan.from_tables({"moves": {"gundam.zero.WingZero": "gundam.custom.WingZero"},
+                             "calls": {"helpers.old_fire": "helpers.fire"}})
+    for tree in ("original", "whole", "shard1", "shard2"):
+        (tmp_path / tree).mkdir()
+        _make_tree(tmp_path / tree)
+    apply_plan(tmp_path / "whole", plan, executor="serial")
+    for index in (1, 2):
+        apply_plan(tmp_path / f"shard{index}", plan, executor="serial", shard=Shard(index, 2))
+
+    for path in (tmp_path / "whole").rglob("*.py"):
+        relative = path.relative_to(tmp_path / "whole")
+        owner = 1 if Shard(1, 2).select([path], tmp_path / "whole") else 2
+        assert (tmp_path / f"shard{owner}" / relative).read_text() == path.read_text()
+        assert (tmp_path / f"shard{3 - owner}" / relative).read_text() == (tmp_path / "original" / relative).read_text()
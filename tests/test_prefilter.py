@@ -0,0 +1,65 @@
+"""Tests for the prefilter module."""
+import pickle
+import libcst as cst
+
+from epyon.core.prefilter import MAX_REGEX_NEEDLES, Prefilter, SKIPPED, call_tail
+from epyon.core.import_replacer import process_file
+from epyon.core.call_replacer import process_file_call
+from epyon.core.def_mover import process_file_move
+
+def test_prefilter_matches_whole_words():
+    """Test that needles only match as whole identifiers."""
+    prefilter = Prefilter(["WingZero"])
+
+    assert prefilter.matches("from gundam.wing import WingZero\n")
+    assert prefilter.matches("from gundam.wing import (\n    WingZero,\n)\n")
+    assert not prefilter.matches("from gundam.wing import WingZeroCustom\n")
+    assert not prefilter.matches("import os\n")
+
+def test_prefilter_many_needles():
+    """Test the identifier-set mode used for large needle sets."""
+    needles = [f"Name{i}" for i in range(MAX_REGEX_NEEDLES + 1)]
+    prefilter = Prefilter(needles)
+
+    assert prefilter._pattern is None
+    assert prefilter.matches("x = Name7()\n")
+    assert not prefilter.matches("x = Name7Custom()\n")
+
+def test_prefilter_without_needles_matches_everything():
+    """Test that an empty prefilter never rejects a file."""
+    assert Prefilter([]).matches("")
+
+def test_call_tail():
+    """Test extracting the final attribute of a call pattern."""
+    assert call_tail("self.assert_401_UNAUTHORIZED") == "assert_401_UNAUTHORIZED"
+    assert call_tail("self.assertEqual(404, response.status_code)") == "assertEqual"
+
+def test_skipped_survives_pickling():
+    """Test that SKIPPED keeps its identity across process boundaries."""
+    assert pickle.loads(pickle.dumps(SKIPPED)) is SKIPPED
+    assert not SKIPPED
+
+def test_processors_skip_unrelated_files(tmp_path):
+    """Test that every processor rejects files that can't match."""
+    unrelated = tmp_path / "unrelated.py"
+    unrelated.write_text("import os\n")
+
+    assert process_file(unrelated, "old.module.Class", "new.module.Class", dry_run=True) is SKIPPED
+    assert process_file_call(unrelated, "self.assert_ok", "self.assert_good") is SKIPPED
+
+    changes_made, _ = process_file_move(
+        unrelated, "old.module.Class", "new.module.Class", extracted_def=object()
+    )
+    assert changes_made is SKIPPED
+
+def test_move_target_is_never_skipped(tmp_path):
+    """Test that the target module gets the definition even without mentioning it."""
+    target = tmp_path / "target.py"
+    target.write_text("import os\n")
+    class_def = cst.parse_module("class NewClass:\n    pass\n").body[0]
+
+    changes_made, _ = process_file_move(
+        target, "source.OldClass", "target.NewClass", extracted_def=class_def
+    )
+    assert changes_made is True
+    assert "class NewClass" in target.read_text()
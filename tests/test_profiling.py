@@ -0,0 +1,103 @@
+"""Tests for per-phase profiling."""
+import json
+from pathlib import Path
+
+from typer.testing import CliRunner
+
+from epyon.cli import app
+from epyon.core.import_replacer import replace_import
+from epyon.core.profiling import Profile, current, file_timer, phase, profiling
+from epyon.core.utils import process_files_parallel
+
+runner = CliRunner()
+
+def _read(file_path: Path) -> int:
+    """Processor used by the tests; must be importable by worker processes."""
+    with phase("read"):
+        return len(file_path.read_text())
+
+def test_disabled_profiling_records_nothing():
+    """Test that phases outside a profile are no-ops."""
+    with profiling(False) as profile:
+        with phase("parse"):
+            pass
+    assert profile is None
+    assert current() is None
+
+def test_phases_and_files_are_recorded(tmp_path):
+    """Test that time is attributed to phases and files."""
+    file_path = tmp_path / "a.py"
+    file_path.write_text("x = 1\n")
+
+    with profiling() as profile:
+        with file_timer(file_path):
+            with phase("parse"):
+                pass
+            with phase("parse"):
+                pass
+    assert current() is None
+    assert set(profile.phases) == {"parse"}
+    assert [timing.size for timing in profile.files] == [6]
+    assert profile.wall_seconds > 0
+
+def test_slowest_adds_up_repeated_files():
+    """Test that files processed in several passes are reported once."""
+    profile = Profile()
+    profile.add_file(Path("a.py"), 1.0)
+    profile.add_file(Path("b.py"), 1.5)
+    profile.add_file(Path("a.py"), 1.0)
+
+    slowest = profile.slowest(1)
+    assert [(timing.path, timing.seconds) for timing in slowest] == [("a.py", 2.0)]
+    assert profile.to_dict()["files"] == 2
+
+def test_worker_profiles_are_merged(tmp_path):
+    """Test that timings recorded in worker processes reach the parent."""
+    files = []
+    for i in range(6):
+        file_path = tmp_path / f"f{i}.py"
+        file_path.write_text("x" * i)
+        files.append(file_path)
+
+    with profiling() as profile:
+        results = process_files_parallel(files, _read, max_workers=2, executor="process")
+
+    assert sorted(results) == list(range(6))
+    assert "read" in profile.phases
+    assert sorted(timing.path for timing in profile.files) == sorted(str(f) for f in files)
+
+def test_replace_import_phases(tmp_path):
+    """Test that a real run records the pipeline's phases."""
+    (tmp_path / "a.py").write_text("from foo.bar import Baz\n")
+    (tmp_path / "b.py").write_text("import os\n")
+
+    with profiling() as profile:
+        replace_import(tmp_path, "foo.bar.Baz", "lorem.ipsum.Baz", max_workers=1)
+
+    assert {"discovery", "read", "prefilter", "parse", "transform", "codegen", "diff", "write"} <= set(profile.phases)
+
+def test_cli_profile_json(tmp_path):
+    """Test --profile output and the JSON report."""
+    (tmp_path / "a.py").write_text("from foo.bar import Baz\n")
+    report = tmp_path / "profile.json"
+
+    result = runner.invoke(app, [
+        "replace-import", "foo.bar.Baz", "lorem.ipsum.Baz", str(tmp_path),
+        "--profile", "--profile-json", str(report), "--profile-top", "1",
+    ])
+    assert result.exit_code == 0
+    assert "Profile" in result.stdout
+    assert "Slowest 1 files" in result.stdout
+
+    data = json.loads(report.read_text())
+    assert data["files"] == 1
+    assert "parse" in data["phases"]
+    assert data["slowest"][0]["path"] == str(tmp_path / "a.py")
+
+def test_cli_profile_rejects_daemon(tmp_path):
+    """Test that --profile isn't silently ignored with --daemon."""
+    result = runner.invoke(app, [
+        "move-def", "foo.Bar", "baz.Bar", str(tmp_path), "--profile", "--daemon",
+    ])
+    assert result.exit_code == 1
+    assert "can't be used with --daemon" in result.stdout
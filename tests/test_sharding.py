@@ -0,0 +1,122 @@
+"""Tests for sharded runs and merging their results."""
+import json
+import subprocess
+from pathlib import Path
+import pytest
+from typer.testing import CliRunner
+
+from epyon.cli import app
+from epyon.core.sharding import Shard, merge_patches, merge_results, parse_shard
+
+runner = CliRunner()
+
+def _make_tree(root: Path, count: int = 20) -> None:
+    root.mkdir(exist_ok=True)
+    for i in range(count):
+        body = "x = 1\n" * (i * 7 % 13)
+        (root / f"mod{i}.py").write_text("from a.b import C\n" + body + ("print(C)\n" if i % 2 else ""))
+
+@pytest.mark.parametrize("value,message", [
+    ("2", "is not a shard"),
+    ("a/4", "is not a shard"),
+    ("0/4", "between 1 and 4"),
+    ("5/4", "between 1 and 4"),
+])
+def test_parse_shard_errors(value, message):
+    """Test that malformed --shard values are rejected."""
+    with pytest.raises(ValueError, match=message):
+        parse_shard(value)
+
+@pytest.mark.parametrize("mode", ["hash", "size"])
+def test_shards_partition_the_files(tmp_path, mode):
+    """Test that every file belongs to exactly one shard, wherever the tree lives."""
+    _make_tree(tmp_path / "one")
+    _make_tree(tmp_path / "two")
+    files = sorted((tmp_path / "one").glob("*.py"))
+    shards = [Shard(index, 3, mode).select(files, tmp_path / "one") for index in (1, 2, 3)]
+
+    assert sorted(f for shard in shards for f in shard) == files
+    assert all(shards)
+    # A checkout somewhere else agrees on the assignment
+    moved = [Shard(index, 3, mode).select(sorted((tmp_path / "two").glob("*.py")), tmp_path / "two")
+             for index in (1, 2, 3)]
+    assert [[f.name for f in shard] for shard in moved] == [[f.name for f in shard] for shard in shards]
+
+def test_size_mode_balances_bytes(tmp_path):
+    """Test that size mode gives each shard about the same amount of source."""
+    for i, size in enumerate([900, 500, 400, 300, 200, 100, 100]):
+        (tmp_path / f"m{i}.py").write_text("#" * size)
+    files = sorted(tmp_path.glob("*.py"))
+    loads = [sum(f.stat().st_size for f in Shard(index, 2, "size").select(files, tmp_path)) for index in (1, 2)]
+    assert loads == [1200, 1300] or loads == [1300, 1200]
+
+def test_merge_patches_rejects_overlap(tmp_path):
+    """Test that two shards changing the same file is reported."""
+    patch = "diff --git a/m.py b/m.py\n--- a/m.py\n+++ b/m.py\n@@ -1 +1 @@\n-a\n+b\n"
+    (tmp_path / "1.patch").write_text(patch)
+    (tmp_path / "2.patch").write_text(patch)
+    with pytest.raises(ValueError, match="m.py is changed by both"):
+        merge_patches([tmp_path / "1.patch", tmp_path / "2.patch"], tmp_path / "out.patch")
+
+def test_merge_results_reports_missing_shards(tmp_path):
+    """Test that a shard without a summary, or missing altogether, is a problem."""
+    (tmp_path / "1.jsonl").write_text(json.dumps({"event": "summary", "events": 0, "shard": "1/3"}) + "\n")
+    (tmp_path / "2.jsonl").write_text("")
+    merged = merge_results([tmp_path / "1.jsonl", tmp_path / "2.jsonl"])
+    assert merged.problems == [
+        f"{tmp_path / '2.jsonl'} has no summary event; the shard may not have finished",
+        "missing shards: 2/3, 3/3",
+    ]
+
+def test_sharded_run_matches_a_single_run(tmp_path, monkeypatch):
+    """Test that merging the shards of a dry run gives the same patch and totals as one run."""
+    _make_tree(tmp_path / "tree")
+    monkeypatch.chdir(tmp_path / "tree")
+    streams, patches = [], []
+    for index in (1, 2, 3):
+        patch_path = tmp_path / f"shard{index}.patch"
+        result = runner.invoke(app, [
+            "replace-import", "a.b.C", "a.d.C", ".", "--dry-run", "--output", "jsonl",
+            "--shard", f"{index}/3", "--shard-by", "size", "--patch-out", str(patch_path)
+        ])
+        assert result.exit_code == 0
+        stream = tmp_path / f"shard{index}.jsonl"
+        stream.write_text(result.stdout)
+        streams.append(str(stream))
+        patches.append(patch_path)
+    assert json.loads(Path(streams[0]).read_text().splitlines()[-1])["shard"] == "1/3"
+
+    merged_patch = tmp_path / "merged.patch"
+    args = ["merge-results", *streams, "--output", "jsonl", "--patch-out", str(merged_patch)]
+    for patch_path in patches:
+        args += ["--patch", str(patch_path)]
+    result = runner.invoke(app, args)
+    assert result.exit_code == 0
+    events = [json.loads(line) for line in result.stdout.splitlines()]
+    assert [event["path"] for event in events[:-1]] == sorted(f"mod{i}.py" for i in range(20))
+    assert events[-1]["events"] == 20 and events[-1]["modified"] == 20 and events[-1]["shards"] == 3
+
+    whole_patch = tmp_path / "whole.patch"
+    result = runner.invoke(app, ["replace-import", "a.b.C", "a.d.C", ".", "--dry-run", "--patch-out", str(whole_patch)])
+    assert result.exit_code == 0
+    assert merged_patch.read_text() == whole_patch.read_text()
+    subprocess.run(["git", "apply", "--check", str(merged_patch)], check=True)
+
+def test_cli_merge_results_human(tmp_path):
+    """Test the human summary of merged results, and that problems fail the command."""
+    (tmp_path / "1.jsonl").write_text(
+        json.dumps({"event": "file", "path": "a.py", "action": "modified"}) + "\n"
+        + json.dumps({"event": "summary", "events": 1, "modified": 1, "shard": "1/2"}) + "\n"
+    )
+    result = runner.invoke(app, ["merge-results", str(tmp_path / "1.jsonl")])
+    assert result.exit_code == 1
+    assert "Merged Results" in result.stdout
+    assert "missing shards: 2/2" in result.stdout
+
+def test_cli_shard_conflicts_with_daemon(tmp_path):
+    """Test that --shard is validated and can't be sent to the daemon."""
+    result = runner.invoke(app, ["replace-call", "self.a", "self.b", "--shard", "3/2"])
+    assert result.exit_code == 2
+    result = runner.invoke(app, ["replace-call", "self.a", "self.b", "--shard", "1/2", "--daemon"])
+    assert result.exit_code == 1
+    assert "--shard can't be used with --daemon" in result.output
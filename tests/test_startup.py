@@ -0,0 +1,67 @@
+"""Tests that keep CLI startup fast."""
+import json
+import subprocess
+import sys
+
+# Comfortably above what a warm laptop measures, so only real regressions fail
+IMPORT_BUDGET_MS = 150
+# The best of a few runs filters out a busy machine or a cold disk cache
+IMPORT_TIME_RUNS = 5
+# Modules that must only be imported once a command actually does work
+HEAVY_MODULES = [
+    "libcst",
+    "concurrent.futures",
+    "rich.syntax",
+    "rich.progress",
+    "epyon.core.import_replacer",
+    "epyon.core.call_replacer",
+    "epyon.core.def_mover",
+    "epyon.core.pipeline",
+    "epyon.core.module_mover",
+    "epyon.core.utils",
+]
+
+def _loaded_after(code: str) -> list:
+    """Run code in a fresh interpreter and return which heavy modules it loaded."""
+    script = (
+        "import json, sys\n"
+        f"{code}\n"
+        f"print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))\n"
+    )
+    result = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def test_importing_the_cli_is_light():
+    """Test that importing the CLI doesn't pull in libcst or the core modules."""
+    assert _loaded_after("import epyon.cli") == []
+
+def test_version_is_light():
+    """Test that --version is answered without loading the refactoring machinery."""
+    code = (
+        "from epyon.cli import app\n"
+        "try:\n"
+        "    app(['--version'])\n"
+        "except SystemExit:\n"
+        "    pass"
+    )
+    assert _loaded_after(code) == []
+
+def _import_time_us() -> int:
+    """Import the CLI in a fresh interpreter and return its cumulative import time."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import epyon.cli"],
+        capture_output=True, text=True, check=True
+    )
+    # Lines look like 'import time:   self [us] | cumulative | package'
+    cumulative = None
+    for line in result.stderr.splitlines():
+        fields = [field.strip() for field in line.split("|")]
+        if len(fields) == 3 and fields[2] == "epyon.cli":
+            cumulative = int(fields[1])
+    assert cumulative is not None
+    return cumulative
+
+def test_import_time_budget():
+    """Test that importing the CLI stays within the startup budget."""
+    fastest = min(_import_time_us() for _ in range(IMPORT_TIME_RUNS))
+    assert fastest / 1000 < IMPORT_BUDGET_MS
@@ -0,0 +1,140 @@
+"""Tests for the utils module."""
+from pathlib import Path
+import pytest
+
+from epyon.core.utils import (
+    MAX_CHUNK_FILES,
+    _chunk_files,
+    build_call_index,
+    build_import_map,
+    iter_files_parallel,
+    process_files_parallel,
+)
+
+def _file_size(file_path: Path, offset: int = 0) -> int:
+    """Processor used by the tests; must be importable by worker processes."""
+    if file_path.name == "boom.py":
+        raise RuntimeError("boom")
+    return file_path.stat().st_size + offset
+
+@pytest.fixture
+def sized_files(tmp_path):
+    """Create files with distinct sizes."""
+    files = []
+    for i in range(10):
+        file_path = tmp_path / f"f{i}.py"
+        file_path.write_text("x" * (i * 100))
+        files.append(file_path)
+    return files
+
+def test_chunk_files_covers_every_file(sized_files):
+    """Test that chunking neither drops nor duplicates files."""
+    chunks = _chunk_files(sized_files, workers=2, chunk_bytes=1000)
+
+    flattened = [file_path for chunk in chunks for file_path in chunk]
+    assert sorted(flattened) == sorted(sized_files)
+    assert len(chunks) > 1
+
+def test_chunk_files_largest_first(sized_files):
+    """Test that the biggest files are scheduled first, each in its own chunk."""
+    chunks = _chunk_files(sized_files, workers=1, chunk_bytes=500)
+
+    assert chunks[0] == [sized_files[-1]]
+
+def test_chunk_files_caps_file_count(tmp_path):
+    """Test that a chunk never holds more than MAX_CHUNK_FILES files."""
+    files = []
+    for i in range(MAX_CHUNK_FILES * 2 + 1):
+        file_path = tmp_path / f"empty{i}.py"
+        file_path.touch()
+        files.append(file_path)
+
+    chunks = _chunk_files(files, workers=1, chunk_bytes=1_000_000)
+    assert max(len(chunk) for chunk in chunks) == MAX_CHUNK_FILES
+    assert sum(len(chunk) for chunk in chunks) == len(files)
+
+@pytest.mark.parametrize("executor", ["serial", "thread", "process"])
+def test_process_files_parallel(sized_files, executor):
+    """Test that every file is processed with the given arguments on each backend."""
+    results = process_files_parallel(sized_files, _file_size, offset=1, max_workers=2, executor=executor)
+
+    assert sorted(results) == [i * 100 + 1 for i in range(10)]
+
+def test_iter_files_parallel_bounded(sized_files, tmp_path):
+    """Test streaming results with a single chunk in flight and a failing file."""
+    boom = tmp_path / "boom.py"
+    boom.touch()
+
+    results = dict(iter_files_parallel(
+        sized_files + [boom],
+        _file_size,
+        max_workers=2,
+        chunk_bytes=200,
+        max_in_flight=1,
+        executor="process"
+    ))
+
+    assert results[boom] is None
+    assert {results[file_path] for file_path in sized_files} == {i * 100 for i in range(10)}
+
+@pytest.mark.parametrize("executor", ["serial", "thread", "process"])
+def test_build_import_map_backends(tmp_path, executor):
+    """Test that every backend builds the same import map."""
+    (tmp_path / "a.py").write_text("import os\nfrom foo.bar import Baz\n")
+    (tmp_path / "b.py").write_text("from foo.bar import Baz\n")
+    (tmp_path / "broken.py").write_text("def (\n")
+
+    import_map = build_import_map(tmp_path, use_cache=False, max_workers=2, executor=executor)
+    assert import_map == {
+        "os": {tmp_path / "a.py"},
+        "foo.bar.Baz": {tmp_path / "a.py", tmp_path / "b.py"},
+    }
+
+def test_build_import_map_reports_progress_during_the_scan(tmp_path, monkeypatch):
+    """Test that the indexing bar advances before the last file has been scanned."""
+    import threading
+    from epyon.core import utils
+    from epyon.display import ProgressTracker
+
+    files = []
+    for i in range(4):
+        file_path = tmp_path / f"m{i}.py"
+        file_path.write_text(f"import mod{i}\n")
+        files.append(file_path)
+    advanced = threading.Event()
+    advanced_before_last = []
+    scan = utils._try_scan
+    advance = ProgressTracker.advance
+
+    def slow_last_scan(file_path, known_hash):
+        if file_path == files[-1]:
+            advanced_before_last.append(advanced.wait(timeout=5))
+        return scan(file_path, known_hash)
+
+    def noting_advance(self, *args, **kwargs):
+        advanced.set()
+        advance(self, *args, **kwargs)
+
+    monkeypatch.setattr(utils, "_try_scan", slow_last_scan)
+    monkeypatch.setattr(ProgressTracker, "advance", noting_advance)
+    import_map = build_import_map(tmp_path, use_cache=False, files=files, max_workers=2, executor="thread")
+
+    assert advanced_before_last == [True]
+    assert set(import_map) == {f"mod{i}" for i in range(4)}
+
+def test_build_call_index(tmp_path):
+    """Test that call chains map to the files and lines calling them."""
+    (tmp_path / "a.py").write_text(
+        "self.client.get(1)\n"
+        "x = 2\n"
+        "self.client.get(self.check())\n"
+        "get()\n"
+        "make().get()\n"
+    )
+    (tmp_path / "b.py").write_text("# self.client.get is only mentioned here\n")
+
+    call_index = build_call_index(tmp_path, use_cache=False)
+    assert call_index == {
+        "self.client.get": {tmp_path / "a.py": [1, 3]},
+        "self.check": {tmp_path / "a.py": [3]},
+    }
@@ -0,0 +1,158 @@
+"""Tests for the write-behind file writer."""
+import os
+import stat
+
+import pytest
+from typer.testing import CliRunner
+
+from epyon.cli import app
+from epyon.core.import_replacer import process_file, replace_import
+from epyon.core.utils import _process_chunk
+from epyon.core.writer import FSYNC_POLICIES, FileWriter, atomic_write, collecting, write_file
+
+runner = CliRunner()
+
+def _leftovers(directory):
+    return [path.name for path in directory.iterdir() if path.name.endswith(".epyon-tmp")]
+
+def test_atomic_write_keeps_permissions(tmp_path):
+    """Test that the file is replaced in one step with its mode intact."""
+    file_path = tmp_path / "a.py"
+    file_path.write_text("old\n")
+    os.chmod(file_path, 0o640)
+
+    atomic_write(file_path, "new\n", fsync=True)
+    assert file_path.read_text() == "new\n"
+    assert stat.S_IMODE(file_path.stat().st_mode) == 0o640
+    assert _leftovers(tmp_path) == []
+
+def test_atomic_write_writes_through_symlinks(tmp_path):
+    """Test that a symlinked file keeps its link and the target gets the new content."""
+    (tmp_path / "real").mkdir()
+    target = tmp_path / "real" / "x.py"
+    target.write_text("old\n")
+    link = tmp_path / "link.py"
+    link.symlink_to(target)
+
+    atomic_write(link, "new\n")
+    assert link.is_symlink()
+    assert target.read_text() == "new\n"
+    assert _leftovers(tmp_path) == [] and _leftovers(tmp_path / "real") == []
+
+def test_replace_import_keeps_symlinked_files(tmp_path):
+    """Test that a file reached through a symlink is rewritten once, through the link."""
+    (tmp_path / "real").mkdir()
+    target = tmp_path / "real" / "x.py"
+    target.write_text("from a.b import C\n")
+    link = tmp_path / "link.py"
+    link.symlink_to(target)
+
+    assert replace_import(tmp_path, "a.b.C", "d.e.C") == 1
+    assert link.is_symlink()
+    assert target.read_text() == "from d.e import C\n"
+
+def test_atomic_write_failure_keeps_original(tmp_path, monkeypatch):
+    """Test that a failed rename leaves the original file and no temp file."""
+    file_path = tmp_path / "a.py"
+    file_path.write_text("old\n")
+
+    def fail(*args):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(os, "replace", fail)
+    with pytest.raises(OSError):
+        atomic_write(file_path, "new\n")
+    assert file_path.read_text() == "old\n"
+    assert _leftovers(tmp_path) == []
+
+@pytest.mark.parametrize("policy", FSYNC_POLICIES)
+def test_file_writer_commits_queued_files(tmp_path, policy):
+    """Test that every submitted file is written under each fsync policy."""
+    files = [tmp_path / f"f{i}.py" for i in range(20)]
+    with FileWriter(policy, max_pending=4) as writer:
+        for i, file_path in enumerate(files):
+            write_file(file_path, f"x = {i}\n")
+
+    assert [file_path.read_text() for file_path in files] == [f"x = {i}\n" for i in range(20)]
+    assert sorted(writer.written) == sorted(files)
+    assert writer.errors == []
+
+def test_file_writer_reports_errors(tmp_path, capsys):
+    """Test that failed writes are collected and shown instead of raised."""
+    missing = tmp_path / "missing" / "a.py"
+    with FileWriter() as writer:
+        write_file(missing, "x = 1\n")
+
+    assert writer.failed == {missing}
+    assert "Error writing" in capsys.readouterr().out
+
+def test_unknown_fsync_policy():
+    """Test that an unknown policy is rejected."""
+    with pytest.raises(ValueError, match="fsync"):
+        FileWriter("sometimes")
+
+def test_collecting_defers_writes(tmp_path):
+    """Test that a collecting worker returns its files instead of writing them."""
+    file_path = tmp_path / "a.py"
+    file_path.write_text("from foo.bar import Baz\n")
+
+    result = _process_chunk(
+        process_file, [file_path], ("foo.bar.Baz", "lorem.ipsum.Baz", False), {}, write_behind=True
+    )
+    assert result.results == [True]
+    assert file_path.read_text() == "from foo.bar import Baz\n"
+    assert result.writes == [(file_path, "from lorem.ipsum import Baz\n")]
+
+    with collecting(False) as writes:
+        assert writes is None
+
+def test_parallel_run_writes_through_parent(tmp_path):
+    """Test that files rewritten in workers are committed by the parent's writer."""
+    for i in range(8):
+        (tmp_path / f"m{i}.py").write_text("from foo.bar import Baz\n")
+
+    assert replace_import(
+        tmp_path, "foo.bar.Baz", "lorem.ipsum.Baz", max_workers=2, fsync="batch", executor="process"
+    ) == 8
+    assert {path.read_text() for path in tmp_path.glob("*.py")} == {"from lorem.ipsum import Baz\n"}
+    assert _leftovers(tmp_path) == []
+
+@pytest.mark.parametrize("command", [
+    ["replace-import", "foo.bar.Baz", "lorem.ipsum.Baz", "{path}"],
+    ["replace-call", "self.old_check", "self.new_check", "--directory", "{path}"],
+    ["move-def", "foo.bar.Baz", "lorem.ipsum.Baz", "{path}", "--no-cache"],
+    ["apply", "{plan}", "{path}"],
+    ["move-module", "foo.bar", "lorem.bar", "{path}", "--no-cache"],
+])
+def test_cli_fails_when_files_cannot_be_written(tmp_path, monkeypatch, command):
+    """Test that every rewriting command exits with 1 if a rewritten file never reached the disk."""
+    project = tmp_path / "project"
+    for name, source in {
+        "foo/__init__.py": "",
+        "foo/bar.py": "class Baz:\n    pass\n",
+        "lorem/__init__.py": "",
+        "lorem/ipsum.py": "",
+        "user.py": "from foo.bar import Baz\n\n\ndef test(self):\n    self.old_check()\n",
+    }.items():
+        (project / name).parent.mkdir(parents=True, exist_ok=True)
+        (project / name).write_text(source)
+    plan = tmp_path / "plan.toml"
+    plan.write_text('[imports]\n"foo.bar.Baz" = "lorem.ipsum.Baz"\n')
+
+    def fail(file_path, content, fsync=False):
+        raise OSError("disk full")
+
+    monkeypatch.setattr("epyon.core.writer.atomic_write", fail)
+    args = [arg.format(path=project, plan=plan) for arg in command] + ["--executor", "serial"]
+    result = runner.invoke(app, args)
+
+    assert result.exit_code == 1
+    assert "disk full" in result.stdout
+    assert (project / "user.py").read_text().startswith("from foo.bar import Baz\n")
+
+def test_cli_rejects_unknown_fsync(tmp_path):
+    """Test the --fsync option validation."""
+    result = runner.invoke(app, [
+        "replace-import", "foo.bar.Baz", "lorem.ipsum.Baz", str(tmp_path), "--fsync", "sometimes",
+    ])
+    assert result.exit_code == 2